@@ -31,6 +31,11 @@ class StreamStatusListener extends Command
      */
     private const AGENT_STATE_KEY_PREFIX = 'agent_state:';
 
+    /**
+     * Trạng thái heartbeat delta theo VPS: ['seq' => int, 'streams' => int[]].
+     */
+    private array $heartbeatState = [];
+
     /**
      * Thực thi command.
      */
@@ -125,12 +130,19 @@ private function processReport(array $data): void
             case 'STATUS_UPDATE':
                 $this->handleStatusUpdate($data);
                 break;
+            case 'STATUS_BATCH':
+                $this->handleStatusBatch($data);
+                break;
             case 'RESTART_REQUEST':
                 $this->handleRestartRequest($data);
                 break;
             case 'HEARTBEAT':
                 $this->handleHeartbeat($data);
                 break;
+            case 'METRICS_RESPONSE':
+                // Series nằm trong Redis key result_key (TTL ngắn), chỉ log thông báo
+                $this->info("   -> METRICS_RESPONSE from VPS #" . ($data['vps_id'] ?? 'N/A') . ": " . ($data['points'] ?? 0) . " points in " . ($data['result_key'] ?? 'N/A'));
+                break;
 
             default:
                 $this->warn("   - Unhandled report type: '{$type}'");
@@ -160,6 +172,23 @@ private function handleStatusUpdate(array $data): void
         \App\Jobs\UpdateStreamStatusJob::dispatch($data);
     }
 
+    /**
+     * Xử lý batch cập nhật trạng thái (nhiều STATUS_UPDATE trong một message).
+     */
+    private function handleStatusBatch(array $data): void
+    {
+        $updates = $data['updates'] ?? [];
+        $vpsId = $data['vps_id'] ?? 'N/A';
+
+        $this->info("   -> Processing STATUS_BATCH from VPS #{$vpsId} with " . count($updates) . " updates");
+
+        foreach ($updates as $update) {
+            if (is_array($update)) {
+                $this->handleStatusUpdate($update);
+            }
+        }
+    }
+
     /**
      * Xử lý restart request từ Agent
      */
@@ -190,7 +219,9 @@ private function handleHeartbeat(array $data): void
         $vpsId = $data['vps_id'] ?? null;
         if (!$vpsId) return;
 
-        $activeStreams = $data['active_streams'] ?? [];
+        $activeStreams = $this->resolveHeartbeatStreams((int) $vpsId, $data);
+        if ($activeStreams === null) return;
+
         $isReAnnounce = $data['re_announce'] ?? false;
         $isImmediateUpdate = $data['immediate_update'] ?? false;
 
@@ -213,5 +244,40 @@ private function handleHeartbeat(array $data): void
 
 
 
+    /**
+     * Dựng lại danh sách stream từ heartbeat full hoặc delta (added/removed).
+     * Trả về null nếu chưa có snapshot để áp dụng delta.
+     */
+    private function resolveHeartbeatStreams(int $vpsId, array $data): ?array
+    {
+        // Agent cũ không có seq - luôn gửi danh sách đầy đủ
+        if (!isset($data['seq']) || ($data['full'] ?? false)) {
+            $streams = array_values(array_map('intval', $data['active_streams'] ?? []));
+            if (isset($data['seq'])) {
+                $this->heartbeatState[$vpsId] = ['seq' => (int) $data['seq'], 'streams' => $streams];
+            }
+            return $streams;
+        }
+
+        $state = $this->heartbeatState[$vpsId] ?? null;
+        $baseSeq = (int) ($data['base_seq'] ?? -1);
+
+        if ($state === null || $state['seq'] !== $baseSeq) {
+            $this->warn("   -> ⚠️ HEARTBEAT gap from VPS #{$vpsId} (base_seq {$baseSeq}, have " . ($state['seq'] ?? 'none') . "), requesting snapshot");
+            \App\Jobs\RequestHeartbeatSnapshotJob::dispatch($vpsId, $state === null ? 'no_snapshot' : 'sequence_gap');
+
+            if ($state === null) {
+                return null;
+            }
+        }
+
+        $streams = array_diff($state['streams'], array_map('intval', $data['removed'] ?? []));
+        $streams = array_values(array_unique(array_merge($streams, array_map('intval', $data['added'] ?? []))));
+        sort($streams);
+
+        $this->heartbeatState[$vpsId] = ['seq' => (int) $data['seq'], 'streams' => $streams];
+        return $streams;
+    }
+
     // --- REMOVED: All DB operations moved to jobs to avoid Redis subscription context issues ---
 }
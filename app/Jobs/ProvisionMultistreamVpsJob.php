@@ -426,7 +426,10 @@ private function generateAgentSystemdService(string $agentPath, string $redisHos
 After=network.target
 
 [Service]
-Type=simple
+Type=notify
+NotifyAccess=main
+WatchdogSec=60
+KillMode=mixed
 User=root
 ExecStart={$command}
 Restart=always
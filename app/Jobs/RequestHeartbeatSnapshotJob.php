@@ -0,0 +1,45 @@
+<?php
+
+namespace App\Jobs;
+
+use Illuminate\Bus\Queueable;
+use Illuminate\Contracts\Queue\ShouldQueue;
+use Illuminate\Foundation\Bus\Dispatchable;
+use Illuminate\Queue\InteractsWithQueue;
+use Illuminate\Queue\SerializesModels;
+use Illuminate\Support\Facades\Log;
+use Illuminate\Support\Facades\Redis;
+
+class RequestHeartbeatSnapshotJob implements ShouldQueue
+{
+    use Dispatchable, InteractsWithQueue, Queueable, SerializesModels;
+
+    public $tries = 3;
+    public $timeout = 30;
+
+    public function __construct(
+        public int $vpsId,
+        public string $reason = 'sequence_gap'
+    ) {
+    }
+
+    public function handle(): void
+    {
+        try {
+            $command = [
+                'command' => 'HEARTBEAT_SNAPSHOT',
+                'vps_id' => $this->vpsId,
+                'reason' => $this->reason,
+                'timestamp' => time(),
+            ];
+
+            $channel = "vps-commands:{$this->vpsId}";
+            $result = Redis::publish($channel, json_encode($command));
+
+            Log::info("💓 [HeartbeatSnapshot] Requested full heartbeat from VPS #{$this->vpsId} (subscribers: {$result}). Reason: {$this->reason}");
+
+        } catch (\Exception $e) {
+            Log::error("❌ [HeartbeatSnapshot] Failed to request snapshot from VPS #{$this->vpsId}: {$e->getMessage()}");
+        }
+    }
+}
@@ -263,7 +263,10 @@ private function generateSystemdService(string $agentPath, string $redisHost, in
 After=network.target
 
 [Service]
-Type=simple
+Type=notify
+NotifyAccess=main
+WatchdogSec=60
+KillMode=mixed
 User=root
 ExecStart={$command}
 Restart=always
@@ -9,15 +9,19 @@ import signal
 import logging
 import time
 import os
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-# Import components
+# Only what boot needs up front - component modules (requests, psutil, redis) load in parallel in start()
+from startup import init_boot_timeline
 from config import init_config
-from status_reporter import init_status_reporter
-from file_manager import init_file_manager
-# Legacy stream_manager removed - using simple_stream_manager
-from command_handler import init_command_handler
 
+# Imported on a boot thread while Redis connects
+COMPONENT_MODULES = (
+    'redis_client', 'status_reporter', 'file_manager', 'process_manager',
+    'simple_stream_manager', 'command_handler', 'metrics_store',
+)
 
 
 # Logging setup - Linux focused
@@ -42,13 +46,26 @@ class EZStreamAgent:
 
     def __init__(self, vps_id: int, redis_host: str, redis_port: int, redis_password: Optional[str] = None):
         self.running = False
-        self.config = init_config(vps_id, redis_host, redis_port, redis_password)
+        self.boot = init_boot_timeline()
+        with self.boot.phase('config'):
+            self.config = init_config(vps_id, redis_host, redis_port, redis_password)
+
+        # Size pools and cadence for this host before any component reads the config
+        with self.boot.phase('host_profile'):
+            from host_profile import init_host_profile
+            self.host_profile = init_host_profile()
 
         # Components
+        self.redis_manager = None
         self.status_reporter = None
         self.file_manager = None
         # Legacy stream_manager removed
         self.command_handler = None
+        self.metrics_exporter = None
+        self.metrics_store = None
+        self.process_manager = None
+        self.command_runner = None
+        self.watchdog = None
 
         # Simple streaming components
         self.simple_stream_manager = None
@@ -60,49 +77,101 @@ class EZStreamAgent:
         try:
             logging.info("Starting EZStream Agent v7.0 with Simple FFmpeg Streaming...")
             self.running = True
+            boot = self.boot
 
             # Config is already loaded in __init__, no need to fetch from Laravel
+            from instrumentation import init_instrumentation
+            init_instrumentation()
+            from agent_watchdog import init_watchdog
+            self.watchdog = init_watchdog()
+
+            with ThreadPoolExecutor(max_workers=4, thread_name_prefix="Boot") as pool:
+                # Redis round trips overlap with loading the component modules
+                imports = pool.submit(boot.run, 'imports', self._import_components)
+                runner = pool.submit(boot.run, 'command_runner', self._init_command_runner)
+                self.redis_manager = boot.run('redis_connect', self._connect_redis)
+
+                # Subscribe before anything slow - commands sent from here on wait on the socket
+                command_channel = f'vps-commands:{self.config.vps_id}'
+                command_pubsub = boot.run('command_subscribe', self.redis_manager.pubsub, command_channel)
+                logging.info(f"📡 Subscribed to command channel: {command_channel}")
+                self.redis_manager.start()
+
+                imports.result()
+                from status_reporter import init_status_reporter
+                from file_manager import init_file_manager
+                from simple_stream_manager import init_simple_stream_manager
+                from command_handler import init_command_handler
 
-            # Initialize components in correct order
-            self.status_reporter = init_status_reporter()
-            self.file_manager = init_file_manager()
-
-            # Initialize process manager BEFORE stream manager (required dependency)
-            from process_manager import init_process_manager
-            init_process_manager()
-            logging.info("✅ Process manager initialized")
-
-            # Legacy stream_manager removed - using simple_stream_manager only
-            self.command_handler = init_command_handler()
+                # Everything else reports through the status reporter
+                self.status_reporter = boot.run('status_reporter', init_status_reporter)
 
-            # SRS managers removed - using FFmpeg direct streaming only
+                # Independent of each other - the file manager's disk index scan is usually the slowest
+                file_manager = pool.submit(boot.run, 'file_manager', init_file_manager)
+                process_manager = pool.submit(boot.run, 'process_manager', self._start_process_manager)
+                stream_manager = pool.submit(boot.run, 'stream_manager', init_simple_stream_manager)
+                self.command_handler = boot.run('command_handler', init_command_handler, command_pubsub)
 
-            # Initialize simple streaming components
-            try:
-                from simple_stream_manager import init_simple_stream_manager
-                self.simple_stream_manager = init_simple_stream_manager()
+                self.file_manager = file_manager.result()
+                self.process_manager = process_manager.result()
+                logging.info("✅ Process manager initialized")
+                self.simple_stream_manager = stream_manager.result()
                 logging.info("✅ Simple streaming components initialized successfully")
-            except Exception as e:
-                logging.error(f"❌ Failed to initialize simple streaming components: {e}")
-                raise
-
-            # Start services
+                self.command_runner = runner.result()
+
+            with boot.phase('services'):
+                from metrics_store import init_metrics_store
+                self.metrics_store = init_metrics_store()
+                self.metrics_store.start()
+
+                if self.file_manager:
+                    self.file_manager.start_cleanup_service()
+
+                # Optional OpenMetrics endpoint - a bind failure must not take the agent down
+                if self.config.metrics_enabled:
+                    try:
+                        from metrics_exporter import init_metrics_exporter
+                        self.metrics_exporter = init_metrics_exporter()
+                        self.metrics_exporter.start()
+                    except Exception as e:
+                        logging.error(f"❌ Failed to start metrics exporter: {e}")
+                        self.metrics_exporter = None
+
+            # Heartbeats start after the ready mark so the first one carries the boot timeline
+            boot.mark_ready()
+            # Always started - with watchdog_enabled off it still feeds systemd's WatchdogSec
+            self.watchdog.notify_ready()
+            self.watchdog.start()
             if self.status_reporter:
                 self.status_reporter.start()
 
-            if self.file_manager:
-                self.file_manager.start_cleanup_service()
-
+            logging.info("EZStream Agent v7.0 (Simple FFmpeg Streaming) started successfully!")
             if self.command_handler:
                 self.command_handler.start()
-
-            logging.info("EZStream Agent v7.0 (Simple FFmpeg Streaming) started successfully!")
             self._main_loop()
             
         except Exception as e:
             logging.error(f"Failed to start agent: {e}")
             self.stop()
             sys.exit(1)
+
+    def _import_components(self):
+        for module in COMPONENT_MODULES:
+            importlib.import_module(module)
+
+    def _init_command_runner(self):
+        from command_runner import init_command_runner
+        return init_command_runner()
+
+    def _connect_redis(self):
+        from redis_client import init_redis_manager
+        return init_redis_manager()
+
+    def _start_process_manager(self):
+        from process_manager import init_process_manager
+        process_manager = init_process_manager()
+        process_manager.start()
+        return process_manager
     
     def stop(self):
         """Stop agent"""
@@ -110,6 +179,13 @@ class EZStreamAgent:
             logging.info("Shutting down EZStream Agent v7.0...")
             self.running = False
 
+            # First, so loops winding down are not mistaken for stalls
+            if self.watchdog:
+                try:
+                    self.watchdog.stop()
+                except Exception as e:
+                    logging.error(f"Error stopping watchdog: {e}")
+
             if self.command_handler:
                 try:
                     self.command_handler.stop()
@@ -119,6 +195,18 @@ class EZStreamAgent:
 
             # Legacy stream_manager removed
 
+            if self.metrics_store:
+                try:
+                    self.metrics_store.stop()
+                except Exception as e:
+                    logging.error(f"Error stopping metrics store: {e}")
+
+            if self.metrics_exporter:
+                try:
+                    self.metrics_exporter.stop()
+                except Exception as e:
+                    logging.error(f"Error stopping metrics exporter: {e}")
+
             # Stop simple stream manager
             if self.simple_stream_manager:
                 try:
@@ -127,13 +215,27 @@ class EZStreamAgent:
                 except Exception as e:
                     logging.error(f"Error stopping simple stream manager: {e}")
 
+            if self.process_manager:
+                try:
+                    self.process_manager.stop_all()
+                except Exception as e:
+                    logging.error(f"Error stopping process manager: {e}")
+
             if self.file_manager:
                 try:
                     self.file_manager.stop_cleanup_service()
+                    self.file_manager.downloader.close()
+                    self.file_manager.hasher.close()
                     logging.info("File manager stopped")
                 except Exception as e:
                     logging.error(f"Error stopping file manager: {e}")
 
+            if self.command_runner:
+                try:
+                    self.command_runner.close()
+                except Exception as e:
+                    logging.error(f"Error stopping command runner: {e}")
+
             if self.status_reporter:
                 try:
                     self.status_reporter.stop()
@@ -141,6 +243,12 @@ class EZStreamAgent:
                 except Exception as e:
                     logging.error(f"Error stopping status reporter: {e}")
 
+            if self.redis_manager:
+                try:
+                    self.redis_manager.stop()
+                except Exception as e:
+                    logging.error(f"Error stopping Redis manager: {e}")
+
             logging.info("EZStream Agent v7.0 shutdown complete")
 
         except Exception as e:
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Watchdog
+Long-running loops check in on a handle; a loop that misses its deadline
+gets every thread's stack dumped and, where its owner supports it, is
+restarted on its own. systemd WATCHDOG=1 pings stop only while a critical
+loop that cannot be restarted is stuck, so the unit restarts the whole
+agent; per-stream loops are given up locally instead.
+"""
+
+import os
+import sys
+import time
+import socket
+import logging
+import threading
+import traceback
+from typing import Dict, Any, Optional, Callable, Union
+
+Deadline = Union[float, Callable[[], float]]
+
+
+def sd_notify(state: str) -> bool:
+    """Send a state string to systemd when running under Type=notify; no-op otherwise"""
+    address = os.environ.get('NOTIFY_SOCKET')
+    if not address:
+        return False
+    if address.startswith('@'):
+        address = '\0' + address[1:]  # Abstract namespace socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(state.encode(), address)
+        return True
+    except OSError as e:
+        logging.debug(f"sd_notify({state}) failed: {e}")
+        return False
+
+
+def systemd_watchdog_interval() -> Optional[float]:
+    """Seconds between WATCHDOG=1 pings systemd expects for this process, None when not supervised"""
+    usec = os.environ.get('WATCHDOG_USEC')
+    pid = os.environ.get('WATCHDOG_PID')
+    if not usec or (pid and pid != str(os.getpid())):
+        return None
+    try:
+        return int(usec) / 1e6
+    except ValueError:
+        return None
+
+
+def format_thread_stacks() -> str:
+    """Every thread's current stack, named, for stall reports"""
+    names = {t.ident: t.name for t in threading.enumerate()}
+    sections = []
+    for thread_id, frame in sys._current_frames().items():
+        stack = ''.join(traceback.format_stack(frame))
+        sections.append(f"--- Thread {names.get(thread_id, '?')} ({thread_id}) ---\n{stack}")
+    return '\n'.join(sections)
+
+
+class LoopHandle:
+    """One registered loop - call beat() every iteration"""
+
+    def __init__(self, name: str, deadline: Deadline, restart: Optional[Callable[[], None]] = None,
+                 critical: bool = True, on_exhausted: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.deadline = deadline
+        self.restart = restart
+        self.critical = critical  # Stuck for good means the agent is broken - escalate to systemd
+        self.on_exhausted = on_exhausted  # Called instead of escalating once restarts cannot help
+        self.generation = 0
+        self.last_beat = time.monotonic()
+        self.consecutive_restarts = 0  # Restarts since the loop last checked in by itself
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.restarts = 0
+        self.stalled = False
+
+    def beat(self):
+        self.last_beat = time.monotonic()
+        self.consecutive_restarts = 0
+
+    def is_current(self, generation: int) -> bool:
+        """False once the watchdog has restarted this loop - the old thread should exit"""
+        return self.generation == generation
+
+    @property
+    def lag(self) -> float:
+        return time.monotonic() - self.last_beat
+
+    def expected_interval(self) -> float:
+        """Longest the loop may legitimately go between check-ins"""
+        return float(self.deadline() if callable(self.deadline) else self.deadline)
+
+    def to_dict(self, grace: float) -> Dict[str, Any]:
+        return {
+            'lag': round(self.lag, 3),
+            'max_lag': round(self.max_lag, 3),
+            'deadline': round(self.expected_interval() + grace, 1),
+            'stalled': self.stalled,
+            'stalls': self.stalls,
+            'restarts': self.restarts,
+            'consecutive_restarts': self.consecutive_restarts,
+            'restartable': self.restart is not None,
+            'critical': self.critical,
+        }
+
+
+class Watchdog:
+    """Checks registered loops against their deadlines and feeds the systemd watchdog"""
+
+    def __init__(self, check_interval: float = 2.0, grace: float = 30.0, stack_dump_interval: float = 60.0,
+                 enabled: bool = True, max_restarts: int = 3):
+        self.enabled = enabled  # Loop checks only - systemd is fed either way while the thread runs
+        self.check_interval = check_interval
+        self.max_restarts = max_restarts  # Consecutive restarts per loop before leaving it to systemd
+        self.grace = grace  # Added to every loop's expected interval before it counts as stalled
+        self.stack_dump_interval = stack_dump_interval
+        self.loops: Dict[str, LoopHandle] = {}
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_stack_dump = 0.0
+        self._last_notify = 0.0
+
+        self.systemd_interval = systemd_watchdog_interval()
+        self.stats = {
+            'checks': 0,
+            'stalls': 0,
+            'restarts': 0,
+            'restarts_exhausted': 0,
+            'stack_dumps': 0,
+            'systemd_pings': 0,
+            'systemd_pings_withheld': 0,
+        }
+
+    def register(self, name: str, deadline: Deadline, restart: Optional[Callable[[], None]] = None,
+                 critical: bool = True, on_exhausted: Optional[Callable[[], None]] = None) -> LoopHandle:
+        """Watch a loop that checks in at least every `deadline` seconds (plus grace);
+        restart(), if given, brings up a fresh instance after a stall. Only critical loops
+        stop the systemd pings; on_exhausted() handles a loop restarts could not fix."""
+        handle = LoopHandle(name, deadline, restart, critical, on_exhausted)
+        with self._lock:
+            previous = self.loops.get(name)
+            if previous:
+                # Keep counters across re-registration of the same loop (e.g. a stream restarted by command)
+                handle.stalls, handle.restarts, handle.max_lag = previous.stalls, previous.restarts, previous.max_lag
+            self.loops[name] = handle
+        return handle
+
+    def unregister(self, name: str, handle: Optional[LoopHandle] = None):
+        """Stop watching a loop; with handle, only if it has not been replaced since"""
+        with self._lock:
+            if handle is None or self.loops.get(name) is handle:
+                self.loops.pop(name, None)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._watch_loop, name="Watchdog", daemon=True)
+        self.thread.start()
+        interval = f", systemd ping every {self.systemd_interval / 2:.0f}s" if self.systemd_interval else ''
+        checks = f"check every {self.check_interval}s" if self.enabled else "loop checks disabled"
+        logging.info(f"🐕 Watchdog started ({checks}{interval})")
+
+    def stop(self):
+        self.running = False
+        self._stop.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        sd_notify('STOPPING=1')
+
+    def notify_ready(self):
+        """Tell systemd start-up is complete (Type=notify units)"""
+        if sd_notify('READY=1'):
+            logging.info("🐕 Notified systemd: READY")
+
+    def check(self):
+        """One pass over all loops - stalls are reported once per stall, then restarted if possible"""
+        if not self.enabled:
+            self._notify_systemd([])
+            return
+        self.stats['checks'] += 1
+        with self._lock:
+            handles = list(self.loops.values())
+
+        stuck = []
+        for handle in handles:
+            lag = handle.lag
+            handle.max_lag = max(handle.max_lag, lag)
+            deadline = handle.expected_interval() + self.grace
+            if lag <= deadline:
+                if handle.stalled:
+                    handle.stalled = False
+                    logging.info(f"🐕 Loop {handle.name} recovered")
+                continue
+
+            if not handle.stalled:
+                handle.stalled = True
+                handle.stalls += 1
+                self.stats['stalls'] += 1
+                logging.error(f"🐕 Loop {handle.name} missed its deadline: no check-in for {lag:.1f}s "
+                              f"(deadline {deadline:.0f}s)")
+                self._dump_stacks()
+                if self._can_restart(handle):
+                    self._restart(handle)
+                    continue
+                if handle.on_exhausted:
+                    self._give_up(handle)
+                    continue
+            if handle.stalled and handle.critical:
+                stuck.append(handle.name)
+
+        self._notify_systemd(stuck)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loops = {name: handle.to_dict(self.grace) for name, handle in sorted(self.loops.items())}
+        return {**self.stats, 'systemd': self.systemd_interval is not None, 'loops': loops}
+
+    def _can_restart(self, handle: LoopHandle) -> bool:
+        if not handle.restart:
+            return False
+        if handle.consecutive_restarts < self.max_restarts:
+            return True
+        if handle.consecutive_restarts == self.max_restarts:
+            handle.consecutive_restarts += 1  # Log once per exhaustion
+            self.stats['restarts_exhausted'] += 1
+            logging.critical(f"🐕 Loop {handle.name} is still stuck after {self.max_restarts} restarts - "
+                             f"{self._escalation(handle)}")
+        return False
+
+    def _escalation(self, handle: LoopHandle) -> str:
+        if handle.on_exhausted:
+            return "giving up on it locally"
+        if not handle.critical:
+            return "leaving it stalled"
+        return "withholding systemd pings" if self.systemd_interval else "no systemd watchdog to escalate to"
+
+    def _give_up(self, handle: LoopHandle):
+        """Hand a loop restarts could not fix back to its owner and stop watching it"""
+        handle.generation += 1  # The wedged thread exits if it ever wakes up
+        self.unregister(handle.name, handle)
+        try:
+            handle.on_exhausted()
+        except Exception as e:
+            logging.error(f"❌ Giving up on loop {handle.name} failed: {e}")
+
+    def _restart(self, handle: LoopHandle):
+        # A new generation first, so the wedged thread exits if it ever wakes up
+        handle.generation += 1
+        handle.restarts += 1
+        handle.consecutive_restarts += 1
+        handle.stalled = False
+        handle.last_beat = time.monotonic()  # Fresh deadline, without counting as a check-in
+        self.stats['restarts'] += 1
+        try:
+            handle.restart()
+            logging.warning(f"🐕 Restarted loop {handle.name} (generation {handle.generation})")
+        except Exception as e:
+            logging.error(f"❌ Failed to restart loop {handle.name}: {e}")
+
+    def _dump_stacks(self):
+        now = time.monotonic()
+        if now - self._last_stack_dump < self.stack_dump_interval:
+            return
+        self._last_stack_dump = now
+        self.stats['stack_dumps'] += 1
+        logging.error(f"🐕 Thread stacks at stall:\n{format_thread_stacks()}")
+
+    def _notify_systemd(self, stuck: list):
+        if not self.systemd_interval:
+            return
+        now = time.monotonic()
+        if now - self._last_notify < self.systemd_interval / 2:
+            return
+        self._last_notify = now
+        if stuck:
+            # Let systemd's WatchdogSec expire - only a full restart can fix these
+            self.stats['systemd_pings_withheld'] += 1
+            logging.error(f"🐕 Withholding systemd watchdog ping - stuck: {', '.join(stuck)}")
+            return
+        if sd_notify('WATCHDOG=1'):
+            self.stats['systemd_pings'] += 1
+
+    def _watch_loop(self):
+        # Feed systemd often enough even when checks are configured slower than its timeout
+        interval = self.check_interval
+        if self.systemd_interval:
+            interval = min(interval, self.systemd_interval / 4)
+        while self.running:
+            try:
+                self.check()
+            except Exception as e:
+                logging.error(f"❌ Watchdog check failed: {e}")
+            self._stop.wait(interval)
+
+
+# Global instance management
+_watchdog: Optional[Watchdog] = None
+_watchdog_lock = threading.Lock()
+
+
+def init_watchdog() -> Watchdog:
+    """Initialize global watchdog from config"""
+    global _watchdog
+    from config import get_config
+    config = get_config()
+    with _watchdog_lock:
+        _watchdog = watchdog = Watchdog(
+            check_interval=config.watchdog_check_interval,
+            grace=config.watchdog_grace_seconds,
+            stack_dump_interval=config.watchdog_stack_dump_interval,
+            enabled=config.watchdog_enabled,
+            max_restarts=config.watchdog_max_restarts
+        )
+
+    def on_config_change(changes, version):
+        watchdog.enabled = config.watchdog_enabled
+        watchdog.max_restarts = config.watchdog_max_restarts
+        watchdog.check_interval = config.watchdog_check_interval
+        watchdog.grace = config.watchdog_grace_seconds
+        watchdog.stack_dump_interval = config.watchdog_stack_dump_interval
+
+    config.subscribe(on_config_change)
+    return _watchdog
+
+
+def get_watchdog() -> Watchdog:
+    """Get global watchdog, creating a default one for early callers"""
+    global _watchdog
+    with _watchdog_lock:
+        if _watchdog is None:
+            _watchdog = Watchdog()
+        return _watchdog
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Bandwidth Scheduler
+Gives downloads only the link headroom left over by live streams, backing
+off immediately when any stream falls behind realtime
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+import psutil
+
+from config import get_config
+
+
+DEFAULT_LINK_MBPS = 1000.0
+
+# Lowest budget ever applied - the token bucket reads a rate of 0 as unlimited
+MIN_BUDGET_MBPS = 0.1
+
+
+def detect_link_capacity() -> float:
+    """Fastest non-loopback interface that is up, in Mbps (psutil reports 0 when unknown)"""
+    try:
+        speeds = [
+            stats.speed for name, stats in psutil.net_if_stats().items()
+            if stats.isup and stats.speed > 0 and not name.startswith('lo')
+        ]
+        return float(max(speeds)) if speeds else DEFAULT_LINK_MBPS
+    except Exception:
+        return DEFAULT_LINK_MBPS
+
+
+class BandwidthScheduler:
+    """AIMD controller over the downloader's token bucket"""
+
+    def __init__(self, downloader):
+        self.config = get_config()
+        self.downloader = downloader
+        self.capacity_mbps = self.config.network_capacity_mbps or detect_link_capacity()
+
+        self.budget_mbps = self.capacity_mbps * self.config.bandwidth_target_utilization
+        self.hold_until = 0.0
+        self.decisions: deque = deque(maxlen=50)
+
+        self.running = False
+        self.scheduler_thread = None
+        self._last_bytes = 0
+        self._last_time: Optional[float] = None
+
+        self.stats = {
+            'ticks': 0,
+            'backoffs': 0,
+            'throttled_ticks': 0,
+        }
+
+    def start(self):
+        """Start adjusting the download limit in the background"""
+        if self.running:
+            return
+        self.running = True
+        self.scheduler_thread = threading.Thread(
+            target=self._scheduler_loop,
+            name="BandwidthScheduler",
+            daemon=True
+        )
+        self.scheduler_thread.start()
+        logging.info(f"🚦 Bandwidth scheduler started (link {self.capacity_mbps:.0f} Mbps, "
+                     f"target {self.config.bandwidth_target_utilization:.0%})")
+
+    def stop(self):
+        """Stop the scheduler and lift its limit (the static cap still applies)"""
+        self.running = False
+        if self.scheduler_thread:
+            self.scheduler_thread.join(timeout=self.config.bandwidth_interval + 1)
+        # Back to the static cap, or unlimited (rate 0) without one
+        self.downloader.limiter.rate = max(0.0, self.config.download_bandwidth_limit_mbps) * 1e6 / 8
+
+    def tick(self) -> Dict[str, Any]:
+        """Measure live usage and set the download budget for the next interval"""
+        now = time.monotonic()
+        live = self._measure_live()
+        download_mbps = self._measure_downloads(now)
+
+        target = self.capacity_mbps * self.config.bandwidth_target_utilization
+        # Remote-input streams share the downlink with downloads; RTMP pushes use the uplink,
+        # and a saturated uplink also delays the ACKs downloads depend on - take the tighter side
+        downlink_live = max(0.0, live['host_rx_mbps'] - download_mbps)
+        uplink_live = max(live['stream_egress_mbps'], live['host_tx_mbps'])
+        headroom = min(target - downlink_live, target - uplink_live)
+        floor = max(MIN_BUDGET_MBPS, self.config.bandwidth_min_download_mbps)
+
+        if live['degraded']:
+            # Multiplicative decrease - a stream is already dropping behind realtime
+            self.budget_mbps = max(floor, min(self.budget_mbps, headroom) / 2)
+            self.hold_until = now + self.config.bandwidth_backoff_hold
+            self.stats['backoffs'] += 1
+            reason = f"backoff: {', '.join(live['degraded'][:5])}"
+        elif now < self.hold_until:
+            self.budget_mbps = max(floor, min(self.budget_mbps, headroom))
+            reason = "holding after backoff"
+        else:
+            # Additive increase towards the measured headroom
+            step = self.capacity_mbps * 0.05
+            self.budget_mbps = max(floor, min(headroom, self.budget_mbps + step))
+            reason = "headroom" if self.budget_mbps < target else "unconstrained"
+
+        static_cap = self.config.download_bandwidth_limit_mbps
+        budget = min(self.budget_mbps, static_cap) if static_cap > 0 else self.budget_mbps
+        self._apply(budget)
+
+        self.stats['ticks'] += 1
+        if budget < target:
+            self.stats['throttled_ticks'] += 1
+
+        decision = {
+            'timestamp': int(time.time()),
+            'budget_mbps': round(budget, 2),
+            'download_mbps': round(download_mbps, 2),
+            'stream_egress_mbps': round(live['stream_egress_mbps'], 2),
+            'host_tx_mbps': live['host_tx_mbps'],
+            'host_rx_mbps': live['host_rx_mbps'],
+            'reason': reason,
+        }
+        last = self.decisions[-1] if self.decisions else None
+        if last is None or last['reason'] != reason or abs(last['budget_mbps'] - decision['budget_mbps']) >= 1:
+            self.decisions.append(decision)
+        return decision
+
+    def get_stats(self, recent: int = 10) -> Dict[str, Any]:
+        """Current budget and the latest throttle decisions"""
+        return {
+            **self.stats,
+            'capacity_mbps': self.capacity_mbps,
+            'budget_mbps': round(self.budget_mbps, 2),
+            'holding': time.monotonic() < self.hold_until,
+            'decisions': list(self.decisions)[-recent:],
+        }
+
+    def _apply(self, mbps: float):
+        """Set the download budget - clamped above zero so a full backoff never means unthrottled"""
+        self.downloader.limiter.rate = max(MIN_BUDGET_MBPS, mbps) * 1e6 / 8
+
+    def _measure_live(self) -> Dict[str, Any]:
+        """FFmpeg output bitrate, host NIC rates and streams running below realtime"""
+        egress_kbps = 0.0
+        degraded: List[str] = []
+
+        from simple_stream_manager import get_simple_stream_manager
+        for stream_id, stream in list(get_simple_stream_manager().streams.items()):
+            progress = stream.get('progress') or {}
+            egress_kbps += progress.get('bitrate_kbps') or 0.0
+            speed = progress.get('speed')
+            if speed is not None and speed < self.config.bandwidth_degraded_speed:
+                degraded.append(f"stream {stream_id} speed {speed:.2f}x")
+
+        host = {}
+        from status_reporter import get_status_reporter
+        reporter = get_status_reporter()
+        if reporter:
+            host = reporter.sampler.get_latest()
+
+        return {
+            'stream_egress_mbps': egress_kbps / 1000,
+            'host_tx_mbps': host.get('network_tx_mbps') or 0.0,
+            'host_rx_mbps': host.get('network_rx_mbps') or 0.0,
+            'degraded': degraded,
+        }
+
+    def _measure_downloads(self, now: float) -> float:
+        total = self.downloader.stats['bytes_downloaded']
+        rate = 0.0
+        if self._last_time is not None:
+            rate = (total - self._last_bytes) * 8 / max(now - self._last_time, 1e-6) / 1e6
+        self._last_bytes, self._last_time = total, now
+        return rate
+
+    def _scheduler_loop(self):
+        while self.running:
+            try:
+                self.tick()
+            except Exception as e:
+                logging.error(f"❌ Error in bandwidth scheduler: {e}")
+            time.sleep(self.config.bandwidth_interval)
@@ -13,11 +13,12 @@ from concurrent.futures import ThreadPoolExecutor, Future
 from dataclasses import dataclass
 from enum import Enum
 
-import redis
-
 from config import get_config
-from utils import safe_json_loads, PerformanceTimer
+from utils import safe_json_loads, safe_json_dumps, Histogram
+from instrumentation import get_instrumentation
+from agent_watchdog import get_watchdog
 from status_reporter import get_status_reporter
+from redis_client import get_redis_manager, ManagedPubSub
 # Simple streaming - no SRS dependencies
 
 
@@ -44,19 +45,25 @@ class CommandExecution:
 class CommandHandler:
     """Simple FFmpeg Direct Streaming command handler"""
     
-    def __init__(self):
+    def __init__(self, pubsub: Optional[ManagedPubSub] = None):
         self.config = get_config()
         self.status_reporter = get_status_reporter()
 
-        # Redis connection for command listening
-        self.redis_conn = None
-        self.pubsub = None
+        # Command subscription on the shared Redis pool - the agent may open it early in boot
+        # so commands sent while components are still initializing queue on the socket
+        self.redis_manager = get_redis_manager()
+        self.pubsub = pubsub
         self.running = False
         
         # Command processing
-        self.command_executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix="CommandWorker")
+        self.command_executor = ThreadPoolExecutor(max_workers=self.config.command_workers, thread_name_prefix="CommandWorker")
         self.active_commands: Dict[str, CommandExecution] = {}
         self.command_lock = threading.RLock()
+
+        # Command metrics (read by the metrics exporter)
+        self.command_counts = {'received': 0, 'succeeded': 0, 'failed': 0}
+        self.command_latency = Histogram()
+        self.command_queue_latency = Histogram()
         
         # Command handlers
         self.command_handlers: Dict[str, Callable] = {
@@ -64,33 +71,26 @@ class CommandHandler:
             'STOP_STREAM': self._handle_stop_stream,
             'UPDATE_STREAM': self._handle_update_stream,
             'SYNC_STATE': self._handle_sync_state,
+            'HEARTBEAT_SNAPSHOT': self._handle_heartbeat_snapshot,
+            'GET_METRICS': self._handle_get_metrics,
+            'PROFILE': self._handle_profile,
             'UPDATE_SETTINGS': self._handle_update_settings,
             'RESTART_AGENT': self._handle_restart_agent,
             'UPDATE_AGENT': self._handle_update_agent
         }
+        # Timer names come from this fixed set, never from the command string Redis delivered
+        self._command_timers = {command: f"command.{command}" for command in self.command_handlers}
         
         logging.info("🎛️ Simple FFmpeg Command Handler initialized")
 
     def start(self):
         """Start command processing"""
         try:
-            # Connect to Redis
-            redis_config = self.config.get_redis_config()
-            self.redis_conn = redis.Redis(**redis_config)
-            
-            # Test connection
-            self.redis_conn.ping()
-            logging.info("✅ Connected to Redis for command processing")
-            
-            # Subscribe to VPS-specific command channel
-            from config import get_config
-            config = get_config()
-            command_channel = f'vps-commands:{config.vps_id}'
-
-            self.pubsub = self.redis_conn.pubsub()
-            self.pubsub.subscribe(command_channel)
-
-            logging.info(f"📡 Subscribed to command channel: {command_channel}")
+            # Subscribe to VPS-specific command channel (resubscribes itself after drops)
+            command_channel = f'vps-commands:{self.config.vps_id}'
+            if self.pubsub is None:
+                self.pubsub = self.redis_manager.pubsub(command_channel)
+                logging.info(f"📡 Subscribed to command channel: {command_channel}")
             
             self.running = True
             logging.info("🎛️ Command Handler started - listening for commands")
@@ -108,11 +108,9 @@ class CommandHandler:
         
         self.running = False
         
-        # Close Redis connections
+        # Close command subscription (the shared pool is closed by the agent)
         if self.pubsub:
             self.pubsub.close()
-        if self.redis_conn:
-            self.redis_conn.close()
         
         # Shutdown executor
         self.command_executor.shutdown(wait=True)
@@ -121,7 +119,10 @@ class CommandHandler:
 
     def _process_commands(self):
         """Main command processing loop"""
+        # Runs on the main thread, so a stall can only be cleared by dropping the subscription socket
+        watch = get_watchdog().register('command_loop', deadline=1.0, restart=self.pubsub.reconnect)
         while self.running:
+            watch.beat()
             try:
                 # Get message with timeout
                 message = self.pubsub.get_message(timeout=1.0)
@@ -134,6 +135,7 @@ class CommandHandler:
                 if self.running:
                     logging.error(f"❌ Error in command processing loop: {e}")
                     time.sleep(1)
+        get_watchdog().unregister(watch.name, watch)
 
     def _handle_command_message(self, message_data):
         """Handle incoming command message"""
@@ -177,6 +179,7 @@ class CommandHandler:
 
             with self.command_lock:
                 self.active_commands[command_key] = execution
+                self.command_counts['received'] += 1
 
             logging.info(f"📝 [COMMAND] Created execution tracking: {command_key}")
 
@@ -194,6 +197,8 @@ class CommandHandler:
 
     def _execute_command(self, execution: CommandExecution, config: Dict[str, Any], command_data: Dict[str, Any]):
         """Execute command with error handling"""
+        started = time.time()
+        self.command_queue_latency.observe(started - execution.start_time)
         try:
             execution.status = CommandStatus.PROCESSING
             
@@ -201,7 +206,7 @@ class CommandHandler:
             handler = self.command_handlers[execution.command]
             
             # Execute command
-            with PerformanceTimer(f"Command {execution.command}"):
+            with get_instrumentation().timer(self._command_timers.get(execution.command, 'command.unknown')):
                 result = handler(execution.stream_id, config, command_data)
             
             execution.result = result
@@ -218,9 +223,12 @@ class CommandHandler:
             logging.error(f"❌ [COMMAND] {execution.command} error: {e}")
         
         finally:
+            self.command_latency.observe(time.time() - started)
+
             # Cleanup command tracking
             with self.command_lock:
                 self.active_commands.pop(execution.command_key, None)
+                self.command_counts['succeeded' if execution.status == CommandStatus.SUCCESS else 'failed'] += 1
 
     def _handle_start_stream(self, stream_id: int, config: Dict[str, Any], command_data: Dict[str, Any]) -> bool:
         """Handle START_STREAM command - Simple FFmpeg Direct"""
@@ -268,6 +276,28 @@ class CommandHandler:
                 logging.error(f"❌ [SIMPLE] No input URLs found for stream {stream_id}")
                 return False
 
+            # Fail fast on dead inputs instead of going through FFmpeg's retry cycle
+            if self.config.preflight_enabled and not config.get('skip_preflight'):
+                from file_manager import get_file_manager
+                preflight = get_file_manager().preflight_urls(stream_id, input_urls)
+                failures = [r for r in preflight.values() if not r['ok']]
+                if failures:
+                    message = '; '.join(f"{r['url']}: {r['error']}" for r in failures)
+                    logging.error(f"❌ [SIMPLE] Preflight failed for stream {stream_id}: {len(failures)}/{len(preflight)} inputs unreachable")
+                    if self.status_reporter:
+                        self.status_reporter.publish_stream_status(
+                            stream_id, 'ERROR', f"Input preflight failed: {message}",
+                            {'preflight': list(preflight.values())}
+                        )
+                    return False
+
+            # Optionally fetch inputs first so FFmpeg reads local files
+            if config.get('download_inputs', self.config.download_inputs_locally):
+                from file_manager import get_file_manager
+                file_dicts = [vf for vf in video_files if isinstance(vf, dict) and vf.get('download_url')]
+                if len(file_dicts) == len(input_urls):
+                    input_urls = get_file_manager().prepare_local_inputs(stream_id, file_dicts, config.get('prepare_inputs'))
+
             # Extract RTMP endpoint
             output_url = None
             if config.get('rtmp_url'):
@@ -290,9 +320,9 @@ class CommandHandler:
                 output_url=output_url,
                 loop_enabled=config.get('loop', True),
                 playback_mode=config.get('playback_mode', 'sequential'),
-                max_retries=5,
-                restart_delay=10,
-                health_check_interval=30
+                max_retries=self.config.ffmpeg_max_retries,
+                restart_delay=self.config.ffmpeg_restart_delay,
+                health_check_interval=self.config.ffmpeg_health_check_interval
             )
 
             # Start stream
@@ -364,6 +394,9 @@ class CommandHandler:
             if success:
                 logging.info(f"✅ [SIMPLE] Stream {stream_id} stopped successfully")
 
+                from file_manager import get_file_manager
+                get_file_manager().release_stream_files(stream_id)
+
                 # Report status to Laravel
                 if self.status_reporter:
                     self.status_reporter.publish_stream_status(
@@ -437,6 +470,76 @@ class CommandHandler:
             logging.error(f"❌ Error in sync_state handler: {e}")
             return False
 
+    def _handle_heartbeat_snapshot(self, stream_id: Optional[int], config: Dict[str, Any], command_data: Dict[str, Any]) -> bool:
+        """Handle HEARTBEAT_SNAPSHOT command - Laravel lost track of the heartbeat sequence"""
+        try:
+            reason = command_data.get('reason', 'requested')
+            logging.info(f"💓 [HEARTBEAT] Full snapshot requested by Laravel ({reason})")
+
+            if self.status_reporter:
+                self.status_reporter.request_heartbeat(full=True, reason=reason)
+
+            return True
+
+        except Exception as e:
+            logging.error(f"❌ Error in heartbeat_snapshot handler: {e}")
+            return False
+
+    def _handle_get_metrics(self, stream_id: Optional[int], config: Dict[str, Any], command_data: Dict[str, Any]) -> bool:
+        """Handle GET_METRICS command - store the requested window in Redis and announce it"""
+        try:
+            from metrics_store import get_metrics_store
+            store = get_metrics_store()
+            if not store:
+                logging.error("❌ [METRICS] Metrics store not initialized")
+                return False
+
+            request_id = command_data.get('request_id') or f"{int(time.time() * 1000)}"
+            window = int(command_data.get('window', config.get('window', 3600)))
+            fields = command_data.get('fields') or config.get('fields')
+
+            result = store.query(stream_id, window, fields)
+            result['vps_id'] = self.config.vps_id
+            result['request_id'] = request_id
+
+            # Series can be large - keep them out of the agent-reports channel
+            result_key = f"agent_metrics:{self.config.vps_id}:{request_id}"
+            self.redis_manager.get_client().setex(result_key, self.config.metrics_response_ttl, safe_json_dumps(result))
+
+            if self.status_reporter:
+                self.status_reporter.publish_metrics_response(
+                    stream_id, request_id, result_key,
+                    points=len(result.get('timestamps', [])),
+                    resolution=result.get('resolution')
+                )
+
+            logging.info(f"📈 [METRICS] Stored {len(result.get('timestamps', []))} points for "
+                         f"{'host' if stream_id is None else f'stream {stream_id}'} in {result_key}")
+            return True
+
+        except Exception as e:
+            logging.error(f"❌ Error in get_metrics handler: {e}")
+            return False
+
+    def _handle_profile(self, stream_id: Optional[int], config: Dict[str, Any], command_data: Dict[str, Any]) -> bool:
+        """Handle PROFILE command - sample agent thread stacks; results go out with the stats report"""
+        try:
+            instrumentation = get_instrumentation()
+            if (command_data.get('action') or config.get('action')) == 'stop':
+                instrumentation.stop_profiling()
+                logging.info("🔬 [PROFILE] Sampling profiler stopped")
+                return True
+
+            duration = float(command_data.get('duration', config.get('duration', 30)))
+            interval_ms = float(command_data.get('interval_ms', config.get('interval_ms', 10)))
+            if not instrumentation.start_profiling(duration, interval_ms / 1000):
+                logging.warning("⚠️ [PROFILE] Profiler already running")
+            return True
+
+        except Exception as e:
+            logging.error(f"❌ Error in profile handler: {e}")
+            return False
+
     def _handle_update_settings(self, stream_id: Optional[int], config: Dict[str, Any], command_data: Dict[str, Any]) -> bool:
         """Handle UPDATE_SETTINGS command"""
         try:
@@ -446,7 +549,7 @@ class CommandHandler:
             updated_settings = self.config.update_from_laravel_settings(config)
             
             if updated_settings:
-                logging.info(f"✅ [SETTINGS] Updated: {', '.join(updated_settings)}")
+                logging.info(f"✅ [SETTINGS] Updated to config v{self.config.config_version}: {', '.join(updated_settings)}")
             else:
                 logging.info("ℹ️ [SETTINGS] No settings changed")
 
@@ -487,10 +590,10 @@ class CommandHandler:
 _command_handler: Optional['CommandHandler'] = None
 
 
-def init_command_handler() -> 'CommandHandler':
-    """Initialize global command handler"""
+def init_command_handler(pubsub: Optional[ManagedPubSub] = None) -> 'CommandHandler':
+    """Initialize global command handler, optionally on an already open command subscription"""
     global _command_handler
-    _command_handler = CommandHandler()
+    _command_handler = CommandHandler(pubsub)
     return _command_handler
 
 
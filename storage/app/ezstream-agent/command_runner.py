@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Command Runner
+Pooled subprocess execution on one asyncio loop: a global concurrency
+limit, streaming line callbacks, bounded output capture and timeouts that
+kill the whole process group
+"""
+
+import os
+import time
+import signal
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Callable
+
+READ_SIZE = 64 * 1024
+
+LineCallback = Callable[[str], None]
+
+
+@dataclass
+class CommandResult:
+    """Outcome of one command"""
+    command: List[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float = 0.0
+    timed_out: bool = False
+    truncated: bool = False
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Legacy run_command() result shape"""
+        return {
+            'success': self.success,
+            'returncode': self.returncode,
+            'stdout': self.stdout,
+            'stderr': self.stderr,
+            'duration': round(self.duration, 3),
+            'timed_out': self.timed_out,
+        }
+
+
+class _BoundedCapture:
+    """Keeps the last `limit` bytes of a stream"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.chunks: deque = deque()
+        self.size = 0
+        self.truncated = False
+
+    def add(self, chunk: bytes):
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        while self.size > self.limit and self.chunks:
+            overflow = self.size - self.limit
+            head = self.chunks[0]
+            if len(head) <= overflow:
+                self.chunks.popleft()
+                self.size -= len(head)
+            else:
+                self.chunks[0] = head[overflow:]
+                self.size -= overflow
+            self.truncated = True
+
+    def text(self) -> str:
+        return b''.join(self.chunks).decode('utf-8', errors='replace')
+
+
+class CommandRunner:
+    """Runs subprocesses on a private event loop - no thread is pinned per command"""
+
+    def __init__(self, max_concurrent: int = 4, output_limit: int = 256 * 1024):
+        self.max_concurrent = max(1, max_concurrent)
+        self.output_limit = output_limit
+
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._thread = threading.Thread(target=self._run_loop, name="CommandRunner", daemon=True)
+        self._thread.start()
+
+        self.stats = {
+            'started': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'timed_out': 0,
+            'running': 0,
+            'queued': 0,
+        }
+
+    async def run_async(self, command: List[str], timeout: Optional[float] = 30, cwd: Optional[str] = None,
+                        env: Optional[Dict[str, str]] = None, on_stdout: Optional[LineCallback] = None,
+                        on_stderr: Optional[LineCallback] = None) -> CommandResult:
+        """Run a command on the runner's loop, calling back per output line"""
+        self.stats['queued'] += 1
+        async with self._semaphore:
+            self.stats['queued'] -= 1
+            self.stats['running'] += 1
+            try:
+                return await self._execute(command, timeout, cwd, env, on_stdout, on_stderr)
+            finally:
+                self.stats['running'] -= 1
+
+    def submit(self, command: List[str], timeout: Optional[float] = 30, cwd: Optional[str] = None,
+               env: Optional[Dict[str, str]] = None, on_stdout: Optional[LineCallback] = None,
+               on_stderr: Optional[LineCallback] = None) -> concurrent.futures.Future:
+        """Queue a command from any thread; the future resolves to a CommandResult"""
+        return asyncio.run_coroutine_threadsafe(
+            self.run_async(command, timeout, cwd, env, on_stdout, on_stderr), self._loop
+        )
+
+    def run(self, command: List[str], timeout: Optional[float] = 30, cwd: Optional[str] = None,
+            env: Optional[Dict[str, str]] = None, on_stdout: Optional[LineCallback] = None,
+            on_stderr: Optional[LineCallback] = None) -> CommandResult:
+        """Blocking wrapper for thread-based callers"""
+        if threading.get_ident() == self._thread.ident:
+            raise RuntimeError("CommandRunner.run() called from the runner loop - await run_async() instead")
+        return self.submit(command, timeout, cwd, env, on_stdout, on_stderr).result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'max_concurrent': self.max_concurrent}
+
+    def close(self):
+        """Stop the loop - commands still running are killed with their process groups"""
+        async def cancel_all():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self._loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(cancel_all(), self._loop).result(timeout=5)
+            except Exception as e:
+                logging.warning(f"⚠️ Command runner shutdown incomplete: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    async def _execute(self, command, timeout, cwd, env, on_stdout, on_stderr) -> CommandResult:
+        start = time.perf_counter()
+        self.stats['started'] += 1
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd,
+                env=env,
+                start_new_session=True  # Own process group so a timeout kills FFmpeg's helpers too
+            )
+        except (OSError, ValueError) as e:
+            self.stats['failed'] += 1
+            return CommandResult(command, -1, '', str(e), time.perf_counter() - start)
+
+        stdout, stderr = _BoundedCapture(self.output_limit), _BoundedCapture(self.output_limit)
+
+        async def finish():
+            await asyncio.gather(
+                self._pump(process.stdout, stdout, on_stdout),
+                self._pump(process.stderr, stderr, on_stderr),
+            )
+            await process.wait()
+
+        task = asyncio.ensure_future(finish())
+        timed_out = False
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            self._kill_group(process.pid)
+            try:
+                # Pipes close once the whole group is gone
+                await asyncio.wait_for(task, 5)
+            except asyncio.TimeoutError:
+                await process.wait()
+        except asyncio.CancelledError:
+            self._kill_group(process.pid)
+            task.cancel()
+            raise
+
+        result = CommandResult(
+            command=command,
+            returncode=-1 if timed_out else process.returncode,
+            stdout=stdout.text(),
+            stderr=f"Command timed out after {timeout} seconds" if timed_out else stderr.text(),
+            duration=time.perf_counter() - start,
+            timed_out=timed_out,
+            truncated=stdout.truncated or stderr.truncated,
+        )
+        if timed_out:
+            self.stats['timed_out'] += 1
+        self.stats['succeeded' if result.success else 'failed'] += 1
+        return result
+
+    async def _pump(self, stream: asyncio.StreamReader, capture: _BoundedCapture, callback: Optional[LineCallback]):
+        pending = b''
+        while True:
+            chunk = await stream.read(READ_SIZE)
+            if not chunk:
+                break
+            capture.add(chunk)
+            if callback:
+                pending += chunk
+                *lines, pending = pending.split(b'\n')
+                for line in lines:
+                    self._emit(callback, line)
+                if len(pending) > self.output_limit:
+                    self._emit(callback, pending)
+                    pending = b''
+        if callback and pending:
+            self._emit(callback, pending)
+
+    @staticmethod
+    def _emit(callback: LineCallback, line: bytes):
+        try:
+            callback(line.decode('utf-8', errors='replace').rstrip('\r'))
+        except Exception as e:
+            logging.error(f"❌ Command output callback failed: {e}")
+
+    @staticmethod
+    def _kill_group(pid: int):
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+
+# Global instance management
+_command_runner: Optional[CommandRunner] = None
+_command_runner_lock = threading.Lock()
+
+
+def init_command_runner() -> CommandRunner:
+    """Initialize global command runner from config"""
+    global _command_runner
+    from config import get_config
+    config = get_config()
+    with _command_runner_lock:
+        _command_runner = CommandRunner(
+            max_concurrent=config.command_max_concurrent,
+            output_limit=config.command_output_limit_kb * 1024
+        )
+    return _command_runner
+
+
+def get_command_runner() -> CommandRunner:
+    """Get global command runner, creating a default one for early callers"""
+    global _command_runner
+    with _command_runner_lock:
+        if _command_runner is None:
+            _command_runner = CommandRunner()
+        return _command_runner
@@ -6,8 +6,38 @@ Simple FFmpeg Direct Streaming Configuration
 
 import os
 import logging
-from dataclasses import dataclass
-from typing import Optional
+import threading
+from dataclasses import dataclass, field, fields
+from typing import Optional, Callable, Dict, Any, List, Tuple
+
+
+# Identity fields and runtime state - never changed by UPDATE_SETTINGS
+IMMUTABLE_SETTINGS = {'vps_id', 'agent_id', 'agent_version', 'config_version', 'env_overrides'}
+
+# Read once when a connection, pool or server is built - stored live but applied on agent restart
+RESTART_REQUIRED_SETTINGS = {
+    'redis_host', 'redis_port', 'redis_db', 'redis_password', 'redis_max_connections',
+    'base_download_dir', 'max_concurrent_downloads', 'download_chunk_workers', 'hash_workers',
+    'hash_cache_path', 'hash_algorithm', 'bandwidth_scheduler_enabled', 'report_spool_dir',
+    'metrics_enabled', 'metrics_host', 'metrics_port', 'metrics_memory_budget_mb',
+    'metrics_fine_span', 'metrics_coarse_resolution', 'metrics_coarse_span', 'metrics_sample_interval',
+    'command_max_concurrent', 'command_output_limit_kb', 'preflight_workers', 'command_workers', 'auto_tune',
+}
+
+# Intervals and rates where zero or less would stall a loop
+POSITIVE_SETTINGS = {
+    'stats_report_interval', 'progress_throttle_interval', 'heartbeat_interval', 'heartbeat_max_interval',
+    'stats_max_interval', 'report_max_staleness', 'report_rate_scale', 'ffmpeg_health_check_interval',
+    'ffmpeg_max_retries', 'process_sample_interval', 'stats_sample_interval', 'bandwidth_interval',
+    'cache_check_interval', 'download_timeout', 'preflight_timeout', 'prepare_timeout',
+    'watchdog_check_interval', 'watchdog_grace_seconds', 'ffmpeg_restart_delay', 'ffmpeg_reconnect_delay',
+    # Sizes where zero would divide by zero, block every caller or (for the floor) mean unlimited
+    'report_batch_max', 'report_max_buffer', 'max_concurrent_downloads', 'download_chunk_workers',
+    'download_chunk_size_mb', 'hash_workers', 'preflight_workers', 'command_workers', 'command_max_concurrent',
+    'bandwidth_min_download_mbps',
+}
+
+ConfigSubscriber = Callable[[Dict[str, Tuple[Any, Any]], int], None]
 
 
 @dataclass
@@ -26,6 +56,10 @@ class Config:
     redis_port: int = 6379
     redis_db: int = 0
     redis_password: Optional[str] = None
+    redis_max_connections: int = 20
+    redis_health_check_interval: int = 15       # Ping interval for the shared pool (seconds)
+    redis_reconnect_base_delay: float = 1.0     # First reconnect backoff step (seconds)
+    redis_reconnect_max_delay: float = 30.0     # Reconnect backoff ceiling (seconds)
     
     # Laravel communication
     laravel_base_url: str = "http://localhost"
@@ -36,48 +70,195 @@ class Config:
     max_concurrent_downloads: int = 3
     download_timeout: int = 300
     cleanup_after_hours: int = 24
+    download_inputs_locally: bool = False        # Fetch inputs before START_STREAM instead of streaming over HTTP
+    download_chunk_workers: int = 4              # Parallel range requests per file
+    download_chunk_size_mb: int = 8              # Range size (also the resume granularity)
+    download_bandwidth_limit_mbps: float = 0.0   # Shared across all downloads, 0 = unlimited
+    download_progress_interval: int = 5          # Seconds between DOWNLOADING progress reports
+    cache_low_watermark_percent: float = 10.0    # Start LRU eviction when free space drops below this
+    cache_high_watermark_percent: float = 20.0   # Evict until free space is back above this
+    cache_check_interval: int = 60               # Free-space check period; downloads also wake the evictor
+
+    # One-time remux of downloaded inputs (faststart MP4, normalised timestamps)
+    prepare_inputs: bool = False
+    prepare_timeout: int = 600
+
+    # File hashing service
+    hash_algorithm: str = "auto"                 # auto = xxh3_128 when xxhash is installed, else blake2b
+    hash_workers: int = 2
+    hash_cache_path: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hash_cache.json')
+
+    # Download bandwidth scheduling against live stream egress
+    bandwidth_scheduler_enabled: bool = True
+    network_capacity_mbps: float = 0.0           # 0 = detect from the NIC link speed
+    bandwidth_target_utilization: float = 0.8    # Share of the link live traffic plus downloads may use
+    bandwidth_min_download_mbps: float = 2.0     # Downloads never stall completely
+    bandwidth_degraded_speed: float = 0.95       # A stream below this FFmpeg speed triggers backoff
+    bandwidth_backoff_hold: int = 30             # Seconds before ramping up again after a backoff
+    bandwidth_interval: float = 2.0
+
+    # Input URL preflight before START_STREAM
+    preflight_enabled: bool = True
+    preflight_timeout: float = 5.0               # Per-URL HEAD / range-GET timeout
+    preflight_workers: int = 8                   # Concurrent checks per START_STREAM
+    preflight_cache_ttl: int = 300               # Reachable results reused for this long
+    preflight_negative_ttl: int = 30             # Failures re-checked sooner
     
     # Reporting intervals
     stats_report_interval: int = 15       # 15 seconds
     heartbeat_interval: int = 5           # 5 seconds
+    heartbeat_full_snapshot_every: int = 12  # Full stream list every N beats, diffs in between
     progress_throttle_interval: int = 2   # 2 seconds
+
+    # Adaptive reporting - intervals above are the fast cadence, backing off to these while steady
+    heartbeat_max_interval: int = 60
+    stats_max_interval: int = 60
+    report_max_staleness: int = 60        # Hard upper bound for any periodic report (seconds)
+    report_rate_scale: float = 1.0        # Server-sent hint scaling the fast cadence with fleet size
+
+    # Host sampling
+    stats_sample_interval: float = 2.0    # Background counter sampling period
+    stats_history_size: int = 150         # Samples kept in the ring buffer (5 minutes)
+    stats_ewma_alpha: float = 0.3         # Smoothing factor for rates and utilisation
+
+    # Report publishing
+    report_flush_interval: float = 0.2    # Coalescing window before a pipelined flush
+    report_max_buffer: int = 500          # Flush early once this many reports are pending
+    report_batch_enabled: bool = False    # Send grouped STATUS_UPDATEs as one STATUS_BATCH
+    report_batch_max: int = 100           # Max updates per STATUS_BATCH message
+    report_spool_dir: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spool')
+    report_spool_max_bytes: int = 16 * 1024 * 1024  # Oldest segments dropped past this size
+    report_spool_replay_rate: int = 200   # Reports per second when draining the spool
+    report_spool_max_age: int = 3600      # Spooled reports older than this are not replayed
     
+    # Local OpenMetrics endpoint (off by default)
+    metrics_enabled: bool = False
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9469
+
+    # In-agent metrics history (GET_METRICS)
+    metrics_sample_interval: int = 10     # Fine tier resolution (seconds)
+    metrics_fine_span: int = 3600         # Fine tier kept for 1 hour
+    metrics_coarse_resolution: int = 60   # Coarse tier resolution (seconds)
+    metrics_coarse_span: int = 86400      # Coarse tier kept for 1 day
+    metrics_memory_budget_mb: int = 32    # Series memory cap across all streams
+    metrics_max_events: int = 200         # Restart/error events kept per stream
+    metrics_response_ttl: int = 300       # GET_METRICS results kept in Redis (seconds)
+
     # Simple FFmpeg Direct Streaming settings
     ffmpeg_reconnect_delay: int = 5                 # FFmpeg reconnect delay (seconds)
     ffmpeg_health_check_interval: int = 30          # FFmpeg health check interval (seconds)
     ffmpeg_max_retries: int = 5                     # Max restart attempts per stream
     ffmpeg_restart_delay: int = 10                  # Delay between restart attempts (seconds)
+    process_sample_interval: int = 5                # One /proc pass over all FFmpeg children (seconds)
+
+    # Redis command dispatch
+    command_workers: int = 5                        # Commands handled concurrently
+
+    # External commands (ffprobe, remux) share one runner
+    command_max_concurrent: int = 4                 # Commands running at once; the rest queue
+    command_output_limit_kb: int = 256              # Tail of stdout and of stderr kept per command
+
+    # Hot-path timers (exported with stats; UPDATE_SETTINGS can switch them off)
+    instrumentation_enabled: bool = True
+    instrumentation_slow_seconds: float = 10.0      # Timed operations slower than this are logged
+
+    # Self-watchdog over long-running loops (systemd WATCHDOG=1 when WatchdogSec is set)
+    watchdog_enabled: bool = True                   # Loop checks; systemd is pinged either way
+    watchdog_check_interval: float = 2.0
+    watchdog_grace_seconds: int = 30                # Added to each loop's own interval before it counts as stuck
+    watchdog_max_restarts: int = 3                  # Restarts before a stuck stream is stopped or a core loop is left to systemd
+    watchdog_stack_dump_interval: int = 60          # At most one all-thread stack dump per this many seconds
+
+    # Host-aware defaults - pools, cadence and budgets derived from the host at startup
+    auto_tune: bool = True
+
+    # Runtime config versioning - bumped on every applied UPDATE_SETTINGS change
+    config_version: int = 0
+    env_overrides: set = field(default_factory=set, repr=False, compare=False)  # Fields set via environment
+    _subscribers: List[ConfigSubscriber] = field(default_factory=list, init=False, repr=False, compare=False)
+    _update_lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False, compare=False)
+
+    def subscribe(self, callback: ConfigSubscriber):
+        """Call callback(changes, version) after each applied update; changes maps key -> (old, new)"""
+        with self._update_lock:
+            self._subscribers.append(callback)
 
     def update_from_laravel_settings(self, settings: dict):
-        """Update config from Laravel settings"""
+        """Update config from Laravel settings - any dataclass field except identity ones"""
+        changes: Dict[str, Tuple[Any, Any]] = {}
         updated_settings = []
 
-        # FFmpeg settings
-        if 'ffmpeg_reconnect_delay' in settings:
-            old_delay = self.ffmpeg_reconnect_delay
-            self.ffmpeg_reconnect_delay = int(settings['ffmpeg_reconnect_delay'])
-            if old_delay != self.ffmpeg_reconnect_delay:
-                updated_settings.append(f"ffmpeg_reconnect_delay: {old_delay} → {self.ffmpeg_reconnect_delay}")
-
-        if 'ffmpeg_max_retries' in settings:
-            old_retries = self.ffmpeg_max_retries
-            self.ffmpeg_max_retries = int(settings['ffmpeg_max_retries'])
-            if old_retries != self.ffmpeg_max_retries:
-                updated_settings.append(f"ffmpeg_max_retries: {old_retries} → {self.ffmpeg_max_retries}")
-
-        # Heartbeat interval
-        if 'heartbeat_interval' in settings:
-            old_interval = self.heartbeat_interval
-            self.heartbeat_interval = int(settings['heartbeat_interval'])
-            if old_interval != self.heartbeat_interval:
-                updated_settings.append(f"heartbeat_interval: {old_interval} → {self.heartbeat_interval}")
+        with self._update_lock:
+            staged: Dict[str, Any] = {}
+            for setting in fields(self):
+                key = setting.name
+                if key not in settings or key.startswith('_') or key in IMMUTABLE_SETTINGS:
+                    continue
+                try:
+                    new_value = self._cast_setting(setting.type, settings[key])
+                except (TypeError, ValueError) as e:
+                    logging.warning(f"⚠️ Ignoring invalid {key} from Laravel: {settings[key]!r} ({e})")
+                    continue
+                if isinstance(new_value, (int, float)) and not isinstance(new_value, bool):
+                    if new_value < 0 or (new_value == 0 and key in POSITIVE_SETTINGS):
+                        logging.warning(f"⚠️ Ignoring out-of-range {key} from Laravel: {new_value}")
+                        continue
+
+                old_value = getattr(self, key)
+                if old_value == new_value:
+                    continue
+                staged[key] = new_value
+                changes[key] = (old_value, new_value)
+                shown = '***' if 'password' in key or 'token' in key else f"{old_value} → {new_value}"
+                note = ' (applies on agent restart)' if key in RESTART_REQUIRED_SETTINGS else ''
+                updated_settings.append(f"{key}: {shown}{note}")
+
+            ignored = [k for k in settings if k in IMMUTABLE_SETTINGS or not hasattr(self, k)]
+            if ignored:
+                logging.debug(f"Ignoring unknown or immutable settings: {', '.join(ignored)}")
+
+            if not changes:
+                return []
+
+            # Check the values as they would be after the update - a pair can be valid only together
+            errors = self._validation_errors({**self._values(), **staged})
+            if errors:
+                logging.error(f"❌ Rejecting settings update from Laravel: {'; '.join(errors)}")
+                return []
+
+            for key, value in staged.items():
+                setattr(self, key, value)
+
+            self.config_version += 1
+            version = self.config_version
+            subscribers = list(self._subscribers)
 
         # Log all changes
-        if updated_settings:
-            logging.info(f"🔧 Settings updated from Laravel: {', '.join(updated_settings)}")
-            return updated_settings
-
-        return []
+        logging.info(f"🔧 Settings updated from Laravel (config v{version}): {', '.join(updated_settings)}")
+
+        for callback in subscribers:
+            try:
+                callback(changes, version)
+            except Exception as e:
+                logging.error(f"❌ Config subscriber {getattr(callback, '__qualname__', callback)} failed: {e}")
+
+        return updated_settings
+
+    @staticmethod
+    def _cast_setting(field_type: Any, value: Any) -> Any:
+        """Coerce a JSON/string setting to the field's annotated type"""
+        if field_type is bool:
+            return value.strip().lower() in ('1', 'true', 'yes', 'on') if isinstance(value, str) else bool(value)
+        if field_type is int:
+            return int(float(value))
+        if field_type is float:
+            return float(value)
+        if value is None:
+            if field_type is str:
+                raise ValueError("null is not allowed")
+            return None  # Optional[...] fields
+        return str(value)
 
     def get_redis_config(self) -> dict:
         """Get Redis configuration"""
@@ -113,6 +294,26 @@ class Config:
             'timeout': 30
         }
 
+    def _values(self) -> Dict[str, Any]:
+        return {setting.name: getattr(self, setting.name) for setting in fields(self)}
+
+    @staticmethod
+    def _validation_errors(values: Dict[str, Any]) -> List[str]:
+        """Problems with a full set of field values - the live config or a merged Laravel update"""
+        errors = []
+
+        # Validate FFmpeg settings
+        if values['ffmpeg_max_retries'] <= 0:
+            errors.append(f"Invalid FFmpeg max retries: {values['ffmpeg_max_retries']}")
+        if values['ffmpeg_restart_delay'] <= 0:
+            errors.append(f"Invalid FFmpeg restart delay: {values['ffmpeg_restart_delay']}")
+
+        # Eviction runs from below the low watermark up to the high one
+        if not values['cache_low_watermark_percent'] < values['cache_high_watermark_percent']:
+            errors.append(f"Cache low watermark {values['cache_low_watermark_percent']}% must be below "
+                          f"high watermark {values['cache_high_watermark_percent']}%")
+        return errors
+
     def validate(self) -> bool:
         """Validate configuration"""
         try:
@@ -121,13 +322,10 @@ class Config:
                 os.makedirs(self.base_download_dir, exist_ok=True)
                 logging.info(f"📁 Created download directory: {self.base_download_dir}")
 
-            # Validate FFmpeg settings
-            if self.ffmpeg_max_retries <= 0:
-                logging.error(f"❌ Invalid FFmpeg max retries: {self.ffmpeg_max_retries}")
-                return False
-
-            if self.ffmpeg_restart_delay <= 0:
-                logging.error(f"❌ Invalid FFmpeg restart delay: {self.ffmpeg_restart_delay}")
+            errors = self._validation_errors(self._values())
+            if errors:
+                for error in errors:
+                    logging.error(f"❌ {error}")
                 return False
 
             logging.info("✅ Configuration validated successfully")
@@ -155,6 +353,29 @@ class Config:
 
         # File management
         self.base_download_dir = os.getenv('DOWNLOAD_DIR', self.base_download_dir)
+        self.download_inputs_locally = os.getenv('DOWNLOAD_INPUTS_LOCALLY', str(self.download_inputs_locally)).lower() in ('1', 'true', 'yes')
+        self.download_bandwidth_limit_mbps = float(os.getenv('DOWNLOAD_BANDWIDTH_LIMIT_MBPS', self.download_bandwidth_limit_mbps))
+        self.instrumentation_enabled = os.getenv('INSTRUMENTATION_ENABLED', str(self.instrumentation_enabled)).lower() in ('1', 'true', 'yes')
+
+        # Report publishing
+        self.report_flush_interval = float(os.getenv('REPORT_FLUSH_INTERVAL', self.report_flush_interval))
+        self.report_batch_enabled = os.getenv('REPORT_BATCH_ENABLED', str(self.report_batch_enabled)).lower() in ('1', 'true', 'yes')
+        self.report_spool_dir = os.getenv('REPORT_SPOOL_DIR', self.report_spool_dir)
+
+        # Metrics endpoint
+        self.metrics_enabled = os.getenv('METRICS_ENABLED', str(self.metrics_enabled)).lower() in ('1', 'true', 'yes')
+        self.metrics_port = int(os.getenv('METRICS_PORT', self.metrics_port))
+
+        # Any other field by its upper-case name, e.g. MAX_CONCURRENT_DOWNLOADS=6 - these also pin auto-tuning
+        for setting in fields(self):
+            key = setting.name
+            if key.startswith('_') or key in IMMUTABLE_SETTINGS or key.upper() not in os.environ:
+                continue
+            try:
+                setattr(self, key, self._cast_setting(setting.type, os.environ[key.upper()]))
+                self.env_overrides.add(key)
+            except (TypeError, ValueError) as e:
+                logging.warning(f"⚠️ Ignoring invalid {key.upper()} from environment: {e}")
 
         logging.info("🔧 Configuration loaded from environment")
 
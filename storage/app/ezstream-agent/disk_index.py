@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Disk Usage Index
+In-memory per-directory size index for the download cache, built once with
+os.scandir and kept current by the agent's own writes plus inotify
+"""
+
+import os
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# Size changes are picked up on close - IN_MODIFY would fire for every chunk written
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Minimal ctypes binding - None from create() where inotify is unavailable"""
+
+    def __init__(self, libc, fd: int):
+        self.libc = libc
+        self.fd = fd
+
+    @classmethod
+    def create(cls) -> Optional['_Inotify']:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            return cls(libc, fd)
+        except (OSError, AttributeError):
+            return None
+
+    def add_watch(self, path: str) -> int:
+        return self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+
+    def read_events(self, timeout: float):
+        """Yield (wd, mask, name) for events arriving within timeout"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            yield wd, mask, name
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class DiskUsageIndex:
+    """Size of every top-level directory under base_dir, updated incrementally"""
+
+    def __init__(self, base_dir: str, rescan_interval: int = 3600):
+        self.base_dir = os.path.abspath(base_dir)
+        self.rescan_interval = rescan_interval
+
+        # top-level dir name -> {relative file path -> size}
+        self.files: Dict[str, Dict[str, int]] = {}
+        self.dir_bytes: Dict[str, int] = {}
+        self.dir_mtime: Dict[str, float] = {}
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.running = False
+        self.watch_thread = None
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[int, str] = {}
+
+        self.stats = {
+            'builds': 0,
+            'last_build_ms': 0.0,
+            'events': 0,
+            'overflows': 0,
+        }
+
+    def start(self):
+        """Build the index and start watching for outside changes"""
+        if self.running:
+            return
+
+        self.running = True
+        self._inotify = _Inotify.create()
+        self.build()
+
+        self.watch_thread = threading.Thread(
+            target=self._watch_loop,
+            name="DiskIndexWatcher",
+            daemon=True
+        )
+        self.watch_thread.start()
+        mode = "inotify" if self._inotify else f"rescan every {self.rescan_interval}s"
+        logging.info(f"🗂️ Disk usage index ready: {len(self.files)} dirs, {self.total_bytes} bytes ({mode})")
+
+    def stop(self):
+        """Stop watching"""
+        self.running = False
+        if self.watch_thread:
+            self.watch_thread.join(timeout=2)
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def build(self):
+        """Full scandir walk - replaces the index wholesale"""
+        start = time.perf_counter()
+        files: Dict[str, Dict[str, int]] = {}
+        mtimes: Dict[str, float] = {}
+
+        self._watches.clear()
+        self._add_watch(self.base_dir)
+        try:
+            with os.scandir(self.base_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        files[entry.name] = {}
+                        mtimes[entry.name] = entry.stat(follow_symlinks=False).st_mtime
+                        self._scan(entry.path, entry.name, '', files[entry.name], mtimes)
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self.files = files
+            self.dir_mtime = mtimes
+            self.dir_bytes = {name: sum(sizes.values()) for name, sizes in files.items()}
+            self.total_bytes = sum(self.dir_bytes.values())
+
+        self.stats['builds'] += 1
+        self.stats['last_build_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    def get_dir_size(self, path: str) -> int:
+        """Bytes under a top-level directory of base_dir"""
+        with self._lock:
+            return self.dir_bytes.get(os.path.basename(os.path.normpath(path)), 0)
+
+    def list_dirs(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of every top-level directory with size and last change time"""
+        with self._lock:
+            return {
+                name: {'bytes': self.dir_bytes.get(name, 0), 'files': len(sizes), 'mtime': self.dir_mtime.get(name, 0.0)}
+                for name, sizes in self.files.items()
+            }
+
+    def iter_files(self):
+        """Snapshot of (absolute path, size) for every indexed file"""
+        with self._lock:
+            return [
+                (os.path.join(self.base_dir, top, rel), size)
+                for top, sizes in self.files.items()
+                for rel, size in sizes.items()
+            ]
+
+    def record_file(self, path: str):
+        """Stat a file the agent just wrote (or removed) and update its entry"""
+        located = self._locate(path)
+        if located is None:
+            return
+        top, rel = located
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._set(top, rel, None)
+            return
+        self._set(top, rel, st.st_size, st.st_mtime)
+
+    def forget(self, path: str):
+        """Drop a removed file or directory (a top-level dir drops all its files)"""
+        located = self._locate(path)
+        if located is None:
+            return
+        top, rel = located
+        with self._lock:
+            sizes = self.files.get(top)
+            if sizes is None:
+                return
+            if not rel:
+                self.total_bytes -= self.dir_bytes.pop(top, 0)
+                self.files.pop(top, None)
+                self.dir_mtime.pop(top, None)
+                return
+            prefix = rel + os.sep
+            for key in [k for k in sizes if k == rel or k.startswith(prefix)]:
+                size = sizes.pop(key)
+                self.dir_bytes[top] -= size
+                self.total_bytes -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index footprint and totals for stats reports"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({
+                'dirs': len(self.files),
+                'files': sum(len(sizes) for sizes in self.files.values()),
+                'total_bytes': self.total_bytes,
+                'watching': self._inotify is not None,
+            })
+        return stats
+
+    def _scan(self, path: str, top: str, rel: str, sizes: Dict[str, int], mtimes: Dict[str, float]):
+        self._add_watch(path)
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    entry_rel = os.path.join(rel, entry.name) if rel else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            self._scan(entry.path, top, entry_rel, sizes, mtimes)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            sizes[entry_rel] = st.st_size
+                            mtimes[top] = max(mtimes.get(top, 0.0), st.st_mtime)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+
+    def _set(self, top: str, rel: str, size: Optional[int], mtime: Optional[float] = None):
+        with self._lock:
+            sizes = self.files.setdefault(top, {})
+            self.dir_bytes.setdefault(top, 0)
+            old = sizes.pop(rel, 0)
+            self.dir_bytes[top] -= old
+            self.total_bytes -= old
+            if size is not None:
+                sizes[rel] = size
+                self.dir_bytes[top] += size
+                self.total_bytes += size
+            self.dir_mtime[top] = max(self.dir_mtime.get(top, 0.0), mtime or time.time())
+
+    def _locate(self, path: str) -> Optional[tuple]:
+        """(top-level dir name, path relative to it) or None when outside base_dir"""
+        rel = os.path.relpath(os.path.abspath(path), self.base_dir)
+        if rel == '.' or rel.startswith('..'):
+            return None
+        top, _, rest = rel.partition(os.sep)
+        return top, rest
+
+    def _add_watch(self, path: str):
+        if self._inotify is None:
+            return
+        wd = self._inotify.add_watch(path)
+        if wd >= 0:
+            self._watches[wd] = path
+
+    def _watch_loop(self):
+        last_build = time.monotonic()
+
+        while self.running:
+            if self._inotify is None:
+                time.sleep(1)
+                if time.monotonic() - last_build >= self.rescan_interval:
+                    self.build()
+                    last_build = time.monotonic()
+                continue
+
+            try:
+                for wd, mask, name in self._inotify.read_events(1.0):
+                    self.stats['events'] += 1
+                    self._handle_event(wd, mask, name)
+            except Exception as e:
+                logging.error(f"❌ Disk index watcher error, rebuilding: {e}")
+                self.build()
+
+    def _handle_event(self, wd: int, mask: int, name: str):
+        if mask & IN_Q_OVERFLOW:
+            self.stats['overflows'] += 1
+            logging.warning("⚠️ Disk index inotify queue overflowed - rebuilding")
+            self.build()
+            return
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+
+        parent = self._watches.get(wd)
+        if parent is None or not name:
+            return
+        path = os.path.join(parent, name)
+
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                located = self._locate(path)
+                if located is None:
+                    return
+                top, rel = located
+                sizes, mtimes = {}, {}
+                self._scan(path, top, rel, sizes, mtimes)
+                with self._lock:
+                    self.files.setdefault(top, {})
+                    self.dir_bytes.setdefault(top, 0)
+                    self.dir_mtime[top] = max(self.dir_mtime.get(top, 0.0), mtimes.get(top, time.time()))
+                for file_rel, size in sizes.items():
+                    self._set(top, file_rel, size)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self.forget(path)
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            self.forget(path)
+        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE):
+            self.record_file(path)
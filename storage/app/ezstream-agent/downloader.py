@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Download Engine
+Parallel HTTP range downloads with resume, pooled keep-alive sessions,
+a global concurrency cap and a shared bandwidth limit
+"""
+
+import os
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import safe_json_dumps, safe_json_loads, ensure_directory, TokenBucket
+
+
+PART_SUFFIX = '.part'
+STATE_SUFFIX = '.part.json'
+READ_SIZE = 256 * 1024
+
+
+class DownloadError(Exception):
+    """Download could not be completed"""
+
+
+@dataclass
+class DownloadProgress:
+    """Live progress of one file download"""
+    url: str
+    path: str
+    total_bytes: int = 0
+    done_bytes: int = 0
+    started_at: float = field(default_factory=time.time)
+    resumed_bytes: int = 0
+    ranged: bool = False
+
+    @property
+    def percent(self) -> float:
+        return round(self.done_bytes / self.total_bytes * 100, 1) if self.total_bytes else 0.0
+
+    @property
+    def rate_mbps(self) -> float:
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        return round((self.done_bytes - self.resumed_bytes) * 8 / elapsed / 1e6, 2)
+
+
+class ChunkedDownloader:
+    """Downloads files in parallel byte ranges, resuming from a sidecar state file"""
+
+    def __init__(self, max_concurrent: int = 3, chunk_workers: int = 4, chunk_size: int = 8 * 1024 * 1024,
+                 bandwidth_limit: float = 0, timeout: int = 300, state_interval: float = 1.0):
+        self.max_concurrent = max(1, max_concurrent)
+        self.chunk_workers = max(1, chunk_workers)
+        self.chunk_size = max(READ_SIZE, chunk_size)
+        self.timeout = timeout
+        self.state_interval = state_interval
+
+        # Shared by every chunk worker; the bandwidth scheduler adjusts its rate
+        self.limiter = TokenBucket(bandwidth_limit)
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+
+        # One keep-alive pool for every download, sized for all chunk workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_concurrent,
+                              pool_maxsize=self.max_concurrent * self.chunk_workers,
+                              max_retries=2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.active: Dict[str, DownloadProgress] = {}
+        self._active_lock = threading.Lock()
+
+        self.stats = {
+            'completed': 0,
+            'failed': 0,
+            'resumed': 0,
+            'bytes_downloaded': 0,
+        }
+
+    def download(self, url: str, path: str,
+                 on_progress: Optional[Callable[[DownloadProgress], None]] = None) -> DownloadProgress:
+        """Download url to path, blocking until done. Raises DownloadError on failure."""
+        if os.path.isfile(path):
+            size = os.path.getsize(path)
+            return DownloadProgress(url=url, path=path, total_bytes=size, done_bytes=size, resumed_bytes=size)
+
+        ensure_directory(os.path.dirname(path) or '.')
+
+        # Wait for a slot - the cap is global across streams
+        with self._slots:
+            progress = DownloadProgress(url=url, path=path)
+            with self._active_lock:
+                self.active[path] = progress
+            try:
+                self._download(progress, on_progress)
+                self.stats['completed'] += 1
+                return progress
+            except DownloadError:
+                self.stats['failed'] += 1
+                raise
+            except Exception as e:
+                self.stats['failed'] += 1
+                raise DownloadError(f"{url}: {e}") from e
+            finally:
+                with self._active_lock:
+                    self.active.pop(path, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters plus in-flight downloads"""
+        with self._active_lock:
+            active = [
+                {'path': p.path, 'percent': p.percent, 'rate_mbps': p.rate_mbps}
+                for p in self.active.values()
+            ]
+        return {**self.stats, 'active': active, 'bandwidth_limit_mbps': round(self.limiter.rate * 8 / 1e6, 2)}
+
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
+
+    def _download(self, progress: DownloadProgress, on_progress):
+        part_path = progress.path + PART_SUFFIX
+        state_path = progress.path + STATE_SUFFIX
+
+        remote = self._probe(progress.url)
+        progress.total_bytes = remote['size']
+        progress.ranged = remote['ranged']
+
+        if not remote['ranged'] or not remote['size']:
+            self._download_single(progress, part_path, on_progress)
+        else:
+            state = self._load_state(state_path, remote)
+            if state is None or not os.path.exists(part_path):
+                state = self._new_state(remote)
+                with open(part_path, 'wb') as f:
+                    f.truncate(remote['size'])
+            else:
+                self.stats['resumed'] += 1
+                logging.info(f"⏯️ [DOWNLOAD] Resuming {os.path.basename(progress.path)} "
+                             f"from {sum(c[2] for c in state['chunks'])}/{remote['size']} bytes")
+
+            self._download_ranged(progress, part_path, state_path, state, on_progress)
+
+        # Verify and publish the finished file atomically
+        actual = os.path.getsize(part_path)
+        if progress.total_bytes and actual != progress.total_bytes:
+            raise DownloadError(f"size mismatch for {progress.url}: {actual} != {progress.total_bytes}")
+        os.replace(part_path, progress.path)
+        self._remove(state_path)
+
+    def _probe(self, url: str) -> Dict[str, Any]:
+        """Ask for one byte to learn size, range support and validators"""
+        response = self.session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=self.timeout)
+        try:
+            response.raise_for_status()
+            headers = response.headers
+            ranged = response.status_code == 206 and 'Content-Range' in headers
+            if ranged:
+                size = int(headers['Content-Range'].rsplit('/', 1)[-1])
+            else:
+                size = int(headers.get('Content-Length') or 0)
+            return {
+                'url': url,
+                'size': size,
+                'ranged': ranged,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+            }
+        except (ValueError, KeyError) as e:
+            raise DownloadError(f"unusable range response from {url}: {e}") from e
+        finally:
+            response.close()
+
+    def _download_single(self, progress: DownloadProgress, part_path: str, on_progress):
+        """Plain GET for servers without range support - cannot resume"""
+        with self.session.get(progress.url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            with open(part_path, 'wb') as f:
+                for data in response.iter_content(READ_SIZE):
+                    self.limiter.consume(len(data))
+                    f.write(data)
+                    progress.done_bytes += len(data)
+                    self.stats['bytes_downloaded'] += len(data)
+                    if on_progress:
+                        on_progress(progress)
+        if not progress.total_bytes:
+            progress.total_bytes = progress.done_bytes
+
+    def _download_ranged(self, progress: DownloadProgress, part_path: str, state_path: str,
+                         state: Dict[str, Any], on_progress):
+        chunks = state['chunks']
+        progress.done_bytes = progress.resumed_bytes = sum(c[2] for c in chunks)
+        pending = [i for i, c in enumerate(chunks) if c[0] + c[2] <= c[1]]
+
+        lock = threading.Lock()
+        failed = threading.Event()
+        last_saved = [time.monotonic()]
+
+        def advance(index: int, amount: int):
+            with lock:
+                chunks[index][2] += amount
+                progress.done_bytes += amount
+                self.stats['bytes_downloaded'] += amount
+                if time.monotonic() - last_saved[0] >= self.state_interval:
+                    self._save_state(state_path, state)
+                    last_saved[0] = time.monotonic()
+            if on_progress:
+                on_progress(progress)
+
+        errors = []
+        fd = os.open(part_path, os.O_WRONLY)
+        try:
+            with ThreadPoolExecutor(max_workers=self.chunk_workers, thread_name_prefix="DownloadChunk") as pool:
+                futures = [
+                    pool.submit(self._fetch_chunk, progress.url, fd, index, chunks[index], state, advance, failed)
+                    for index in pending
+                ]
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failed.set()
+                        errors.append(e)
+        finally:
+            os.close(fd)
+            with lock:
+                self._save_state(state_path, state)
+
+        if errors:
+            raise DownloadError(f"{len(errors)} chunks failed for {progress.url}: {errors[0]}")
+
+    def _fetch_chunk(self, url: str, fd: int, index: int, chunk: List[int], state: Dict[str, Any],
+                     advance: Callable[[int, int], None], failed: threading.Event):
+        """Fetch the remainder of one chunk at its offset in the part file"""
+        start, end = chunk[0] + chunk[2], chunk[1]
+        if start > end or failed.is_set():
+            return
+
+        headers = {'Range': f'bytes={start}-{end}'}
+        if state.get('etag'):
+            headers['If-Range'] = state['etag']
+        elif state.get('last_modified'):
+            headers['If-Range'] = state['last_modified']
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code != 206:
+                raise DownloadError(f"range {start}-{end} returned HTTP {response.status_code} (file changed?)")
+
+            offset = start
+            for data in response.iter_content(READ_SIZE):
+                if failed.is_set():
+                    return
+                data = data[:end + 1 - offset]
+                if not data:
+                    break
+                self.limiter.consume(len(data))
+                os.pwrite(fd, data, offset)
+                offset += len(data)
+                advance(index, len(data))
+
+        if offset <= end:
+            raise DownloadError(f"range {start}-{end} ended early at {offset}")
+
+    def _new_state(self, remote: Dict[str, Any]) -> Dict[str, Any]:
+        size = remote['size']
+        chunks = [[start, min(start + self.chunk_size, size) - 1, 0] for start in range(0, size, self.chunk_size)]
+        return {**remote, 'chunks': chunks}
+
+    @staticmethod
+    def _load_state(state_path: str, remote: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Previous state if it still describes the same remote file"""
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = safe_json_loads(f.read())
+        except OSError:
+            return None
+
+        if not state or state.get('url') != remote['url'] or state.get('size') != remote['size']:
+            return None
+        for validator in ('etag', 'last_modified'):
+            if remote.get(validator) and state.get(validator) != remote[validator]:
+                return None
+        return state
+
+    @staticmethod
+    def _save_state(state_path: str, state: Dict[str, Any]):
+        tmp_path = state_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(safe_json_dumps(state))
+            os.replace(tmp_path, state_path)
+        except OSError as e:
+            logging.warning(f"⚠️ [DOWNLOAD] Could not save resume state {state_path}: {e}")
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent File Hasher
+mmap-backed hashing on a worker pool with a persistent cache keyed by
+(device, inode, size, mtime_ns) so unchanged files are never rehashed
+"""
+
+import os
+import sys
+import mmap
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, List, Optional, Callable
+
+from utils import safe_json_dumps, safe_json_loads, ensure_directory, calculate_file_hash
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+
+# Slice size fed to the digest - hashlib drops the GIL for large updates, so workers run in parallel
+BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def _new_digest(algorithm: str):
+    if algorithm == 'xxh3_128':
+        return xxhash.xxh3_128()
+    if algorithm == 'xxh64':
+        return xxhash.xxh64()
+    return hashlib.new(algorithm)
+
+
+def resolve_algorithm(name: str) -> str:
+    """'auto' picks xxh3_128 when xxhash is installed, else blake2b"""
+    if name == 'auto':
+        return 'xxh3_128' if XXHASH_AVAILABLE else 'blake2b'
+    if name.startswith('xxh') and not XXHASH_AVAILABLE:
+        logging.warning(f"⚠️ xxhash not installed, using blake2b instead of {name}")
+        return 'blake2b'
+    return name
+
+
+def hash_file(path: str, algorithm: str = 'blake2b') -> str:
+    """Digest of a file via mmap, falling back to large buffered reads"""
+    digest = _new_digest(algorithm)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return digest.hexdigest()
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, 'madvise'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, BLOCK_SIZE):
+                        digest.update(view[offset:offset + BLOCK_SIZE])
+                finally:
+                    view.release()
+        except (ValueError, OSError):
+            # Not mappable (special file, exotic filesystem) - read in large blocks
+            f.seek(0)
+            buffer = bytearray(BLOCK_SIZE)
+            view = memoryview(buffer)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                digest.update(view[:read])
+    return digest.hexdigest()
+
+
+class FileHasher:
+    """Thread-pooled hashing service with a stat-keyed persistent cache"""
+
+    def __init__(self, cache_path: Optional[str] = None, workers: int = 2, algorithm: str = 'auto',
+                 max_entries: int = 10000, save_interval: float = 30.0):
+        self.algorithm = resolve_algorithm(algorithm)
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="FileHasher")
+        self._cache: 'OrderedDict[str, str]' = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+        self.stats = {
+            'hashed': 0,
+            'cache_hits': 0,
+            'bytes_hashed': 0,
+            'hash_seconds': 0.0,
+        }
+
+        self._load()
+
+    def hash(self, path: str) -> Optional[str]:
+        """Digest of path, blocking - served from the cache when the file is unchanged"""
+        try:
+            return self.submit(path).result()
+        except Exception as e:
+            logging.error(f"Error hashing {path}: {e}")
+            return None
+
+    def hash_many(self, paths: List[str]) -> Dict[str, Optional[str]]:
+        """Digests of several files, hashed in parallel"""
+        futures = {path: self.submit(path) for path in paths}
+        results = {}
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                logging.error(f"Error hashing {path}: {e}")
+                results[path] = None
+        return results
+
+    def submit(self, path: str, callback: Optional[Callable[[str, str], None]] = None) -> Future:
+        """Queue a file for hashing; concurrent requests for the same file share one job"""
+        st = os.stat(path)
+        key = self._cache_key(st)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                future = Future()
+                future.set_result(cached)
+            else:
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._pool.submit(self._hash_and_cache, path, key, st.st_size)
+                    self._inflight[key] = future
+
+        if callback:
+            future.add_done_callback(lambda f: f.exception() is None and callback(path, f.result()))
+        return future
+
+    def lookup(self, path: str) -> Optional[str]:
+        """Cached digest for an unchanged file, without hashing"""
+        try:
+            key = self._cache_key(os.stat(path))
+        except OSError:
+            return None
+        with self._lock:
+            return self._cache.get(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hashing throughput and cache counters"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['algorithm'] = self.algorithm
+            stats['cached'] = len(self._cache)
+            stats['inflight'] = len(self._inflight)
+        seconds = stats['hash_seconds']
+        stats['throughput_mbps'] = round(stats['bytes_hashed'] / seconds / (1024**2), 1) if seconds else None
+        stats['hash_seconds'] = round(seconds, 3)
+        return stats
+
+    def close(self):
+        """Stop workers and persist the cache"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._save(force=True)
+
+    def _hash_and_cache(self, path: str, key: str, size: int) -> str:
+        try:
+            start = time.perf_counter()
+            digest = hash_file(path, self.algorithm)
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._cache[key] = digest
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+                self._dirty = True
+                self.stats['hashed'] += 1
+                self.stats['bytes_hashed'] += size
+                self.stats['hash_seconds'] += elapsed
+
+            self._save()
+            return digest
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _cache_key(self, st: os.stat_result) -> str:
+        return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}:{self.algorithm}"
+
+    def _load(self):
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                entries = safe_json_loads(f.read(), {})
+            self._cache.update(entries if isinstance(entries, dict) else {})
+            logging.info(f"🔑 Loaded {len(self._cache)} cached file hashes")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"⚠️ Could not load hash cache {self.cache_path}: {e}")
+
+    def _save(self, force: bool = False):
+        if not self.cache_path:
+            return
+        with self._lock:
+            if not self._dirty or (not force and time.monotonic() - self._last_save < self.save_interval):
+                return
+            payload = safe_json_dumps(dict(self._cache))
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+        tmp_path = self.cache_path + '.tmp'
+        try:
+            ensure_directory(os.path.dirname(self.cache_path))
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logging.warning(f"⚠️ Could not save hash cache {self.cache_path}: {e}")
+
+
+def benchmark(path: str, algorithms: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Throughput of the legacy utils.calculate_file_hash against hash_file per algorithm"""
+    size = os.path.getsize(path)
+    algorithms = algorithms or (['md5', 'blake2b'] + (['xxh3_128'] if XXHASH_AVAILABLE else []))
+
+    def measure(name: str, func: Callable[[], Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        return {'method': name, 'seconds': round(elapsed, 3), 'mb_per_s': round(size / elapsed / (1024**2), 1)}
+
+    # Warm the page cache so every method is measured reading from memory
+    with open(path, 'rb') as f:
+        while f.read(BLOCK_SIZE):
+            pass
+
+    results = [measure('legacy md5 (8 KiB reads)', lambda: calculate_file_hash(path))]
+    for algorithm in algorithms:
+        results.append(measure(f"{algorithm} (mmap)", lambda a=algorithm: hash_file(path, a)))
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: file_hasher.py FILE [ALGORITHM ...]")
+        sys.exit(1)
+
+    target = sys.argv[1]
+    print(f"Benchmarking {target} ({os.path.getsize(target) / (1024**2):.1f} MB)")
+    for row in benchmark(target, sys.argv[2:] or None):
+        print(f"  {row['method']:<28} {row['seconds']:>8.3f}s  {row['mb_per_s']:>8.1f} MB/s")
@@ -9,13 +9,21 @@ import time
 import shutil
 import logging
 import threading
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor
 
 from config import get_config
+from bandwidth_scheduler import BandwidthScheduler
+from disk_index import DiskUsageIndex
+from downloader import ChunkedDownloader, DownloadError, DownloadProgress, PART_SUFFIX, STATE_SUFFIX
+from file_hasher import FileHasher
+from instrumentation import get_instrumentation
+from media_prepare import MediaPreparer
+from media_store import MediaStore
+from preflight import UrlPreflight
 from status_reporter import get_status_reporter
-from utils import PerformanceTimer, ensure_directory
+from utils import ensure_directory, format_bytes, TokenBucket, RateLimiter
 
 
 @dataclass
@@ -39,14 +47,88 @@ class FileManager:
         # Cleanup management
         self.cleanup_running = False
         self.cleanup_thread = None
+
+        # Download engine - concurrency cap and bandwidth limit are shared by all streams
+        self.downloader = ChunkedDownloader(
+            max_concurrent=self.config.max_concurrent_downloads,
+            chunk_workers=self.config.download_chunk_workers,
+            chunk_size=self.config.download_chunk_size_mb * 1024 * 1024,
+            bandwidth_limit=self.config.download_bandwidth_limit_mbps * 1e6 / 8,
+            timeout=self.config.download_timeout
+        )
+
+        # Downloads get whatever the live streams leave over
+        self.bandwidth_scheduler = BandwidthScheduler(self.downloader) if self.config.bandwidth_scheduler_enabled else None
+
+        # Input reachability checks share the downloader's keep-alive pool
+        self.preflight = UrlPreflight(
+            self.downloader.session,
+            timeout=self.config.preflight_timeout,
+            workers=self.config.preflight_workers,
+            ttl=self.config.preflight_cache_ttl,
+            negative_ttl=self.config.preflight_negative_ttl
+        )
+
+        # Shared content-addressed store - one copy per library file, refcounted by streams
+        self.media_store = MediaStore(self.config.base_download_dir)
+
+        # Optional remux stage between download and FFmpeg
+        self.preparer = MediaPreparer(timeout=self.config.prepare_timeout)
+
+        # Content digests of cached media, computed off the command path
+        self.hasher = FileHasher(
+            cache_path=self.config.hash_cache_path,
+            workers=self.config.hash_workers,
+            algorithm=self.config.hash_algorithm
+        )
+
+        # Size index for the download cache - replaces os.walk scans
+        self.disk_index = DiskUsageIndex(self.config.base_download_dir)
+
+        # LRU eviction under disk pressure
+        self.last_access: Dict[str, float] = {}
+        self._evict_wakeup = threading.Event()
+        self._pressure_check_limit = TokenBucket(rate=1, burst=1)  # Free-space checks at most once a second
+        self._download_report_limit = RateLimiter(
+            rate=lambda: 1.0 / max(self.config.download_progress_interval, 0.1),
+            max_keys=256
+        )
+        self.eviction_stats = {
+            'runs': 0,
+            'evicted_files': 0,
+            'evicted_bytes': 0,
+            'skipped_pinned': 0,
+            'last_run': None,
+            'last_free_percent': None,
+        }
         
+        # Download, preflight and cache tuning from UPDATE_SETTINGS apply without restarts
+        self.config.subscribe(self._on_config_change)
+
         logging.info("📁 SRS File Manager initialized")
 
+    def _on_config_change(self, changes: Dict[str, Any], version: int):
+        """Push changed settings into the long-lived download, preflight and cache components"""
+        self.downloader.timeout = self.config.download_timeout
+        if not self.bandwidth_scheduler:
+            self.downloader.limiter.rate = self.config.download_bandwidth_limit_mbps * 1e6 / 8
+        self.preflight.timeout = self.config.preflight_timeout
+        self.preflight.ttl = self.config.preflight_cache_ttl
+        self.preflight.negative_ttl = self.config.preflight_negative_ttl
+        self.preparer.timeout = self.config.prepare_timeout
+
+        if any(key.startswith('cache_') for key in changes):
+            # Re-check free space against the new watermarks and re-arm the wait
+            self._evict_wakeup.set()
+
     def start_cleanup_service(self):
         """Start periodic cleanup service"""
         if self.cleanup_running:
             return
         
+        self.disk_index.start()
+        if self.bandwidth_scheduler:
+            self.bandwidth_scheduler.start()
         self.cleanup_running = True
         self.cleanup_thread = threading.Thread(
             target=self._periodic_cleanup_loop,
@@ -59,8 +141,12 @@ class FileManager:
     def stop_cleanup_service(self):
         """Stop periodic cleanup service"""
         self.cleanup_running = False
+        self._evict_wakeup.set()
         if self.cleanup_thread:
             self.cleanup_thread.join(timeout=5)
+        self.disk_index.stop()
+        if self.bandwidth_scheduler:
+            self.bandwidth_scheduler.stop()
         logging.info("🧹 File cleanup service stopped")
 
     def validate_urls_for_srs(self, stream_id: int, video_files: List[Dict[str, Any]]) -> List[str]:
@@ -94,6 +180,124 @@ class FileManager:
             logging.error(f"❌ Error validating URLs for SRS: {e}")
             return []
 
+    def preflight_urls(self, stream_id: int, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Check every remote input concurrently, returning per-URL results with latency"""
+        remote = [url for url in urls if url.startswith(('http://', 'https://'))]
+        if not remote:
+            return {}
+
+        with get_instrumentation().timer('preflight'):
+            results = self.preflight.check_all(remote)
+
+        for url, result in results.items():
+            source = "cache" if result['cached'] else f"{result['latency_ms']}ms"
+            if result['ok']:
+                logging.info(f"✅ [PREFLIGHT] Stream {stream_id}: {url} reachable (HTTP {result['status']}, {source})")
+            else:
+                logging.error(f"❌ [PREFLIGHT] Stream {stream_id}: {url} unreachable: {result['error']} ({source})")
+        return results
+
+    def download_file(self, stream_id: int, video_file: VideoFile, video_id: Optional[str] = None) -> Optional[str]:
+        """Fetch one file into the shared media store, reusing an existing copy or resuming a partial one"""
+        key = self.media_store.key_for(video_file.file_id, video_file.download_url)
+        local_path = self.media_store.object_path(key, video_file.filename)
+        video_id = video_id or str(video_file.file_id or key)
+
+        def on_progress(progress: DownloadProgress):
+            self.check_disk_pressure()
+            if not self._download_report_limit.allow(local_path):
+                return
+            self.status_reporter.publish_file_processing_status(
+                video_file.file_id, video_id, 'DOWNLOADING',
+                f"{progress.percent}% of {format_bytes(progress.total_bytes)} at {progress.rate_mbps} Mbps"
+            )
+
+        try:
+            # Streams asking for the same object wait for one download instead of racing
+            with self.media_store.lock(local_path):
+                existed = os.path.isfile(local_path)
+                self.media_store.record_lookup(local_path, existed)
+                if existed:
+                    logging.info(f"♻️ [MEDIA] Stream {stream_id}: reusing {os.path.basename(local_path)}")
+                with get_instrumentation().timer('download'):
+                    progress = self.downloader.download(video_file.download_url, local_path, on_progress)
+                # Referenced before the lock drops so the forced eviction below cannot take it
+                self.media_store.add_stream_ref(stream_id, local_path)
+        except DownloadError as e:
+            logging.error(f"❌ [DOWNLOAD] Stream {stream_id}: {video_file.filename} failed: {e}")
+            self.status_reporter.publish_file_processing_status(video_file.file_id, video_id, 'DOWNLOAD_FAILED', str(e))
+            return None
+
+        video_file.local_path = local_path
+        self.disk_index.record_file(local_path)
+        self.hasher.submit(local_path)  # Warm the digest cache in the background
+        self.touch(local_path)
+        self.check_disk_pressure(force=True)
+        self.status_reporter.publish_file_processing_status(
+            video_file.file_id, video_id, 'DOWNLOADED',
+            f"{format_bytes(progress.total_bytes)} ready at {local_path}"
+        )
+        return local_path
+
+    def prepare_local_inputs(self, stream_id: int, video_files: List[Dict[str, Any]], remux: Optional[bool] = None) -> List[str]:
+        """Download all inputs in parallel, keeping order. Files that fail fall back to their URL.
+        With remux, local files are swapped for cached faststart copies."""
+        files = [
+            VideoFile(
+                file_id=vf.get('file_id') or vf.get('id'),
+                filename=vf.get('filename') or os.path.basename(vf.get('download_url', '')) or f"input_{index}",
+                download_url=vf.get('download_url', ''),
+                size=vf.get('size', 0),
+                disk=vf.get('disk', ''),
+            )
+            for index, vf in enumerate(video_files)
+        ]
+        video_ids = [vf.get('video_id') for vf in video_files]
+
+        with ThreadPoolExecutor(max_workers=self.config.max_concurrent_downloads, thread_name_prefix="FileDownload") as pool:
+            results = list(pool.map(lambda args: self.download_file(stream_id, *args), zip(files, video_ids)))
+
+        inputs = [path or vf.download_url for vf, path in zip(files, results)]
+        refs = [path for path in results if path]
+
+        if self.config.prepare_inputs if remux is None else remux:
+            inputs = self._remux_inputs(stream_id, inputs)
+            refs += [path for path in inputs if self.preparer.is_prepared(path)]
+
+        self.media_store.set_stream_refs(stream_id, refs)
+        local = sum(1 for path in results if path)
+        logging.info(f"📥 [DOWNLOAD] Stream {stream_id}: {local}/{len(files)} inputs local, {len(files) - local} streamed over HTTP")
+        return inputs
+
+    def _remux_inputs(self, stream_id: int, inputs: List[str]) -> List[str]:
+        """Prepare every local input once, in parallel; remote inputs pass through"""
+        local = [path for path in inputs if os.path.isabs(path)]
+        if not local:
+            return inputs
+
+        with get_instrumentation().timer('prepare'):
+            with ThreadPoolExecutor(max_workers=self.config.max_concurrent_downloads, thread_name_prefix="MediaPrepare") as pool:
+                prepared = dict(zip(local, pool.map(self.preparer.prepare, local)))
+
+        for path in prepared.values():
+            self.media_store.add_stream_ref(stream_id, path)
+            self.disk_index.record_file(path)
+            self.touch(path)
+
+        inputs = [prepared.get(path, path) for path in inputs]
+        problems = self.preparer.check_concat_compatible([path for path in inputs if os.path.isabs(path)])
+        if problems:
+            logging.warning(f"⚠️ [PREPARE] Stream {stream_id}: inputs differ, concat with -c copy may glitch: {'; '.join(problems[:5])}")
+        return inputs
+
+    def release_stream_files(self, stream_id: int):
+        """Drop a stopped stream's media references so its objects become evictable"""
+        released = self.media_store.release_stream(stream_id)
+        for path in released:
+            self.touch(path)  # LRU age starts when the last stream lets go
+        if released:
+            logging.info(f"📦 [MEDIA] Stream {stream_id}: {len(released)} objects no longer referenced")
+
     def validate_local_files(self, stream_id: int, file_paths: List[str]) -> List[str]:
         """Validate local files exist"""
         try:
@@ -124,6 +328,7 @@ class FileManager:
             if force:
                 # Force cleanup - remove entire directory
                 shutil.rmtree(download_dir)
+                self.disk_index.forget(download_dir)
                 logging.info(f"🧹 Stream {stream_id}: Force cleaned up directory")
             else:
                 # Normal cleanup - remove old files
@@ -134,6 +339,7 @@ class FileManager:
                     try:
                         if os.path.getmtime(file_path) < cutoff_time:
                             os.remove(file_path)
+                            self.disk_index.forget(file_path)
                             logging.debug(f"🧹 Removed old file: {filename}")
                     except Exception as e:
                         logging.warning(f"Failed to remove file {filename}: {e}")
@@ -141,6 +347,7 @@ class FileManager:
                 # Remove directory if empty
                 try:
                     os.rmdir(download_dir)
+                    self.disk_index.forget(download_dir)
                     logging.info(f"🧹 Stream {stream_id}: Cleaned up empty directory")
                 except OSError:
                     pass  # Directory not empty
@@ -149,45 +356,149 @@ class FileManager:
             logging.error(f"❌ Error cleaning up stream {stream_id} files: {e}")
 
     def get_stream_directory_size(self, stream_id: int) -> int:
-        """Get total size of stream directory in bytes"""
+        """Get total size of stream directory in bytes (from the disk index)"""
+        return self.disk_index.get_dir_size(self.config.get_stream_download_dir(stream_id))
+
+    def get_cache_usage(self) -> int:
+        """Total bytes in the download cache (from the disk index)"""
+        return self.disk_index.total_bytes
+
+    def touch(self, path: str):
+        """Mark a cached file as used for LRU ordering"""
+        self.last_access[os.path.abspath(path)] = time.time()
+
+    def get_free_percent(self) -> float:
+        """Free space on the download filesystem"""
+        usage = shutil.disk_usage(self.config.base_download_dir)
+        return usage.free / usage.total * 100 if usage.total else 100.0
+
+    def check_disk_pressure(self, force: bool = False):
+        """Cheap free-space check (at most once a second) that wakes the evictor below the low watermark"""
+        if not force and not self._pressure_check_limit.try_consume():
+            return
         try:
-            download_dir = self.config.get_stream_download_dir(stream_id)
-            
-            if not os.path.exists(download_dir):
-                return 0
-            
-            total_size = 0
-            for dirpath, dirnames, filenames in os.walk(download_dir):
-                for filename in filenames:
-                    file_path = os.path.join(dirpath, filename)
-                    try:
-                        total_size += os.path.getsize(file_path)
-                    except (OSError, IOError):
-                        pass
-            
-            return total_size
-            
-        except Exception as e:
-            logging.error(f"❌ Error calculating directory size for stream {stream_id}: {e}")
+            if self.get_free_percent() < self.config.cache_low_watermark_percent:
+                self._evict_wakeup.set()
+        except OSError:
+            pass
+
+    def evict_lru(self) -> int:
+        """Delete least recently used unpinned files until free space reaches the high watermark"""
+        free_percent = self.get_free_percent()
+        self.eviction_stats['last_free_percent'] = round(free_percent, 1)
+        if free_percent >= self.config.cache_low_watermark_percent:
             return 0
 
+        self.eviction_stats['runs'] += 1
+        self.eviction_stats['last_run'] = int(time.time())
+        pinned = self._pinned_paths()
+
+        candidates = []
+        for path, size in self.disk_index.iter_files():
+            if path in pinned or path.endswith(PART_SUFFIX) or path.endswith(STATE_SUFFIX):
+                self.eviction_stats['skipped_pinned'] += 1
+                continue
+            candidates.append((self._access_time(path), path, size))
+        candidates.sort()
+
+        usage = shutil.disk_usage(self.config.base_download_dir)
+        target_free = usage.total * self.config.cache_high_watermark_percent / 100
+        free = usage.free
+        evicted = 0
+
+        for _, path, size in candidates:
+            if free >= target_free:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"⚠️ [CACHE] Could not evict {path}: {e}")
+                continue
+            self.disk_index.forget(path)
+            self.last_access.pop(path, None)
+            free += size
+            evicted += 1
+            self.eviction_stats['evicted_files'] += 1
+            self.eviction_stats['evicted_bytes'] += size
+            self._remove_empty_parent(path)
+
+        free_percent = free / usage.total * 100 if usage.total else 100.0
+        if free < target_free:
+            logging.warning(f"⚠️ [CACHE] Evicted {evicted} files but free space is still {free_percent:.1f}% "
+                            f"- remaining files are pinned by active streams or downloads")
+        else:
+            logging.info(f"🧹 [CACHE] Evicted {evicted} least recently used files, free space now {free_percent:.1f}%")
+        return evicted
+
+    def get_eviction_stats(self) -> Dict[str, Any]:
+        """Eviction counters for stats reports"""
+        return dict(self.eviction_stats)
+
+    def _pinned_paths(self) -> Set[str]:
+        """Files FFmpeg is reading, referenced media objects and in-flight downloads - never evicted"""
+        pinned = set()
+
+        for path in list(self.downloader.active):
+            pinned.update((os.path.abspath(path), os.path.abspath(path + PART_SUFFIX), os.path.abspath(path + STATE_SUFFIX)))
+
+        try:
+            from simple_stream_manager import get_simple_stream_manager
+            streams = get_simple_stream_manager().streams
+            self.media_store.reconcile(list(streams))
+            for stream in list(streams.values()):
+                for url in stream['config'].input_urls:
+                    if os.path.isabs(url):
+                        path = os.path.abspath(url)
+                        pinned.add(path)
+                        self.touch(path)  # In use right now counts as an access
+        except Exception as e:
+            logging.debug(f"Could not read active stream inputs: {e}")
+
+        pinned |= self.media_store.referenced_paths()
+        return pinned
+
+    def _access_time(self, path: str) -> float:
+        """Last use as recorded by the agent, else the newer of atime and mtime"""
+        recorded = self.last_access.get(path)
+        if recorded is not None:
+            return recorded
+        try:
+            st = os.stat(path)
+            return max(st.st_atime, st.st_mtime)
+        except OSError:
+            return 0.0
+
+    def _remove_empty_parent(self, path: str):
+        parent = os.path.abspath(os.path.dirname(path))
+        if parent in (os.path.abspath(self.config.base_download_dir), self.media_store.root):
+            return
+        try:
+            os.rmdir(parent)
+            self.disk_index.forget(parent)
+        except OSError:
+            pass  # Not empty
+
     def _periodic_cleanup_loop(self):
-        """Periodic cleanup of old stream directories"""
+        """Free-space driven LRU eviction, plus hourly cleanup of old stream directories"""
         logging.info("🧹 Periodic cleanup thread started")
+        last_age_cleanup = time.monotonic()
         
         while self.cleanup_running:
             try:
-                # Sleep for 1 hour between cleanups
-                for _ in range(3600):
-                    if not self.cleanup_running:
-                        break
-                    time.sleep(1)
+                # Downloads wake this early when free space drops below the low watermark
+                self._evict_wakeup.wait(self.config.cache_check_interval)
+                self._evict_wakeup.clear()
                 
                 if not self.cleanup_running:
                     break
                 
-                # Perform cleanup
-                self._cleanup_old_directories()
+                self.evict_lru()
+
+                if time.monotonic() - last_age_cleanup >= 3600:
+                    self._cleanup_old_directories()
+                    last_age_cleanup = time.monotonic()
                 
             except Exception as e:
                 logging.error(f"❌ Error in periodic cleanup: {e}")
@@ -203,22 +514,32 @@ class FileManager:
             
             cutoff_time = time.time() - (self.config.cleanup_after_hours * 3600)
             cleaned_count = 0
+            pinned_dirs = {os.path.dirname(path) for path in self._pinned_paths()}
             
-            for dirname in os.listdir(self.config.base_download_dir):
+            for dirname, entry in self.disk_index.list_dirs().items():
                 if dirname.startswith('stream_'):
                     dir_path = os.path.join(self.config.base_download_dir, dirname)
+                    if os.path.abspath(dir_path) in pinned_dirs:
+                        continue  # An active stream is still reading from it
                     
                     try:
-                        # Check if directory is old
-                        if os.path.getmtime(dir_path) < cutoff_time:
+                        # Check if directory is old (newest change seen by the index)
+                        if entry['mtime'] < cutoff_time:
                             shutil.rmtree(dir_path)
+                            self.disk_index.forget(dir_path)
                             cleaned_count += 1
                             logging.info(f"🧹 Cleaned up old directory: {dirname}")
                     except Exception as e:
                         logging.warning(f"Failed to cleanup directory {dirname}: {e}")
             
+            # Unreferenced media objects age out the same way
+            for path in self.media_store.collect_garbage(cutoff_time):
+                self.disk_index.forget(path)
+                self.last_access.pop(path, None)
+                cleaned_count += 1
+            
             if cleaned_count > 0:
-                logging.info(f"🧹 Periodic cleanup completed: {cleaned_count} directories removed")
+                logging.info(f"🧹 Periodic cleanup completed: {cleaned_count} directories and media objects removed")
             
         except Exception as e:
             logging.error(f"❌ Error in periodic directory cleanup: {e}")
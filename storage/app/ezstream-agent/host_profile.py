@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Host Profile
+Detects cores, RAM, NIC speed, disk type and cgroup limits at startup and
+derives pool sizes, check cadence, cache budgets and a stream capacity
+estimate from them - explicit environment overrides always win
+"""
+
+import os
+import logging
+from typing import Dict, Any, Optional
+
+import psutil
+
+from bandwidth_scheduler import detect_link_capacity
+from config import get_config
+
+
+# Per-stream cost of a copy-mode FFmpeg relay, used for the capacity estimate
+STREAM_CPU_CORES = 0.05
+STREAM_MEMORY_MB = 40
+STREAM_BITRATE_MBPS = 6.0
+
+# Left for the agent itself, Redis client buffers and the page cache
+RESERVED_MEMORY_MB = 256
+
+
+def _read_first_line(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_dirs(controller: str):
+    """Candidate cgroup directories for this process (v2 unified first, then v1)"""
+    try:
+        with open('/proc/self/cgroup') as f:
+            entries = [line.strip().split(':', 2) for line in f if line.count(':') >= 2]
+    except OSError:
+        entries = []
+
+    for hierarchy, controllers, path in entries:
+        if hierarchy == '0' and controllers == '':
+            yield os.path.join('/sys/fs/cgroup', path.lstrip('/'))
+    yield '/sys/fs/cgroup'
+    for hierarchy, controllers, path in entries:
+        if controller in controllers.split(','):
+            yield os.path.join('/sys/fs/cgroup', controller, path.lstrip('/'))
+    yield os.path.join('/sys/fs/cgroup', controller)
+
+
+def detect_cgroup_cpus() -> Optional[float]:
+    """CPU quota in cores, None when unlimited"""
+    for directory in _cgroup_dirs('cpu'):
+        line = _read_first_line(os.path.join(directory, 'cpu.max'))
+        if line:
+            quota, _, period = line.partition(' ')
+            if quota == 'max':
+                return None
+            return int(quota) / int(period or 100000)
+
+        quota = _read_first_line(os.path.join(directory, 'cpu.cfs_quota_us'))
+        period = _read_first_line(os.path.join(directory, 'cpu.cfs_period_us'))
+        if quota and period:
+            return int(quota) / int(period) if int(quota) > 0 else None
+    return None
+
+
+def detect_cgroup_memory_mb() -> Optional[float]:
+    """Memory limit in MB, None when unlimited"""
+    for directory in _cgroup_dirs('memory'):
+        for name in ('memory.max', 'memory.limit_in_bytes'):
+            line = _read_first_line(os.path.join(directory, name))
+            if not line:
+                continue
+            if line == 'max' or int(line) >= 1 << 60:  # v1 reports "unlimited" as a huge page-aligned number
+                return None
+            return int(line) / (1024 * 1024)
+    return None
+
+
+def _existing_path(path: str) -> str:
+    """Nearest existing ancestor - the download dir may not be created yet"""
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return path
+
+
+def detect_disk_type(path: str) -> str:
+    """nvme, ssd, hdd or unknown for the block device holding path"""
+    try:
+        dev = os.stat(_existing_path(path)).st_dev
+        device = os.path.realpath(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}")
+    except OSError:
+        return 'unknown'
+
+    # Partitions keep queue/ on their parent disk
+    for candidate in (device, os.path.dirname(device)):
+        rotational = _read_first_line(os.path.join(candidate, 'queue', 'rotational'))
+        if rotational is not None:
+            if rotational == '1':
+                return 'hdd'
+            return 'nvme' if os.path.basename(candidate).startswith('nvme') else 'ssd'
+    return 'unknown'
+
+
+def _clamp(value: float, low: int, high: int) -> int:
+    return int(max(low, min(high, value)))
+
+
+class HostProfile:
+    """What this host can take, and the settings derived from it"""
+
+    def __init__(self):
+        self.config = get_config()
+        self.host: Dict[str, Any] = {}
+        self.tuned: Dict[str, Any] = {}
+        self.overridden: Dict[str, Any] = {}
+        self.capacity: Dict[str, Any] = {}
+
+    def detect(self) -> Dict[str, Any]:
+        """Read the host's resources, honouring cgroup limits over host totals"""
+        try:
+            online_cpus = len(os.sched_getaffinity(0))
+        except (AttributeError, OSError):
+            online_cpus = os.cpu_count() or 1
+        cgroup_cpus = detect_cgroup_cpus()
+        cpus = min(online_cpus, cgroup_cpus) if cgroup_cpus else online_cpus
+
+        total_memory_mb = psutil.virtual_memory().total / (1024 * 1024)
+        cgroup_memory_mb = detect_cgroup_memory_mb()
+        memory_mb = min(total_memory_mb, cgroup_memory_mb) if cgroup_memory_mb else total_memory_mb
+
+        try:
+            disk_gb = psutil.disk_usage(_existing_path(self.config.base_download_dir)).total / 1e9
+        except OSError:
+            disk_gb = 0.0
+
+        self.host = {
+            'cpus': round(cpus, 2),
+            'online_cpus': online_cpus,
+            'cgroup_cpus': round(cgroup_cpus, 2) if cgroup_cpus else None,
+            'memory_mb': int(memory_mb),
+            'cgroup_memory_mb': int(cgroup_memory_mb) if cgroup_memory_mb else None,
+            'link_mbps': self.config.network_capacity_mbps or detect_link_capacity(),
+            'disk_type': detect_disk_type(self.config.base_download_dir),
+            'disk_gb': round(disk_gb, 1),
+        }
+        return self.host
+
+    def derive(self) -> Dict[str, Any]:
+        """Settings this host should run with"""
+        cpus = max(1.0, self.host['cpus'])
+        memory_mb = self.host['memory_mb']
+        link_mbps = self.host['link_mbps']
+        spinning = self.host['disk_type'] == 'hdd'
+        small = cpus < 2 or memory_mb < 2048
+
+        settings = {
+            # Worker pools
+            'command_workers': _clamp(cpus * 2, 2, 16),
+            'command_max_concurrent': _clamp(cpus, 1, 8),
+            'preflight_workers': _clamp(cpus * 4, 4, 32),
+            'hash_workers': 1 if spinning else _clamp(cpus / 2, 1, 4),
+            'max_concurrent_downloads': 2 if spinning else _clamp(link_mbps / 300, 2, 8),
+            'download_chunk_workers': 2 if spinning else (8 if link_mbps >= 10000 else 4),
+
+            # Check cadence - big hosts carry more streams and notice a dead one sooner
+            'ffmpeg_health_check_interval': 60 if cpus < 2 else (30 if cpus < 8 else 15),
+            'process_sample_interval': 10 if small else 5,
+            'stats_sample_interval': 5.0 if small else 2.0,
+
+            # Cache budgets
+            'metrics_memory_budget_mb': _clamp(memory_mb * 0.01, 8, 128),
+            'command_output_limit_kb': 64 if memory_mb < 1024 else 256,
+        }
+        if 0 < self.host['disk_gb'] < 50:
+            # A few stray downloads fill a small disk quickly - start evicting earlier
+            settings['cache_low_watermark_percent'] = 15.0
+            settings['cache_high_watermark_percent'] = 25.0
+        return settings
+
+    def estimate_capacity(self) -> Dict[str, Any]:
+        """Concurrent copy-mode streams this host can carry, and what runs out first"""
+        limits = {
+            'cpu': self.host['cpus'] / STREAM_CPU_CORES,
+            'memory': max(0, self.host['memory_mb'] - RESERVED_MEMORY_MB) / STREAM_MEMORY_MB,
+            'network': self.host['link_mbps'] * self.config.bandwidth_target_utilization / STREAM_BITRATE_MBPS,
+        }
+        limited_by = min(limits, key=limits.get)
+        self.capacity = {
+            'max_streams': int(limits[limited_by]),
+            'limited_by': limited_by,
+            'limits': {name: int(value) for name, value in limits.items()},
+        }
+        return self.capacity
+
+    def apply(self):
+        """Detect, derive and write the tuned values into config, skipping environment overrides"""
+        self.detect()
+        self.estimate_capacity()
+        if not self.config.auto_tune:
+            logging.info("🧭 Auto-tuning disabled (AUTO_TUNE=false) - using configured defaults")
+            return
+
+        for key, value in self.derive().items():
+            if key in self.config.env_overrides:
+                self.overridden[key] = getattr(self.config, key)
+                continue
+            if getattr(self.config, key) != value:
+                setattr(self.config, key, value)
+            self.tuned[key] = value
+
+        logging.info(f"🧭 Host profile: {self.host['cpus']} CPUs, {self.host['memory_mb']} MB, "
+                     f"{self.host['link_mbps']:.0f} Mbps, {self.host['disk_type']} disk - "
+                     f"~{self.capacity['max_streams']} streams ({self.capacity['limited_by']}-bound)")
+        logging.info(f"🧭 Tuned: {self.tuned}" + (f" (env overrides kept: {self.overridden})" if self.overridden else ''))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Profile as reported in the first heartbeat"""
+        return {
+            'auto_tune': self.config.auto_tune,
+            'host': self.host,
+            'capacity': self.capacity,
+            'tuned': self.tuned,
+            'overridden': self.overridden,
+        }
+
+
+# Global host profile instance
+_host_profile: Optional[HostProfile] = None
+
+
+def init_host_profile() -> HostProfile:
+    """Detect the host and tune the global config before any component reads it"""
+    global _host_profile
+    _host_profile = HostProfile()
+    try:
+        _host_profile.apply()
+    except Exception as e:
+        logging.error(f"❌ Host profiling failed, keeping configured defaults: {e}")
+    return _host_profile
+
+
+def get_host_profile() -> Optional[HostProfile]:
+    """Get global host profile instance"""
+    return _host_profile
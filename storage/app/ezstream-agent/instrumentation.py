@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Instrumentation
+Named hot-path timers on perf_counter_ns with fixed-bucket histograms
+(p50/p95/p99) and an on-demand sampling profiler
+"""
+
+import sys
+import time
+import logging
+import functools
+import threading
+from collections import Counter
+from typing import Dict, Any, Optional, Callable
+
+from utils import Histogram
+
+
+# Hot paths range from sub-millisecond Redis publishes to multi-second FFmpeg spawns
+TIMER_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _NullTimer:
+    """Shared do-nothing context used while instrumentation is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('owner', 'name', 'start')
+
+    def __init__(self, owner: 'Instrumentation', name: str):
+        self.owner = owner
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.owner.observe(self.name, (time.perf_counter_ns() - self.start) / 1e9)
+        return False
+
+
+class SamplingProfiler:
+    """Samples every thread's stack at a fixed interval for a bounded duration"""
+
+    def __init__(self, interval: float = 0.01, duration: float = 30.0, top: int = 25):
+        self.interval = interval
+        self.duration = duration
+        self.top = top
+        self.samples = 0
+        self.frames: Counter = Counter()    # leaf function -> samples
+        self.stacks: Counter = Counter()    # collapsed thread;outer;...;leaf -> samples
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()  # result() reads the counters while the sampler thread adds to them
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval * 10 + 1)
+
+    def result(self) -> Dict[str, Any]:
+        """Hottest leaf functions and collapsed stacks (flamegraph input format)"""
+        with self._lock:
+            samples = self.samples
+            frames = self.frames.copy()
+            stacks = self.stacks.copy()
+        return {
+            'started_at': int(self.started_at) if self.started_at else None,
+            'finished_at': int(self.finished_at) if self.finished_at else None,
+            'running': self.running,
+            'interval_ms': round(self.interval * 1000, 2),
+            'samples': samples,
+            'top_functions': [
+                {'function': name, 'samples': count, 'percent': round(count / samples * 100, 1)}
+                for name, count in frames.most_common(self.top)
+            ] if samples else [],
+            'top_stacks': [f"{stack} {count}" for stack, count in stacks.most_common(self.top)],
+        }
+
+    def _run(self):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + self.duration
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            sweep = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < 40:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    sweep.append((stack[0], ';'.join([names.get(thread_id, str(thread_id))] + stack[::-1])))
+            # Stacks are walked outside the lock so result() only waits for the counter updates
+            with self._lock:
+                for leaf, collapsed in sweep:
+                    self.frames[leaf] += 1
+                    self.stacks[collapsed] += 1
+                self.samples += 1
+            self._stop.wait(self.interval)
+        self.finished_at = time.time()
+        logging.info(f"🔬 Sampling profiler finished ({self.samples} samples)")
+
+
+class Instrumentation:
+    """Registry of named timers; near-zero cost when disabled"""
+
+    def __init__(self, enabled: bool = True, slow_threshold: float = 5.0):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self.profiler: Optional[SamplingProfiler] = None
+
+    def timer(self, name: str):
+        """Context manager timing a block into the named histogram"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name: Optional[str] = None) -> Callable:
+        """Decorator form of timer()"""
+        def decorator(func):
+            timer_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, timer_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name: str, seconds: float):
+        """Record one duration"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram(TIMER_BUCKETS))
+        histogram.observe(seconds)
+        if seconds >= self.slow_threshold:
+            logging.warning(f"🐢 {name} took {seconds:.2f}s")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Count, mean and percentiles per timer, in milliseconds"""
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 3) if value is not None else None
+
+        with self._lock:
+            items = list(self.histograms.items())
+        return {
+            name: {
+                'count': h.total,
+                'mean_ms': ms(h.sum / h.total) if h.total else None,
+                'p50_ms': ms(h.quantile(0.5)),
+                'p95_ms': ms(h.quantile(0.95)),
+                'p99_ms': ms(h.quantile(0.99)),
+                'max_ms': ms(h.max),
+            }
+            for name, h in sorted(items)
+        }
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def start_profiling(self, duration: float = 30.0, interval: float = 0.01) -> bool:
+        """Start the sampling profiler unless one is already running"""
+        if self.profiler and self.profiler.running:
+            return False
+        self.profiler = SamplingProfiler(interval=max(interval, 0.001), duration=min(duration, 600))
+        self.profiler.start()
+        logging.info(f"🔬 Sampling profiler started for {duration:.0f}s every {interval * 1000:.0f}ms")
+        return True
+
+    def stop_profiling(self):
+        if self.profiler:
+            self.profiler.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Timer percentiles and the latest profile for stats reports"""
+        stats = {'enabled': self.enabled, 'timers': self.snapshot()}
+        if self.profiler:
+            stats['profile'] = self.profiler.result()
+        return stats
+
+
+# Global instance management
+_instrumentation: Optional[Instrumentation] = None
+
+
+def init_instrumentation() -> Instrumentation:
+    """Initialize global instrumentation from config"""
+    global _instrumentation
+    from config import get_config
+    config = get_config()
+    _instrumentation = instrumentation = Instrumentation(
+        enabled=config.instrumentation_enabled,
+        slow_threshold=config.instrumentation_slow_seconds
+    )
+
+    def on_config_change(changes, version):
+        instrumentation.enabled = config.instrumentation_enabled
+        instrumentation.slow_threshold = config.instrumentation_slow_seconds
+
+    config.subscribe(on_config_change)
+    return _instrumentation
+
+
+def get_instrumentation() -> Instrumentation:
+    """Get global instrumentation, creating a default one for early callers"""
+    global _instrumentation
+    if _instrumentation is None:
+        _instrumentation = Instrumentation()
+    return _instrumentation
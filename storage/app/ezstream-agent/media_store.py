@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Media Store
+Content-addressed download cache shared by all streams on the VPS - each
+library video is stored once and reference-counted by the streams using it
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Set, Iterable
+
+from utils import sanitize_filename, ensure_directory
+
+
+MEDIA_DIR_NAME = 'media'
+
+# References younger than this survive reconcile - the stream may still be starting
+RECONCILE_GRACE = 300
+
+
+class MediaStore:
+    """Objects keyed by library file ID, with per-stream reference sets"""
+
+    def __init__(self, base_dir: str):
+        self.root = os.path.join(os.path.abspath(base_dir), MEDIA_DIR_NAME)
+        ensure_directory(self.root)
+
+        # stream_id -> object paths the stream plays
+        self.refs: Dict[int, Set[str]] = {}
+        self._ref_times: Dict[int, float] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'bytes_saved': 0,
+            'collected': 0,
+        }
+
+    @staticmethod
+    def key_for(file_id: Any, url: str) -> str:
+        """Library file ID when Laravel sends one, else a digest of the source URL"""
+        if file_id not in (None, ''):
+            return f"file_{sanitize_filename(str(file_id))}"
+        return f"url_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:20]}"
+
+    def object_path(self, key: str, filename: str) -> str:
+        """Where an object lives - the extension is kept for FFmpeg probing"""
+        ext = os.path.splitext(sanitize_filename(filename))[1].lower()
+        return os.path.join(self.root, f"{key}{ext}")
+
+    @contextmanager
+    def lock(self, path: str):
+        """Serialise fetches of the same object so concurrent streams download it once"""
+        with self._lock:
+            key_lock = self._key_locks.setdefault(path, threading.Lock())
+        with key_lock:
+            yield
+
+    def record_lookup(self, path: str, existed: bool):
+        """Count a dedup hit (object already present) or miss"""
+        if existed:
+            self.stats['hits'] += 1
+            try:
+                self.stats['bytes_saved'] += os.path.getsize(path)
+            except OSError:
+                pass
+        else:
+            self.stats['misses'] += 1
+
+    def set_stream_refs(self, stream_id: int, paths: Iterable[str]):
+        """Replace the set of objects a stream references"""
+        paths = {os.path.abspath(p) for p in paths if self.contains(p)}
+        with self._lock:
+            if paths:
+                self.refs[stream_id] = paths
+                self._ref_times[stream_id] = time.time()
+            else:
+                self.refs.pop(stream_id, None)
+                self._ref_times.pop(stream_id, None)
+
+    def add_stream_ref(self, stream_id: int, path: str):
+        """Pin one object for a stream that is still preparing its inputs"""
+        if not self.contains(path):
+            return
+        with self._lock:
+            self.refs.setdefault(stream_id, set()).add(os.path.abspath(path))
+            self._ref_times[stream_id] = time.time()
+
+    def release_stream(self, stream_id: int) -> List[str]:
+        """Drop a stream's references, returning objects that are now unreferenced"""
+        with self._lock:
+            released = self.refs.pop(stream_id, set())
+            self._ref_times.pop(stream_id, None)
+            still_used = set().union(*self.refs.values()) if self.refs else set()
+        return sorted(released - still_used)
+
+    def reconcile(self, live_stream_ids: Iterable[int]):
+        """Forget references held by streams the agent no longer runs"""
+        live = set(live_stream_ids)
+        cutoff = time.time() - RECONCILE_GRACE
+        with self._lock:
+            for stream_id in [sid for sid in self.refs if sid not in live and self._ref_times.get(sid, 0) < cutoff]:
+                del self.refs[stream_id]
+                self._ref_times.pop(stream_id, None)
+
+    def refcount(self, path: str) -> int:
+        path = os.path.abspath(path)
+        with self._lock:
+            return sum(1 for paths in self.refs.values() if path in paths)
+
+    def referenced_paths(self) -> Set[str]:
+        with self._lock:
+            return set().union(*self.refs.values()) if self.refs else set()
+
+    def contains(self, path: str) -> bool:
+        """Whether a path is an object in this store"""
+        return os.path.dirname(os.path.abspath(path)) == self.root
+
+    def collect_garbage(self, cutoff_time: float) -> List[str]:
+        """Delete unreferenced objects not modified or accessed since cutoff_time"""
+        referenced = self.referenced_paths()
+        removed = []
+        try:
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    if not entry.is_file(follow_symlinks=False) or entry.path in referenced:
+                        continue
+                    if entry.name.endswith(('.part', '.part.json')):
+                        continue  # Partial downloads are resumed, not collected
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                        if max(st.st_atime, st.st_mtime) < cutoff_time:
+                            os.remove(entry.path)
+                            removed.append(entry.path)
+                    except OSError as e:
+                        logging.warning(f"⚠️ [MEDIA] Could not remove {entry.name}: {e}")
+        except OSError:
+            pass
+
+        self.stats['collected'] += len(removed)
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Dedup effectiveness for stats reports"""
+        with self._lock:
+            referenced = set().union(*self.refs.values()) if self.refs else set()
+            stats = dict(self.stats)
+            stats['streams'] = len(self.refs)
+            stats['referenced_objects'] = len(referenced)
+            stats['references'] = sum(len(paths) for paths in self.refs.values())
+        return stats
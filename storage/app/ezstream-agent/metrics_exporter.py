@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Metrics Exporter
+Optional localhost HTTP endpoint serving OpenMetrics for agent and per-stream metrics
+"""
+
+import os
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+from config import get_config
+
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _read_rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size from /proc without going through psutil"""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _format_value(value) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class MetricsWriter:
+    """Accumulates OpenMetrics text families"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, metric_type: str, help_text: str, samples: List[tuple]):
+        """samples: (labels dict, value[, suffix]) - families without samples are skipped"""
+        samples = [s for s in samples if s[1] is not None]
+        if not samples:
+            return
+        self.lines.append(f"# TYPE {name} {metric_type}")
+        self.lines.append(f"# HELP {name} {help_text}")
+        for sample in samples:
+            labels, value = sample[0], sample[1]
+            suffix = sample[2] if len(sample) > 2 else ''
+            self.lines.append(f"{name}{suffix}{self._labels(labels)} {_format_value(value)}")
+
+    def histogram(self, name: str, help_text: str, snapshot: Dict[str, Any], labels: Optional[Dict] = None):
+        """Render a utils.Histogram snapshot"""
+        labels = labels or {}
+        samples = []
+        for bound, count in zip(snapshot['buckets'] + ['+Inf'], snapshot['cumulative']):
+            samples.append(({**labels, 'le': str(bound)}, count, '_bucket'))
+        samples.append((labels, snapshot['count'], '_count'))
+        samples.append((labels, snapshot['sum'], '_sum'))
+        self.family(name, 'histogram', help_text, samples)
+
+    def render(self) -> bytes:
+        return ('\n'.join(self.lines) + '\n# EOF\n').encode('utf-8')
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> str:
+        if not labels:
+            return ''
+        parts = []
+        for key, value in labels.items():
+            escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            parts.append(f'{key}="{escaped}"')
+        return '{' + ','.join(parts) + '}'
+
+
+class MetricsExporter:
+    """Serves a read-only snapshot of what the agent components already track"""
+
+    def __init__(self):
+        self.config = get_config()
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.server_thread = None
+        self.scrapes = 0
+        self.started_at = time.time()
+
+    def start(self):
+        """Bind the HTTP server and serve in the background"""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                try:
+                    body = exporter.collect()
+                    self.send_response(200)
+                    self.send_header('Content-Type', CONTENT_TYPE)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except Exception as e:
+                    logging.error(f"❌ Error rendering metrics: {e}")
+                    self.send_error(500)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would flood the agent log
+
+        self.server = ThreadingHTTPServer((self.config.metrics_host, self.config.metrics_port), Handler)
+        self.server.daemon_threads = True
+        self.server_thread = threading.Thread(
+            target=self.server.serve_forever,
+            name="MetricsExporter",
+            daemon=True
+        )
+        self.server_thread.start()
+        logging.info(f"📊 Metrics exporter listening on http://{self.config.metrics_host}:{self.config.metrics_port}/metrics")
+
+    def stop(self):
+        """Shut down the HTTP server"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        logging.info("📊 Metrics exporter stopped")
+
+    def collect(self) -> bytes:
+        """Build the exposition from component state - reads snapshots only, takes no component locks"""
+        self.scrapes += 1
+        writer = MetricsWriter()
+
+        self._collect_agent(writer)
+        self._collect_commands(writer)
+        self._collect_reporting(writer)
+        self._collect_streams(writer)
+        self._collect_watchdog(writer)
+
+        return writer.render()
+
+    def _collect_agent(self, writer: MetricsWriter):
+        writer.family('ezstream_agent', 'info', 'Agent build and identity', [
+            ({'vps_id': self.config.vps_id, 'version': self.config.agent_version}, 1, '_info')
+        ])
+        writer.family('ezstream_agent_uptime_seconds', 'gauge', 'Seconds since the agent started', [
+            ({}, round(time.time() - self.started_at, 3))
+        ])
+        writer.family('ezstream_agent_threads', 'gauge', 'Live Python threads in the agent', [
+            ({}, threading.active_count())
+        ])
+        writer.family('ezstream_agent_resident_memory_bytes', 'gauge', 'Agent resident set size', [
+            ({}, _read_rss_bytes(os.getpid()))
+        ])
+        writer.family('ezstream_agent_scrapes', 'counter', 'Metrics scrapes served', [
+            ({}, self.scrapes, '_total')
+        ])
+
+    def _collect_commands(self, writer: MetricsWriter):
+        try:
+            from command_handler import get_command_handler
+            handler = get_command_handler()
+        except RuntimeError:
+            return
+
+        writer.family('ezstream_command_queue_depth', 'gauge', 'Commands received but not finished', [
+            ({}, len(handler.active_commands))
+        ])
+        writer.family('ezstream_commands', 'counter', 'Commands by outcome', [
+            ({'outcome': outcome}, count, '_total') for outcome, count in list(handler.command_counts.items())
+        ])
+        writer.histogram('ezstream_command_duration_seconds', 'Command handler execution time',
+                         handler.command_latency.snapshot())
+        writer.histogram('ezstream_command_queue_wait_seconds', 'Time commands wait for a worker',
+                         handler.command_queue_latency.snapshot())
+
+    def _collect_reporting(self, writer: MetricsWriter):
+        from status_reporter import get_status_reporter
+        reporter = get_status_reporter()
+        if not reporter:
+            return
+
+        stats = reporter.publisher.get_stats()
+        writer.family('ezstream_reports', 'counter', 'Reports by publisher outcome', [
+            ({'outcome': key}, stats[key], '_total') for key in ('submitted', 'coalesced', 'published', 'failed')
+        ])
+        writer.family('ezstream_redis_messages', 'counter', 'Messages published to agent-reports', [
+            ({}, stats['redis_messages'], '_total')
+        ])
+        writer.family('ezstream_reports_pending', 'gauge', 'Reports waiting for the next flush', [
+            ({}, stats['pending'])
+        ])
+        writer.histogram('ezstream_redis_publish_duration_seconds', 'Pipelined agent-reports flush time',
+                         reporter.publisher.flush_latency.snapshot())
+
+        spool = stats.get('spool')
+        if spool:
+            writer.family('ezstream_spool_bytes', 'gauge', 'On-disk report spool size', [({}, spool['bytes'])])
+            writer.family('ezstream_spool_reports', 'counter', 'Spooled reports by outcome', [
+                ({'outcome': key}, spool[key], '_total') for key in ('spooled', 'replayed', 'compacted', 'dropped')
+            ])
+
+        redis_stats = reporter.redis_manager.get_stats()
+        writer.family('ezstream_redis_up', 'gauge', 'Whether the shared Redis pool is healthy', [
+            ({}, redis_stats['healthy'])
+        ])
+        writer.family('ezstream_redis_errors', 'counter', 'Redis failures seen by any component', [
+            ({}, redis_stats['failures'], '_total')
+        ])
+        writer.family('ezstream_redis_reconnects', 'counter', 'Successful Redis reconnects', [
+            ({}, redis_stats['reconnects'], '_total')
+        ])
+
+    def _collect_watchdog(self, writer: MetricsWriter):
+        from agent_watchdog import get_watchdog
+        loops = get_watchdog().get_stats()['loops']
+
+        writer.family('ezstream_loop_lag_seconds', 'gauge', 'Seconds since each watched loop last checked in', [
+            ({'loop': name}, loop['lag']) for name, loop in loops.items()
+        ])
+        writer.family('ezstream_loop_max_lag_seconds', 'gauge', 'Longest gap between check-ins seen per loop', [
+            ({'loop': name}, loop['max_lag']) for name, loop in loops.items()
+        ])
+        writer.family('ezstream_loop_stalls', 'counter', 'Missed watchdog deadlines per loop', [
+            ({'loop': name}, loop['stalls'], '_total') for name, loop in loops.items()
+        ])
+        writer.family('ezstream_loop_restarts', 'counter', 'Watchdog restarts per loop', [
+            ({'loop': name}, loop['restarts'], '_total') for name, loop in loops.items()
+        ])
+
+    def _collect_streams(self, writer: MetricsWriter):
+        from simple_stream_manager import get_simple_stream_manager
+        from process_manager import get_process_manager
+        manager = get_simple_stream_manager()
+        process_manager = get_process_manager()
+        now = time.time()
+
+        running, fps, bitrate, speed, restarts, uptime, rss, startup = [], [], [], [], [], [], [], []
+        for stream_id, stream in list(manager.streams.items()):
+            labels = {'stream_id': stream_id}
+            status = stream.get('status')
+            running.append((labels, status is not None and status.value == 'running'))
+            restarts.append((labels, stream.get('retry_count', 0), '_total'))
+            uptime.append((labels, round(now - stream.get('start_time', now), 3)))
+
+            if 'startup_seconds' in stream:
+                inputs = 'prepared' if stream.get('prepared_inputs') else 'raw'
+                startup.append(({**labels, 'inputs': inputs}, stream['startup_seconds']))
+
+            progress = stream.get('progress') or {}
+            fps.append((labels, progress.get('fps')))
+            bitrate.append((labels, progress.get('bitrate_kbps')))
+            speed.append((labels, progress.get('speed')))
+
+            pid = process_manager.get_pid(stream_id)
+            if pid is not None:
+                rss.append((labels, _read_rss_bytes(pid)))
+
+        writer.family('ezstream_streams', 'gauge', 'Streams tracked by the agent', [({}, len(running))])
+        writer.family('ezstream_ffmpeg_processes', 'gauge', 'FFmpeg child processes held by the agent', [({}, len(rss))])
+        writer.family('ezstream_stream_running', 'gauge', 'Whether the stream FFmpeg process is running', running)
+        writer.family('ezstream_stream_fps', 'gauge', 'FFmpeg output frames per second', fps)
+        writer.family('ezstream_stream_bitrate_kbps', 'gauge', 'FFmpeg output bitrate', bitrate)
+        writer.family('ezstream_stream_speed_ratio', 'gauge', 'FFmpeg speed relative to realtime', speed)
+        writer.family('ezstream_stream_restarts', 'counter', 'Stream restarts since start', restarts)
+        writer.family('ezstream_stream_uptime_seconds', 'gauge', 'Seconds since the stream was started', uptime)
+        writer.family('ezstream_stream_startup_seconds', 'gauge', 'FFmpeg spawn to first output frame', startup)
+        writer.family('ezstream_stream_resident_memory_bytes', 'gauge', 'FFmpeg resident set size', rss)
+
+
+# Global instance management
+_metrics_exporter: Optional[MetricsExporter] = None
+
+
+def init_metrics_exporter() -> MetricsExporter:
+    """Initialize global metrics exporter"""
+    global _metrics_exporter
+    _metrics_exporter = MetricsExporter()
+    return _metrics_exporter
+
+
+def get_metrics_exporter() -> Optional[MetricsExporter]:
+    """Get global metrics exporter instance (None when disabled)"""
+    return _metrics_exporter
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Metrics Store
+Compact array-backed time series per stream and for the host, downsampled within a fixed memory budget
+"""
+
+import math
+import time
+import logging
+import threading
+from array import array
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+
+from config import get_config
+from agent_watchdog import get_watchdog
+
+
+STREAM_FIELDS = ('fps', 'bitrate_kbps', 'speed', 'cpu_percent', 'rss_mb', 'restarts')
+HOST_FIELDS = ('cpu_usage', 'ram_usage', 'load_1m', 'network_tx_mbps', 'network_rx_mbps')
+
+# Fields that count events per bucket - summed rather than averaged when downsampling
+SUM_FIELDS = {'restarts'}
+
+NAN = float('nan')
+
+
+class RingSeries:
+    """Fixed-capacity ring of timestamps plus one float32 array per field"""
+
+    def __init__(self, fields: tuple, capacity: int, resolution: int):
+        self.fields = fields
+        self.capacity = capacity
+        self.resolution = resolution
+        self.timestamps = array('l', [0]) * capacity
+        self.values = {field: array('f', [NAN]) * capacity for field in fields}
+        self.head = 0
+        self.count = 0
+
+    def append(self, timestamp: int, sample: Dict[str, Optional[float]]):
+        index = self.head
+        self.timestamps[index] = timestamp
+        for field in self.fields:
+            value = sample.get(field)
+            self.values[field][index] = NAN if value is None else value
+        self.head = (index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def window(self, since: int, fields: tuple) -> Dict[str, List]:
+        """Points newer than `since`, oldest first, NaN rendered as None"""
+        start = (self.head - self.count) % self.capacity
+        result = {'timestamps': []}
+        result.update({field: [] for field in fields})
+
+        for offset in range(self.count):
+            index = (start + offset) % self.capacity
+            timestamp = self.timestamps[index]
+            if timestamp < since:
+                continue
+            result['timestamps'].append(timestamp)
+            for field in fields:
+                value = self.values[field][index]
+                result[field].append(None if math.isnan(value) else round(value, 3))
+        return result
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.itemsize * self.capacity + sum(a.itemsize * self.capacity for a in self.values.values())
+
+
+class TieredSeries:
+    """Fine tier (e.g. 10s for an hour) rolled up into a coarse tier (e.g. 1 min for a day)"""
+
+    def __init__(self, fields: tuple, fine_resolution: int, fine_span: int, coarse_resolution: int, coarse_span: int):
+        self.fields = fields
+        self.fine = RingSeries(fields, max(1, fine_span // fine_resolution), fine_resolution)
+        self.coarse = RingSeries(fields, max(1, coarse_span // coarse_resolution), coarse_resolution)
+        self.last_update = 0.0
+
+        # Running rollup for the current coarse bucket
+        self._bucket = None
+        self._sums = {field: 0.0 for field in fields}
+        self._counts = {field: 0 for field in fields}
+
+    def add(self, timestamp: int, sample: Dict[str, Optional[float]]):
+        self.fine.append(timestamp, sample)
+        self.last_update = time.time()
+
+        bucket = timestamp - timestamp % self.coarse.resolution
+        if self._bucket is not None and bucket != self._bucket:
+            self._roll_up()
+        self._bucket = bucket
+
+        for field in self.fields:
+            value = sample.get(field)
+            if value is not None:
+                self._sums[field] += value
+                self._counts[field] += 1
+
+    def window(self, seconds: int, fields: Optional[tuple] = None) -> Dict[str, Any]:
+        """Pick the finest tier that covers the requested window"""
+        fields = tuple(f for f in (fields or self.fields) if f in self.fields)
+        fine_span = self.fine.capacity * self.fine.resolution
+        tier = self.fine if seconds <= fine_span else self.coarse
+
+        data = tier.window(int(time.time()) - seconds, fields)
+        data['resolution'] = tier.resolution
+        return data
+
+    @property
+    def nbytes(self) -> int:
+        return self.fine.nbytes + self.coarse.nbytes
+
+    def _roll_up(self):
+        rolled = {}
+        for field in self.fields:
+            count = self._counts[field]
+            if count:
+                rolled[field] = self._sums[field] if field in SUM_FIELDS else self._sums[field] / count
+            self._sums[field] = 0.0
+            self._counts[field] = 0
+        self.coarse.append(self._bucket, rolled)
+
+
+class MetricsStore:
+    """Samples streams and host on a fixed cadence into tiered series"""
+
+    def __init__(self):
+        self.config = get_config()
+        self.interval = self.config.metrics_sample_interval
+
+        self.streams: Dict[int, TieredSeries] = {}
+        self.host = self._new_series(HOST_FIELDS)
+        self.events: Dict[int, deque] = {}
+        self._pending_restarts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+        self.series_bytes = self._new_series(STREAM_FIELDS).nbytes
+        budget = self.config.metrics_memory_budget_mb * 1024 * 1024
+        self.max_streams = max(1, (budget - self.host.nbytes) // self.series_bytes)
+
+        self.running = False
+        self.collector_thread = None
+        self._budget_warned = False
+
+        logging.info(f"🗃️ Metrics store initialized ({self.series_bytes // 1024} KB per stream, up to {self.max_streams} streams)")
+
+    def start(self):
+        """Start background collection"""
+        if self.running:
+            return
+        self.running = True
+        self.collector_thread = threading.Thread(
+            target=self._collector_loop,
+            name="MetricsCollector",
+            daemon=True
+        )
+        self.collector_thread.start()
+
+    def stop(self):
+        """Stop background collection"""
+        self.running = False
+        if self.collector_thread:
+            self.collector_thread.join(timeout=self.interval + 1)
+
+    def record_event(self, stream_id: int, event: str, detail: Optional[str] = None):
+        """Keep a discrete stream event (restart, error...) and count restarts into the series"""
+        with self._lock:
+            events = self.events.setdefault(stream_id, deque(maxlen=self.config.metrics_max_events))
+            events.append({'timestamp': int(time.time()), 'event': event, 'detail': detail})
+            if event == 'restart':
+                self._pending_restarts[stream_id] = self._pending_restarts.get(stream_id, 0) + 1
+
+    def query(self, stream_id: Optional[int] = None, window: int = 3600, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Return a window of host or stream series (stream_id None means host)"""
+        window = max(self.interval, min(int(window), self.config.metrics_coarse_span))
+        wanted = tuple(fields) if fields else None
+
+        with self._lock:
+            if stream_id is None:
+                return {'scope': 'host', 'window': window, **self.host.window(window, wanted)}
+
+            series = self.streams.get(stream_id)
+            if series is None:
+                return {'scope': 'stream', 'stream_id': stream_id, 'window': window, 'error': 'no data for stream'}
+
+            since = int(time.time()) - window
+            events = [e for e in self.events.get(stream_id, ()) if e['timestamp'] >= since]
+            return {'scope': 'stream', 'stream_id': stream_id, 'window': window,
+                    **series.window(window, wanted), 'events': events}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Footprint for stats reports"""
+        with self._lock:
+            return {
+                'streams': len(self.streams),
+                'max_streams': self.max_streams,
+                'bytes': self.host.nbytes + len(self.streams) * self.series_bytes,
+            }
+
+    def sample(self):
+        """Take one sample of every stream and the host"""
+        now = int(time.time())
+
+        from simple_stream_manager import get_simple_stream_manager
+        manager = get_simple_stream_manager()
+
+        from process_manager import get_process_manager
+        process_manager = get_process_manager()
+
+        samples = {}
+        for stream_id, stream in list(manager.streams.items()):
+            progress = stream.get('progress') or {}
+            sample = {
+                'fps': progress.get('fps'),
+                'bitrate_kbps': progress.get('bitrate_kbps'),
+                'speed': progress.get('speed'),
+            }
+
+            # CPU and RSS come from the process registry's batched /proc pass
+            usage = process_manager.get_usage(stream_id)
+            sample['cpu_percent'] = usage.get('cpu_percent')
+            sample['rss_mb'] = usage.get('rss_mb')
+
+            samples[stream_id] = sample
+
+        host_sample = {}
+        try:
+            from status_reporter import get_status_reporter
+            reporter = get_status_reporter()
+            if reporter:
+                latest = reporter.sampler.get_latest()
+                host_sample = {field: latest.get(field) for field in HOST_FIELDS}
+                host_sample['load_1m'] = (latest.get('load_avg') or [None])[0]
+        except Exception as e:
+            logging.debug(f"Host sample unavailable: {e}")
+
+        with self._lock:
+            self.host.add(now, host_sample)
+            for stream_id, sample in samples.items():
+                series = self.streams.get(stream_id) or self._admit_stream(stream_id, set(samples))
+                if series is None:
+                    continue
+                sample['restarts'] = self._pending_restarts.pop(stream_id, 0)
+                series.add(now, sample)
+
+    def _admit_stream(self, stream_id: int, active_ids: set) -> Optional[TieredSeries]:
+        """Create a series for a new stream, evicting the stalest inactive one if over budget"""
+        if len(self.streams) >= self.max_streams:
+            inactive = [sid for sid in self.streams if sid not in active_ids]
+            if not inactive:
+                if not self._budget_warned:
+                    logging.warning(f"⚠️ Metrics memory budget full ({self.max_streams} streams) - not recording stream {stream_id}")
+                    self._budget_warned = True
+                return None
+            evict = min(inactive, key=lambda sid: self.streams[sid].last_update)
+            del self.streams[evict]
+            self.events.pop(evict, None)
+
+        series = self._new_series(STREAM_FIELDS)
+        self.streams[stream_id] = series
+        return series
+
+    def _new_series(self, fields: tuple) -> TieredSeries:
+        return TieredSeries(
+            fields,
+            fine_resolution=self.config.metrics_sample_interval,
+            fine_span=self.config.metrics_fine_span,
+            coarse_resolution=self.config.metrics_coarse_resolution,
+            coarse_span=self.config.metrics_coarse_span,
+        )
+
+    def _collector_loop(self):
+        # Gaps in the history are not worth restarting the agent (and every stream) over
+        watch = get_watchdog().register('metrics_collector', deadline=lambda: self.interval, critical=False)
+        while self.running:
+            watch.beat()
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"❌ Error sampling metrics: {e}")
+            time.sleep(self.interval)
+        get_watchdog().unregister(watch.name, watch)
+
+
+# Global instance management
+_metrics_store: Optional[MetricsStore] = None
+
+
+def init_metrics_store() -> MetricsStore:
+    """Initialize global metrics store"""
+    global _metrics_store
+    _metrics_store = MetricsStore()
+    return _metrics_store
+
+
+def get_metrics_store() -> Optional[MetricsStore]:
+    """Get global metrics store instance (None before init)"""
+    return _metrics_store
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent URL Preflight
+Concurrent reachability checks for stream inputs with a per-URL TTL cache
+"""
+
+import time
+import threading
+from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from utils import TTLCache
+
+
+# Servers that refuse HEAD (or URLs signed for GET only) get a one-byte range GET instead
+HEAD_UNSUPPORTED = {403, 405, 501}
+
+
+class UrlPreflight:
+    """HEAD / range-GET every input before FFmpeg is spawned"""
+
+    def __init__(self, session: requests.Session, timeout: float = 5.0, workers: int = 8,
+                 ttl: int = 300, negative_ttl: int = 30, max_entries: int = 2048):
+        self.session = session
+        self.timeout = timeout
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        # url -> result; failures expire after negative_ttl
+        self._cache = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'checks': 0,
+            'cache_hits': 0,
+            'failures': 0,
+            'last_latency_ms': 0.0,
+            'max_latency_ms': 0.0,
+            'avg_latency_ms': 0.0,
+        }
+
+    def check_all(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Check URLs concurrently, serving fresh results from the cache"""
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = []
+
+        for url in dict.fromkeys(urls):
+            cached = self._cache.get(url)
+            if cached is not None:
+                results[url] = {**cached, 'cached': True}
+                with self._lock:
+                    self.stats['cache_hits'] += 1
+            else:
+                pending.append(url)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(pending)), thread_name_prefix="Preflight") as pool:
+                for url, result in zip(pending, pool.map(self.check, pending)):
+                    results[url] = result
+
+        return results
+
+    def check(self, url: str) -> Dict[str, Any]:
+        """Probe one URL and cache the outcome (failures for a shorter time)"""
+        start = time.perf_counter()
+        result = {'url': url, 'ok': False, 'status': None, 'size': None, 'error': None, 'cached': False}
+
+        try:
+            response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+            if response.status_code in HEAD_UNSUPPORTED:
+                response = self.session.get(url, headers={'Range': 'bytes=0-0'}, timeout=self.timeout, stream=True)
+                response.close()
+
+            result['status'] = response.status_code
+            if response.status_code < 400:
+                result['ok'] = True
+                length = response.headers.get('Content-Range', '').rsplit('/', 1)[-1] or response.headers.get('Content-Length')
+                result['size'] = int(length) if length and length.isdigit() else None
+            else:
+                result['error'] = f"HTTP {response.status_code} {response.reason}"
+
+        except requests.exceptions.Timeout:
+            result['error'] = f"timed out after {self.timeout}s"
+        except requests.exceptions.SSLError as e:
+            result['error'] = f"TLS error: {e}"
+        except requests.exceptions.ConnectionError as e:
+            result['error'] = f"connection failed: {e}"
+        except requests.exceptions.RequestException as e:
+            result['error'] = str(e)
+
+        latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        result['latency_ms'] = latency_ms
+
+        self._cache.set(url, result, self.ttl if result['ok'] else self.negative_ttl)
+        with self._lock:
+            self._record(latency_ms, result['ok'])
+
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Preflight counters and latency for stats reports"""
+        self._cache.expire()
+        with self._lock:
+            return {**self.stats, 'cached_urls': len(self._cache), 'cache': self._cache.get_stats()}
+
+    def _record(self, latency_ms: float, ok: bool):
+        self.stats['checks'] += 1
+        if not ok:
+            self.stats['failures'] += 1
+        self.stats['last_latency_ms'] = latency_ms
+        self.stats['max_latency_ms'] = max(self.stats['max_latency_ms'], latency_ms)
+        checks = self.stats['checks']
+        self.stats['avg_latency_ms'] = round(self.stats['avg_latency_ms'] + (latency_ms - self.stats['avg_latency_ms']) / checks, 2)
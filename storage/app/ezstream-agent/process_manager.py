@@ -1,22 +1,101 @@
 #!/usr/bin/env python3
 """
 EZStream Agent Process Manager
-Simple process tracking for SRS-based streaming
+Registry of FFmpeg child processes: PIDs, process groups, exit history,
+batched /proc resource sampling and pidfd-based reaping with exit classification
 """
 
+import os
 import time
+import select
+import signal
+import hashlib
 import logging
 import threading
-from typing import Dict, List, Optional
+import subprocess
+from collections import deque
+from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
 from enum import Enum
 
 from config import get_config
-from status_reporter import get_status_reporter
+from instrumentation import get_instrumentation
+from agent_watchdog import get_watchdog
+
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# How long the reaper waits for the stderr reader to drain a dead child's last lines
+STDERR_DRAIN_TIMEOUT = 1.0
+
+# Exit classes, sent as error_type in RESTART_REQUEST. Laravel's ProcessRestartRequestJob treats
+# FILE_NOT_FOUND, PERMISSION_ERROR, CORRUPTED_FILE and OUT_OF_MEMORY as permanent.
+NORMAL_EXIT = 'NORMAL_EXIT'
+STOPPED = 'STOPPED'
+OUT_OF_MEMORY = 'OUT_OF_MEMORY'
+KILLED_BY_SIGNAL = 'KILLED_BY_SIGNAL'
+FILE_NOT_FOUND = 'FILE_NOT_FOUND'
+PERMISSION_ERROR = 'PERMISSION_ERROR'
+CORRUPTED_FILE = 'CORRUPTED_FILE'
+NETWORK_ERROR = 'NETWORK_ERROR'
+IO_ERROR = 'IO_ERROR'
+FFMPEG_ERROR = 'FFMPEG_ERROR'
+
+PERMANENT_ERRORS = (FILE_NOT_FOUND, PERMISSION_ERROR, CORRUPTED_FILE, OUT_OF_MEMORY)
+
+# FFmpeg stderr fragments per exit class, matched newest line first (case-insensitive)
+STDERR_PATTERNS = (
+    (FILE_NOT_FOUND, ('no such file or directory', 'http error 404', 'server returned 404')),
+    (PERMISSION_ERROR, ('permission denied', 'http error 403', 'server returned 403', 'server returned 401')),
+    (CORRUPTED_FILE, ('invalid data found when processing input', 'moov atom not found')),
+    (IO_ERROR, ('input/output error', 'i/o error', 'no space left on device')),
+    (NETWORK_ERROR, ('connection refused', 'connection timed out', 'connection reset by peer', 'broken pipe',
+                     'network is unreachable', 'server returned 5', 'failed to resolve hostname')),
+)
+
+
+def read_oom_kill_count() -> Optional[int]:
+    """Kernel-wide OOM kill counter from /proc/vmstat (None on kernels without it)"""
+    try:
+        with open('/proc/vmstat') as f:
+            for line in f:
+                if line.startswith('oom_kill '):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def classify_exit(exit_code: Optional[int], stderr_tail: List[str], requested: bool = False,
+                  oom_killed: bool = False) -> tuple:
+    """Map an exit status and the last stderr lines to (error_type, detail)"""
+    if requested:
+        return STOPPED, 'stop requested'
+
+    if exit_code is not None and exit_code < 0:
+        sig = -exit_code
+        try:
+            name = signal.Signals(sig).name
+        except ValueError:
+            name = f"signal {sig}"
+        if sig == signal.SIGKILL and oom_killed:
+            return OUT_OF_MEMORY, f"{name} from the kernel OOM killer"
+        return KILLED_BY_SIGNAL, name
+
+    for line in reversed(stderr_tail):
+        lowered = line.lower()
+        for error_type, fragments in STDERR_PATTERNS:
+            if any(fragment in lowered for fragment in fragments):
+                return error_type, line[:300]
+
+    if exit_code == 0:
+        return NORMAL_EXIT, 'exit code 0'
+    return FFMPEG_ERROR, f"exit code {exit_code}"
 
 
 class ProcessState(Enum):
-    """SRS stream process states"""
+    """FFmpeg child process states"""
     STARTING = "STARTING"
     RUNNING = "RUNNING"
     STOPPING = "STOPPING"
@@ -24,114 +103,488 @@ class ProcessState(Enum):
     ERROR = "ERROR"
 
 
+@dataclass
+class ProcessExit:
+    """How one child process ended"""
+    pid: int
+    exit_code: Optional[int]
+    started_at: float
+    ended_at: float
+    cmd_hash: str
+    error_type: str = FFMPEG_ERROR
+    detail: Optional[str] = None
+
+    @property
+    def runtime(self) -> float:
+        return self.ended_at - self.started_at
+
+    @property
+    def signal(self) -> Optional[int]:
+        """Signal number for children killed by a signal (Popen reports these as negative codes)"""
+        return -self.exit_code if self.exit_code is not None and self.exit_code < 0 else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'pid': self.pid,
+            'exit_code': self.exit_code,
+            'signal': self.signal,
+            'runtime': round(self.runtime, 3),
+            'ended_at': int(self.ended_at),
+            'cmd_hash': self.cmd_hash,
+            'error_type': self.error_type,
+            'detail': self.detail,
+        }
+
+
 @dataclass
 class ProcessInfo:
-    """SRS stream process information"""
+    """Live FFmpeg child of a stream"""
     stream_id: int
     state: ProcessState = ProcessState.STARTING
     start_time: float = field(default_factory=time.time)
     error_message: Optional[str] = None
     uptime: float = 0.0
+    pid: Optional[int] = None
+    pgid: Optional[int] = None
+    cmd_hash: Optional[str] = None
+    popen: Optional[subprocess.Popen] = field(default=None, repr=False)
+    pidfd: Optional[int] = field(default=None, repr=False)  # Opened at spawn, closed by the reaper
+    usage: Dict[str, Any] = field(default_factory=dict)
+    exits: deque = field(default_factory=lambda: deque(maxlen=20))
+    exit: Optional[ProcessExit] = None
+    exited: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    # Filled by whoever reads the child's stderr; the reaper classifies from it
+    stderr_tail: deque = field(default_factory=lambda: deque(maxlen=30), repr=False)
+    stderr_eof: threading.Event = field(default_factory=threading.Event, repr=False)
+    oom_kills_at_start: Optional[int] = field(default=None, repr=False)
+
+    # Previous /proc counters for rate calculation
+    _prev_ticks: Optional[int] = field(default=None, repr=False)
+    _prev_io: Optional[Dict[str, int]] = field(default=None, repr=False)
+    _prev_time: Optional[float] = field(default=None, repr=False)
+
+
+def _read_proc_sample(pid: int) -> Optional[Dict[str, int]]:
+    """Raw counters for one PID from /proc, None when it is gone"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+        # Fields after the parenthesised command name, which may itself contain spaces
+        fields = stat[stat.rindex(b')') + 2:].split()
+        sample = {
+            'state': fields[0].decode(),
+            'ticks': int(fields[11]) + int(fields[12]),
+            'threads': int(fields[17]),
+            'rss_bytes': int(fields[21]) * PAGE_SIZE,
+        }
+    except (OSError, ValueError, IndexError):
+        return None
+
+    try:
+        sample['fds'] = len(os.listdir(f'/proc/{pid}/fd'))
+    except OSError:
+        sample['fds'] = None
+
+    try:
+        with open(f'/proc/{pid}/io') as f:
+            io = dict(line.split(': ', 1) for line in f.read().splitlines() if ': ' in line)
+        sample['read_bytes'] = int(io.get('read_bytes', 0))
+        sample['write_bytes'] = int(io.get('write_bytes', 0))
+    except (OSError, ValueError):
+        pass
+
+    return sample
 
 
 class ProcessManager:
-    """Simple process manager for SRS streaming"""
-    
+    """Single registry of FFmpeg children, shared by the stream manager and reporters"""
+
     def __init__(self):
         self.config = get_config()
-        self.status_reporter = get_status_reporter()
-        
+
         # Process tracking
         self.processes: Dict[int, ProcessInfo] = {}
+        self.exit_history: Dict[int, deque] = {}
         self.process_lock = threading.RLock()
-        
-        logging.info("🔧 SRS Process Manager initialized")
-    
-    def start_process(self, stream_id: int, srs_config: Dict) -> bool:
-        """Register SRS stream process"""
-        try:
-            with self.process_lock:
-                # Check if already running
-                if stream_id in self.processes:
-                    logging.warning(f"Process for stream {stream_id} already registered")
-                    return False
-                
-                # Create process info
-                process_info = ProcessInfo(stream_id=stream_id)
-                self.processes[stream_id] = process_info
-                
-                logging.info(f"🚀 Registered SRS stream process {stream_id}")
-                
-                # Process started successfully
-                process_info.state = ProcessState.RUNNING
-                return True
-                
-        except Exception as e:
-            error_msg = f"Error registering SRS stream process: {e}"
-            logging.error(f"Stream {stream_id}: {error_msg}")
-            if stream_id in self.processes:
-                self.processes[stream_id].error_message = error_msg
-                self.processes[stream_id].state = ProcessState.ERROR
-            return False
-    
+
+        self.running = False
+        self.sampler_thread = None
+        self.reaper_thread = None
+        self.stats = {
+            'spawned': 0,
+            'exited': 0,
+            'samples': 0,
+            'last_sample_ms': 0.0,
+            'exit_types': {},
+        }
+
+        # Children waiting to be handed to the reaper, and a pipe to wake it for them
+        self._reap_queue: List[ProcessInfo] = []
+        self._wake_r, self._wake_w = os.pipe()
+        self.pidfd_supported = hasattr(os, 'pidfd_open')
+
+        logging.info("🔧 Process Manager initialized")
+
+    def start(self):
+        """Start batched resource sampling"""
+        if self.running:
+            return
+        self.running = True
+        self.sampler_thread = threading.Thread(
+            target=self._sampler_loop,
+            name="ProcessSampler",
+            daemon=True
+        )
+        self.sampler_thread.start()
+        logging.info(f"🔧 Process sampling started (every {self.config.process_sample_interval}s)")
+
+        self.reaper_thread = threading.Thread(
+            target=self._reaper_loop,
+            name="ProcessReaper",
+            daemon=True
+        )
+        self.reaper_thread.start()
+        logging.info(f"🔧 Process reaper started ({'pidfd' if self.pidfd_supported else 'polling'})")
+
+    def spawn(self, stream_id: int, cmd: List[str], **popen_kwargs) -> subprocess.Popen:
+        """Start a child in its own process group and register it for the stream"""
+        with get_instrumentation().timer('ffmpeg.spawn'):
+            process = subprocess.Popen(cmd, start_new_session=True, **popen_kwargs)
+        # Until someone waits on it the child stays at least a zombie, so this PID is still ours -
+        # opened any later, a terminate() that reaped it first could leave us a reused PID
+        pidfd = self._open_pidfd(process.pid)
+        cmd_hash = hashlib.sha1('\0'.join(cmd).encode('utf-8')).hexdigest()[:12]
+
+        with self.process_lock:
+            info = ProcessInfo(
+                stream_id=stream_id,
+                state=ProcessState.RUNNING,
+                pid=process.pid,
+                pgid=process.pid,  # start_new_session makes the child its own group leader
+                cmd_hash=cmd_hash,
+                popen=process,
+                pidfd=pidfd,
+                exits=self.exit_history.setdefault(stream_id, deque(maxlen=20)),
+                oom_kills_at_start=read_oom_kill_count(),
+            )
+            if process.stderr is None:
+                info.stderr_eof.set()
+            self.processes[stream_id] = info
+            self._reap_queue.append(info)
+            self.stats['spawned'] += 1
+        self._wake_reaper()
+
+        logging.info(f"🚀 Registered process for stream {stream_id} (PID {process.pid}, cmd {cmd_hash})")
+        return process
+
+    def get_popen(self, stream_id: int) -> Optional[subprocess.Popen]:
+        """Popen handle of the stream's current child"""
+        with self.process_lock:
+            info = self.processes.get(stream_id)
+            return info.popen if info else None
+
+    def get_info(self, stream_id: int) -> Optional[ProcessInfo]:
+        """Registry entry of the stream's current child"""
+        with self.process_lock:
+            return self.processes.get(stream_id)
+
+    def get_pid(self, stream_id: int) -> Optional[int]:
+        with self.process_lock:
+            info = self.processes.get(stream_id)
+            return info.pid if info else None
+
+    def is_alive(self, stream_id: int) -> bool:
+        """Whether the stream's child is still running"""
+        process = self.get_popen(stream_id)
+        return process is not None and process.poll() is None
+
+    def get_exit_code(self, stream_id: int) -> Optional[int]:
+        process = self.get_popen(stream_id)
+        return process.poll() if process else None
+
+    def wait_for_exit(self, stream_id: int, timeout: Optional[float] = None) -> Optional[ProcessExit]:
+        """Block until the reaper has collected and classified the stream's child, up to timeout"""
+        info = self.get_info(stream_id)
+        if info is None:
+            return None
+        info.exited.wait(timeout)
+        return info.exit
+
+    def _handle_exit(self, info: ProcessInfo) -> Optional[ProcessExit]:
+        """Reap, classify and record a finished child (idempotent)"""
+        exit_code = info.popen.wait()
+        with self.process_lock:
+            if info.exit is not None:
+                return info.exit
+            requested = info.state == ProcessState.STOPPING
+
+        if not requested:
+            info.stderr_eof.wait(STDERR_DRAIN_TIMEOUT)
+        oom_now = read_oom_kill_count()
+        oom_killed = oom_now is not None and info.oom_kills_at_start is not None and oom_now > info.oom_kills_at_start
+        error_type, detail = classify_exit(exit_code, list(info.stderr_tail), requested, oom_killed)
+
+        with self.process_lock:
+            if info.exit is not None:
+                return info.exit
+            exit_record = ProcessExit(
+                pid=info.pid,
+                exit_code=exit_code,
+                started_at=info.start_time,
+                ended_at=time.time(),
+                cmd_hash=info.cmd_hash,
+                error_type=error_type,
+                detail=detail,
+            )
+            info.exit = exit_record
+            info.exits.append(exit_record)
+            info.state = ProcessState.STOPPED if error_type in (STOPPED, NORMAL_EXIT) else ProcessState.ERROR
+            self.stats['exited'] += 1
+            self.stats['exit_types'][error_type] = self.stats['exit_types'].get(error_type, 0) + 1
+        info.exited.set()
+
+        if error_type != STOPPED:
+            logging.warning(f"💀 Stream {info.stream_id} FFmpeg (PID {info.pid}) exited after "
+                            f"{exit_record.runtime:.1f}s: {error_type} ({detail})")
+        return exit_record
+
+    def terminate(self, stream_id: int, timeout: float = 2.0) -> Optional[int]:
+        """SIGTERM the child's whole process group, SIGKILL after timeout; returns the exit code"""
+        with self.process_lock:
+            info = self.processes.get(stream_id)
+            if info is None or info.popen is None:
+                return None
+            if info.state == ProcessState.RUNNING:
+                info.state = ProcessState.STOPPING
+            process, pgid = info.popen, info.pgid
+
+        if process.poll() is None:
+            self._signal_group(pgid, signal.SIGTERM)
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self._signal_group(pgid, signal.SIGKILL)
+                try:
+                    process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    logging.error(f"❌ Process group {pgid} for stream {stream_id} survived SIGKILL")
+
+        self._handle_exit(info)
+        return process.returncode
+
+    def unregister(self, stream_id: int, keep_history: bool = True):
+        """Forget the stream's current child (exit history is kept unless asked otherwise)"""
+        with self.process_lock:
+            self.processes.pop(stream_id, None)
+            if not keep_history:
+                self.exit_history.pop(stream_id, None)
+
     def stop_process(self, stream_id: int, reason: str = "manual") -> bool:
-        """Unregister SRS stream process"""
+        """Terminate and unregister the stream's child"""
         try:
-            with self.process_lock:
-                if stream_id not in self.processes:
-                    logging.warning(f"No process found for stream {stream_id}")
-                    return True
-                
-                process_info = self.processes[stream_id]
-                process_info.state = ProcessState.STOPPING
-                
-                logging.info(f"🛑 Unregistering SRS stream process {stream_id} (reason: {reason})")
-                
-                # Remove from tracking
-                del self.processes[stream_id]
-                
-                logging.info(f"✅ SRS stream process unregistered {stream_id}")
-                return True
-                
+            logging.info(f"🛑 Stopping process for stream {stream_id} (reason: {reason})")
+            self.terminate(stream_id)
+            self.unregister(stream_id)
+            return True
         except Exception as e:
-            logging.error(f"❌ Error unregistering process for stream {stream_id}: {e}")
+            logging.error(f"❌ Error stopping process for stream {stream_id}: {e}")
             return False
-    
+
+    def get_usage(self, stream_id: int) -> Dict[str, Any]:
+        """Latest batched resource sample for the stream's child (empty before the first pass)"""
+        with self.process_lock:
+            info = self.processes.get(stream_id)
+            return info.usage if info else {}
+
+    def get_exit_history(self, stream_id: int) -> List[Dict[str, Any]]:
+        with self.process_lock:
+            return [e.to_dict() for e in self.exit_history.get(stream_id, ())]
+
     def get_process_status(self, stream_id: int) -> Optional[Dict]:
         """Get process status"""
         with self.process_lock:
             if stream_id not in self.processes:
                 return None
-            
+
             process_info = self.processes[stream_id]
             process_info.uptime = time.time() - process_info.start_time
-            
+
             return {
                 'stream_id': stream_id,
                 'state': process_info.state.value,
+                'pid': process_info.pid,
+                'pgid': process_info.pgid,
+                'cmd_hash': process_info.cmd_hash,
                 'uptime': process_info.uptime,
                 'error_message': process_info.error_message,
-                'start_time': process_info.start_time
+                'start_time': process_info.start_time,
+                'usage': process_info.usage,
+                'exits': [e.to_dict() for e in process_info.exits],
             }
-    
+
     def get_active_processes(self) -> List[int]:
-        """Get list of active process IDs"""
+        """Get IDs of streams with a running child"""
         with self.process_lock:
-            return list(self.processes.keys())
-    
+            return [sid for sid, info in self.processes.items() if info.state == ProcessState.RUNNING]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Totals across all children for stats reports"""
+        with self.process_lock:
+            usages = [info.usage for info in self.processes.values() if info.state == ProcessState.RUNNING]
+            stats = dict(self.stats)
+        stats.update({
+            'running': len(usages),
+            'cpu_percent': round(sum(u.get('cpu_percent') or 0 for u in usages), 1),
+            'rss_mb': round(sum(u.get('rss_mb') or 0 for u in usages), 1),
+            'fds': sum(u.get('fds') or 0 for u in usages),
+            'threads': sum(u.get('threads') or 0 for u in usages),
+        })
+        return stats
+
+    def sample(self):
+        """One /proc pass over every registered child"""
+        start = time.perf_counter()
+        with self.process_lock:
+            targets = [info for info in self.processes.values() if info.state == ProcessState.RUNNING and info.pid]
+
+        now = time.monotonic()
+        for info in targets:
+            raw = _read_proc_sample(info.pid)
+            if raw is None:
+                continue
+
+            usage = {
+                'rss_mb': round(raw['rss_bytes'] / (1024**2), 1),
+                'threads': raw['threads'],
+                'fds': raw['fds'],
+                'proc_state': raw['state'],
+                'cpu_percent': None,
+                'sampled_at': int(time.time()),
+            }
+            io = {k: raw[k] for k in ('read_bytes', 'write_bytes') if k in raw}
+            usage.update(io)
+
+            if info._prev_time is not None:
+                elapsed = max(now - info._prev_time, 1e-6)
+                usage['cpu_percent'] = round((raw['ticks'] - info._prev_ticks) / CLOCK_TICKS / elapsed * 100, 1)
+                for key, value in io.items():
+                    if info._prev_io and key in info._prev_io:
+                        usage[key.replace('_bytes', '_bps')] = round((value - info._prev_io[key]) / elapsed)
+
+            info._prev_ticks, info._prev_io, info._prev_time = raw['ticks'], io, now
+            info.usage = usage
+
+        self.stats['samples'] += 1
+        self.stats['last_sample_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
     def stop_all(self):
         """Stop all processes and cleanup"""
-        logging.info("🛑 Stopping all SRS stream processes...")
-        
+        logging.info("🛑 Stopping all stream processes...")
+        self.running = False
+        self._wake_reaper()
+
         # Stop all processes
         with self.process_lock:
-            for stream_id in list(self.processes.keys()):
-                try:
-                    self.stop_process(stream_id, "shutdown")
-                except Exception as e:
-                    logging.error(f"❌ Error stopping process {stream_id} during shutdown: {e}")
-        
-        logging.info("✅ SRS Process Manager stopped")
+            stream_ids = list(self.processes.keys())
+        for stream_id in stream_ids:
+            try:
+                self.stop_process(stream_id, "shutdown")
+            except Exception as e:
+                logging.error(f"❌ Error stopping process {stream_id} during shutdown: {e}")
+
+        logging.info("✅ Process Manager stopped")
+
+    @staticmethod
+    def _signal_group(pgid: Optional[int], sig: int):
+        if not pgid:
+            return
+        try:
+            os.killpg(pgid, sig)
+        except ProcessLookupError:
+            pass
+        except PermissionError as e:
+            logging.warning(f"⚠️ Cannot signal process group {pgid}: {e}")
+
+    def _wake_reaper(self):
+        try:
+            os.write(self._wake_w, b'\0')
+        except OSError:
+            pass
+
+    def _open_pidfd(self, pid: int) -> Optional[int]:
+        """pidfd for a child that has not been waited on, or None to poll for its exit"""
+        if not self.pidfd_supported:
+            return None
+        try:
+            return os.pidfd_open(pid)
+        except OSError as e:
+            logging.warning(f"⚠️ pidfd_open failed ({e}), polling for exits instead")
+            self.pidfd_supported = False
+            return None
+
+    def _reaper_loop(self):
+        """Collect exits as they happen: one pidfd per child in a single poll() set.
+        SIGCHLD is not used - Python runs handlers only on the main thread, which is busy
+        in CommandHandler._process_commands."""
+        poller = select.poll()
+        poller.register(self._wake_r, select.POLLIN)
+        watched: Dict[int, ProcessInfo] = {}
+        polled: List[ProcessInfo] = []
+
+        while self.running:
+            with self.process_lock:
+                pending, self._reap_queue = self._reap_queue, []
+
+            for info in pending:
+                if info.pidfd is None:
+                    polled.append(info)
+                    continue
+                watched[info.pidfd] = info
+                poller.register(info.pidfd, select.POLLIN)
+
+            # Without pidfd, fall back to a short poll() sweep instead of the health check interval
+            events = poller.poll(1000 if polled else None)
+
+            for fd, _ in events:
+                if fd == self._wake_r:
+                    os.read(self._wake_r, 4096)
+                    continue
+                poller.unregister(fd)
+                info = watched.pop(fd)
+                os.close(fd)
+                info.pidfd = None
+                self._safe_handle_exit(info)
+
+            for info in [i for i in polled if i.popen.poll() is not None]:
+                polled.remove(info)
+                self._safe_handle_exit(info)
+
+        with self.process_lock:
+            pending, self._reap_queue = self._reap_queue, []
+        for info in list(watched.values()) + pending:
+            if info.pidfd is not None:
+                os.close(info.pidfd)
+                info.pidfd = None
+
+    def _safe_handle_exit(self, info: ProcessInfo):
+        try:
+            self._handle_exit(info)
+        except Exception as e:
+            logging.error(f"❌ Error handling exit of PID {info.pid}: {e}")
+
+    def _sampler_loop(self):
+        # Stale usage numbers are not worth restarting the agent (and every stream) over
+        watch = get_watchdog().register('process_sampler', deadline=lambda: self.config.process_sample_interval,
+                                        critical=False)
+        while self.running:
+            watch.beat()
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"❌ Error sampling processes: {e}")
+            time.sleep(self.config.process_sample_interval)
+        get_watchdog().unregister(watch.name, watch)
 
 
 # Global instance management
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Redis Access Layer
+One pooled Redis connection for every component, with health checks,
+jittered exponential reconnect and self-healing pub/sub subscriptions
+"""
+
+import time
+import random
+import logging
+import threading
+from typing import Dict, Any, Optional, List
+
+import redis
+
+from config import get_config
+from agent_watchdog import get_watchdog
+
+
+class ManagedPubSub:
+    """Pub/sub wrapper that resubscribes after the connection drops"""
+
+    def __init__(self, manager: 'RedisManager', channels: List[str]):
+        self.manager = manager
+        self.channels = list(channels)
+        self.pubsub = None
+        self.closed = False
+        self._attempt = 0
+        self._next_retry = 0.0
+
+        self._subscribe()
+
+    def get_message(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        """Next message, or None on timeout or while reconnecting"""
+        if self.closed:
+            return None
+
+        if self.pubsub is None:
+            remaining = self._next_retry - time.monotonic()
+            if remaining > 0:
+                # Read once - the watchdog's reconnect() may move _next_retry from another thread
+                time.sleep(max(0.0, min(timeout, remaining)))
+                return None
+            if not self._subscribe():
+                return None
+
+        try:
+            return self.pubsub.get_message(timeout=timeout)
+        except Exception as e:
+            logging.error(f"❌ [REDIS] Pub/sub connection lost on {self.channels}: {e}")
+            self.manager.record_failure(e)
+            self._reset()
+            return None
+
+    def reconnect(self):
+        """Drop the connection - waking a reader blocked on it - and resubscribe on the next read"""
+        logging.warning(f"🔌 [REDIS] Forcing reconnect of subscription {self.channels}")
+        self._reset()
+
+    def close(self):
+        """Unsubscribe and release the connection"""
+        self.closed = True
+        self._reset()
+
+    def _subscribe(self) -> bool:
+        try:
+            pubsub = self.manager.get_client().pubsub(ignore_subscribe_messages=False)
+            pubsub.subscribe(*self.channels)
+            self.pubsub = pubsub
+
+            if self._attempt:
+                self.manager.stats['resubscribes'] += 1
+                logging.info(f"✅ [REDIS] Resubscribed to {self.channels} after {self._attempt} attempts")
+            self._attempt = 0
+            return True
+
+        except Exception as e:
+            self._attempt += 1
+            delay = self.manager.backoff_delay(self._attempt)
+            self._next_retry = time.monotonic() + delay
+            self.manager.record_failure(e)
+            logging.warning(f"⚠️ [REDIS] Subscribe to {self.channels} failed (attempt {self._attempt}), retrying in {delay:.1f}s: {e}")
+            return False
+
+    def _reset(self):
+        if self.pubsub is not None:
+            try:
+                self.pubsub.close()
+            except Exception:
+                pass
+            self.pubsub = None
+        self._attempt = max(self._attempt, 1)
+        self._next_retry = time.monotonic() + self.manager.backoff_delay(self._attempt)
+
+
+class RedisManager:
+    """Shared Redis connection pool with periodic health checks"""
+
+    def __init__(self):
+        self.config = get_config()
+
+        redis_config = self.config.get_redis_config()
+        self.pool = redis.ConnectionPool(
+            max_connections=self.config.redis_max_connections,
+            health_check_interval=self.config.redis_health_check_interval,
+            **redis_config
+        )
+        self.client = redis.Redis(connection_pool=self.pool)
+
+        self.running = False
+        self.healthy = False
+        self.health_thread = None
+        self._check_now = threading.Event()
+        self._pubsubs: List[ManagedPubSub] = []
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'connects': 0,
+            'reconnects': 0,
+            'failures': 0,
+            'health_checks': 0,
+            'resubscribes': 0,
+            'last_ping_ms': 0.0,
+            'last_error': None,
+            'last_error_time': None,
+        }
+
+    def connect(self):
+        """Verify the pool can reach Redis, raising if it cannot"""
+        self._ping()
+        self.healthy = True
+        self.stats['connects'] += 1
+        logging.info(f"✅ Connected to Redis at {self.config.redis_host}:{self.config.redis_port} (shared pool)")
+
+    def start(self):
+        """Start background health checks"""
+        if self.running:
+            return
+
+        self.running = True
+        self.health_thread = threading.Thread(
+            target=self._health_loop,
+            name="RedisHealth",
+            daemon=True
+        )
+        self.health_thread.start()
+        logging.info(f"🩺 Redis health checks started (every {self.config.redis_health_check_interval}s)")
+
+    def stop(self):
+        """Stop health checks, close subscriptions and release the pool"""
+        self.running = False
+        self._check_now.set()
+
+        if self.health_thread:
+            self.health_thread.join(timeout=5)
+
+        with self._lock:
+            pubsubs = list(self._pubsubs)
+            self._pubsubs.clear()
+        for pubsub in pubsubs:
+            pubsub.close()
+
+        try:
+            self.pool.disconnect()
+        except Exception as e:
+            logging.error(f"❌ Error closing Redis pool: {e}")
+
+        logging.info("✅ Redis connection pool closed")
+
+    def get_client(self) -> redis.Redis:
+        """Shared client backed by the pool"""
+        return self.client
+
+    def pubsub(self, *channels: str) -> ManagedPubSub:
+        """Subscription that survives connection drops"""
+        managed = ManagedPubSub(self, list(channels))
+        with self._lock:
+            self._pubsubs.append(managed)
+        return managed
+
+    def record_failure(self, error: Exception):
+        """Called by components when a Redis call fails - triggers an immediate health check"""
+        self.stats['failures'] += 1
+        self.stats['last_error'] = str(error)
+        self.stats['last_error_time'] = int(time.time())
+        self.healthy = False
+        self._check_now.set()
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter"""
+        cap = min(self.config.redis_reconnect_max_delay, self.config.redis_reconnect_base_delay * (2 ** max(0, attempt - 1)))
+        return random.uniform(cap / 2, cap)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Connection metrics for stats reports"""
+        stats = dict(self.stats)
+        stats['healthy'] = self.healthy
+        stats['subscriptions'] = len(self._pubsubs)
+        try:
+            stats['pool_in_use'] = len(self.pool._in_use_connections)
+            stats['pool_available'] = len(self.pool._available_connections)
+        except AttributeError:
+            pass
+        return stats
+
+    def _ping(self):
+        start = time.perf_counter()
+        self.client.ping()
+        self.stats['last_ping_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    def _health_loop(self):
+        """Ping periodically; when unhealthy, reconnect with backoff until Redis answers"""
+        attempt = 0
+        watch = get_watchdog().register(
+            'redis_health',
+            deadline=lambda: self.config.redis_health_check_interval + self.config.redis_reconnect_max_delay
+        )
+
+        while self.running:
+            watch.beat()
+            if attempt == 0:
+                self._check_now.wait(self.config.redis_health_check_interval)
+            else:
+                # Failure reports during backoff must not cut the delay short
+                time.sleep(self.backoff_delay(attempt))
+            self._check_now.clear()
+            if not self.running:
+                break
+
+            self.stats['health_checks'] += 1
+            try:
+                if attempt > 0:
+                    # Drop every pooled socket so the next command dials a fresh one
+                    self.pool.disconnect(inuse_connections=False)
+                self._ping()
+
+                if attempt > 0 or not self.healthy:
+                    self.stats['reconnects'] += 1
+                    logging.info(f"✅ [REDIS] Connection restored after {attempt} attempts")
+                self.healthy = True
+                attempt = 0
+
+            except Exception as e:
+                attempt += 1
+                self.healthy = False
+                self.stats['failures'] += 1
+                self.stats['last_error'] = str(e)
+                self.stats['last_error_time'] = int(time.time())
+                logging.warning(f"⚠️ [REDIS] Health check failed (attempt {attempt}): {e}")
+
+        get_watchdog().unregister(watch.name, watch)
+
+
+# Global instance management
+_redis_manager: Optional[RedisManager] = None
+
+
+def init_redis_manager(connect: bool = True) -> RedisManager:
+    """Initialize global Redis manager and verify connectivity (connect=False leaves that to the caller)"""
+    global _redis_manager
+    _redis_manager = RedisManager()
+    if connect:
+        _redis_manager.connect()
+    return _redis_manager
+
+
+def get_redis_manager() -> RedisManager:
+    """Get global Redis manager instance"""
+    if _redis_manager is None:
+        raise RuntimeError("Redis manager not initialized. Call init_redis_manager() first.")
+    return _redis_manager
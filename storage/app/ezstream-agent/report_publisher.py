@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Report Publisher
+Coalescing, pipelined publisher for the agent-reports channel
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable, List, Optional
+
+from utils import safe_json_dumps, Histogram
+from instrumentation import get_instrumentation
+from agent_watchdog import get_watchdog
+
+
+REPORTS_CHANNEL = 'agent-reports'
+
+# Report types worth keeping through a Redis outage - heartbeats are rebuilt from live state
+SPOOLED_TYPES = {'STATUS_UPDATE', 'RESTART_REQUEST', 'FILE_PROCESSING_UPDATE'}
+
+
+class ReportPublisher:
+    """Buffers reports for a short window and flushes the latest state per key in one pipeline"""
+
+    def __init__(self, get_redis: Callable, vps_id: int, flush_interval: float = 0.2,
+                 max_buffer: int = 500, batch_enabled: bool = False, batch_max: int = 100,
+                 spool=None):
+        self.get_redis = get_redis
+        self.vps_id = vps_id
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.batch_enabled = batch_enabled
+        self.batch_max = batch_max
+        self.spool = spool
+
+        self.running = False
+        self.flush_thread = None
+        self.replay_thread = None
+
+        # Pending reports keyed by coalesce key, oldest first
+        self._buffer: 'OrderedDict[Hashable, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._full = threading.Event()
+
+        # Counters
+        self.stats = {
+            'submitted': 0,
+            'coalesced': 0,
+            'published': 0,
+            'redis_messages': 0,
+            'batches': 0,
+            'failed': 0,
+            'flushes': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'avg_flush_ms': 0.0,
+        }
+        self.flush_latency = Histogram()
+
+    def start(self):
+        """Start background flush thread"""
+        if self.running:
+            return
+
+        self.running = True
+        self.flush_thread = threading.Thread(
+            target=self._flush_loop,
+            name="ReportPublisher",
+            daemon=True
+        )
+        self.flush_thread.start()
+
+        if self.spool:
+            self.replay_thread = threading.Thread(
+                target=self._replay_loop,
+                name="ReportSpoolReplay",
+                daemon=True
+            )
+            self.replay_thread.start()
+        logging.info(f"📤 Report publisher started (window: {self.flush_interval}s, batch: {self.batch_enabled})")
+
+    def stop(self):
+        """Stop flush thread and publish whatever is still buffered"""
+        self.running = False
+        self._wakeup.set()
+        self._full.set()
+
+        if self.flush_thread:
+            self.flush_thread.join(timeout=5)
+        if self.replay_thread:
+            self.replay_thread.join(timeout=5)
+
+        self.flush()
+        if self.spool:
+            self.spool.close()
+        logging.info("📤 Report publisher stopped")
+
+    def submit(self, payload: Dict[str, Any]):
+        """Queue a report, replacing any pending report with the same key"""
+        key = self.coalesce_key(payload)
+
+        with self._lock:
+            self.stats['submitted'] += 1
+            if key in self._buffer:
+                self.stats['coalesced'] += 1
+                del self._buffer[key]
+            self._buffer[key] = payload
+            buffered = len(self._buffer)
+
+        if buffered >= self.max_buffer:
+            self._full.set()
+        self._wakeup.set()
+
+    def publish_now(self, payload: Dict[str, Any]) -> bool:
+        """Publish a report immediately behind anything buffered, returns whether Redis accepted it"""
+        with self._lock:
+            self.stats['submitted'] += 1
+        try:
+            # Never buffered - the flush thread cannot take it and fail where we would not see it
+            self._flush_pending(payload)
+            return True
+        except Exception as e:
+            logging.error(f"❌ [REDIS] Immediate publish of '{payload.get('type', 'UNKNOWN')}' failed: {e}")
+            return False
+
+    def flush(self) -> int:
+        """Publish all buffered reports now, returns number of reports sent"""
+        try:
+            return self._flush_pending()
+        except Exception as e:
+            logging.error(f"❌ [REDIS] Failed to publish reports: {e}")
+            return 0
+
+    def _flush_pending(self, payload: Optional[Dict[str, Any]] = None) -> int:
+        """Publish buffered reports, then payload if given, in one pipeline, raising if Redis rejects it"""
+        with self._flush_lock:
+            with self._lock:
+                reports = list(self._buffer.values())
+                self._buffer.clear()
+            if payload is not None:
+                reports.append(payload)
+            if not reports:
+                return 0
+
+            # While older reports are still on disk, new ones queue behind them to keep order
+            if self.spool and self.spool.has_backlog():
+                spooled = [r for r in reports if r.get('type') in SPOOLED_TYPES]
+                self.spool.append(spooled)
+                reports = [r for r in reports if r.get('type') not in SPOOLED_TYPES]
+                if not reports:
+                    return 0
+
+            start = time.perf_counter()
+            try:
+                # Built inside the try so a bad report is spooled with the rest instead of dropped
+                messages = self._build_messages(reports)
+                self._send(messages)
+            except Exception:
+                with self._lock:
+                    self.stats['failed'] += len(reports)
+                if self.spool:
+                    self.spool.append([r for r in reports if r.get('type') in SPOOLED_TYPES])
+                raise
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.flush_latency.observe(elapsed_ms / 1000)
+            with self._lock:
+                self.stats['published'] += len(reports)
+                self.stats['redis_messages'] += len(messages)
+                self.stats['batches'] += sum(1 for m in messages if m.get('type') == 'STATUS_BATCH')
+                self.stats['flushes'] += 1
+                self.stats['last_flush_ms'] = round(elapsed_ms, 2)
+                self.stats['max_flush_ms'] = round(max(self.stats['max_flush_ms'], elapsed_ms), 2)
+                # Exponential moving average keeps this O(1)
+                avg = self.stats['avg_flush_ms']
+                self.stats['avg_flush_ms'] = round(elapsed_ms if avg == 0 else avg * 0.9 + elapsed_ms * 0.1, 2)
+
+            logging.debug(f"📤 [REDIS] Flushed {len(reports)} reports as {len(messages)} messages in {elapsed_ms:.1f}ms")
+            return len(reports)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get publisher counters and flush latency"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._buffer)
+        if self.spool:
+            stats['spool'] = self.spool.get_stats()
+        return stats
+
+    def _send(self, messages: List[Dict[str, Any]]):
+        """Publish messages in one non-transactional pipeline"""
+        with get_instrumentation().timer('redis.publish_reports'):
+            redis_conn = self.get_redis()
+            pipe = redis_conn.pipeline(transaction=False)
+            for message in messages:
+                pipe.publish(REPORTS_CHANNEL, safe_json_dumps(message))
+            pipe.execute()
+
+    def _replay_loop(self):
+        """Drain the spool once Redis answers again"""
+        while self.running:
+            try:
+                time.sleep(1)
+                if not self.spool.has_backlog():
+                    continue
+
+                self.get_redis().ping()
+                if self.spool.replay(lambda reports: self._send(self._build_messages(reports))):
+                    logging.info("💾 [SPOOL] Backlog replayed, publishing directly again")
+
+            except Exception as e:
+                logging.debug(f"Spool replay waiting for Redis: {e}")
+
+    def _flush_loop(self):
+        """Wait for reports, hold them for the coalescing window, then flush"""
+        watch = get_watchdog().register('report_flush', deadline=lambda: 1.0 + self.flush_interval)
+        while self.running:
+            watch.beat()
+            try:
+                if not self._wakeup.wait(timeout=1.0):
+                    continue
+
+                # Coalescing window - cut short if the buffer fills up
+                self._full.wait(timeout=self.flush_interval)
+                self._full.clear()
+                self._wakeup.clear()
+
+                self.flush()
+
+            except Exception as e:
+                logging.error(f"❌ Error in report publisher loop: {e}")
+                time.sleep(1)
+        get_watchdog().unregister(watch.name, watch)
+
+    def _build_messages(self, reports: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turn buffered reports into Redis messages, grouping status updates when batching is on.
+        Only consecutive updates are grouped, so messages keep their submission order."""
+        if not self.batch_enabled:
+            return reports
+
+        messages = []
+        updates = []
+
+        def flush_updates():
+            if len(updates) == 1:
+                messages.append(updates[0])
+            elif updates:
+                for i in range(0, len(updates), self.batch_max):
+                    messages.append({
+                        'type': 'STATUS_BATCH',
+                        'vps_id': self.vps_id,
+                        'updates': updates[i:i + self.batch_max],
+                        'timestamp': int(time.time())
+                    })
+            updates.clear()
+
+        for report in reports:
+            if report.get('type') == 'STATUS_UPDATE':
+                updates.append(report)
+            else:
+                flush_updates()
+                messages.append(report)
+        flush_updates()
+
+        return messages
+
+    @staticmethod
+    def coalesce_key(payload: Dict[str, Any]) -> Hashable:
+        """Reports for the same subject and type supersede each other"""
+        report_type = payload.get('type', 'UNKNOWN')
+
+        # Replies to a request (METRICS_RESPONSE) are each awaited by someone - never merge them
+        if payload.get('request_id'):
+            return (report_type, 'request', payload['request_id'])
+        if 'stream_id' in payload:
+            return (report_type, 'stream', payload.get('stream_id'))
+        if 'file_id' in payload:
+            return (report_type, 'file', payload.get('file_id'))
+        return (report_type,)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Report Spool
+Bounded on-disk spool that keeps reports while Redis is unreachable and replays them in order
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Callable, Hashable
+
+from utils import safe_json_dumps, ensure_directory
+
+
+SEGMENT_PREFIX = 'segment_'
+SEGMENT_SUFFIX = '.jsonl'
+
+
+class ReportSpool:
+    """Append-only segment files with a size cap, compacted and rate-limited on replay"""
+
+    def __init__(self, spool_dir: str, key_func: Callable[[Dict[str, Any]], Hashable],
+                 max_bytes: int = 16 * 1024 * 1024, segment_bytes: int = 1024 * 1024,
+                 replay_rate: int = 200, max_age: int = 3600):
+        self.spool_dir = spool_dir
+        self.key_func = key_func
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.replay_rate = max(1, replay_rate)
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._active_file = None
+        self._active_seq = 0
+        self._active_size = 0
+
+        self.stats = {
+            'spooled': 0,
+            'replayed': 0,
+            'compacted': 0,
+            'expired': 0,
+            'dropped': 0,
+            'replay_failures': 0,
+        }
+
+        ensure_directory(self.spool_dir)
+        segments = self._list_segments()
+        self._next_seq = (segments[-1][0] + 1) if segments else 1
+        if segments:
+            logging.warning(f"💾 Report spool has {len(segments)} segments from a previous run - will replay")
+
+    def has_backlog(self) -> bool:
+        """Whether any reports are waiting on disk"""
+        with self._lock:
+            return self._active_size > 0 or bool(self._list_segments(include_active=False))
+
+    def append(self, reports: List[Dict[str, Any]]):
+        """Write reports to the active segment, rotating and enforcing the size cap"""
+        if not reports:
+            return
+
+        with self._lock:
+            try:
+                if self._active_file is None or self._active_size >= self.segment_bytes:
+                    self._rotate_locked()
+
+                now = int(time.time())
+                lines = ''.join(
+                    safe_json_dumps({'t': now, 'k': list(self.key_func(r)), 'p': r}) + '\n'
+                    for r in reports
+                )
+                data = lines.encode('utf-8')
+                self._active_file.write(data)
+                self._active_file.flush()
+                self._active_size += len(data)
+                self.stats['spooled'] += len(reports)
+
+                self._enforce_cap_locked()
+
+            except Exception as e:
+                self.stats['dropped'] += len(reports)
+                logging.error(f"❌ [SPOOL] Failed to spool {len(reports)} reports: {e}")
+
+    def replay(self, publish: Callable[[List[Dict[str, Any]]], None]) -> bool:
+        """Replay all spooled reports in order, returns True once the spool is empty.
+        publish() must raise if Redis did not accept the chunk."""
+        with self._replay_lock:
+            while True:
+                with self._lock:
+                    self._seal_active_locked()
+                    segments = self._list_segments(include_active=False)
+                    if not segments:
+                        return True
+
+                entries = self._compact(self._read_segments(segments))
+                logging.info(f"💾 [SPOOL] Replaying {len(entries)} reports from {len(segments)} segments")
+
+                sent = 0
+                try:
+                    while sent < len(entries):
+                        chunk_start = time.monotonic()
+                        chunk = entries[sent:sent + self.replay_rate]
+                        publish([entry['p'] for entry in chunk])
+                        sent += len(chunk)
+                        self.stats['replayed'] += len(chunk)
+
+                        if sent < len(entries):
+                            time.sleep(max(0.0, 1.0 - (time.monotonic() - chunk_start)))
+
+                except Exception as e:
+                    self.stats['replay_failures'] += 1
+                    logging.error(f"❌ [SPOOL] Replay stopped after {sent}/{len(entries)} reports: {e}")
+                    with self._lock:
+                        self._rewrite_segments_locked(segments, entries[sent:])
+                    return False
+
+                with self._lock:
+                    for _, path in segments:
+                        self._remove(path)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Spool counters and on-disk footprint"""
+        with self._lock:
+            segments = self._list_segments()
+            stats = dict(self.stats)
+            stats['segments'] = len(segments)
+            stats['bytes'] = sum(self._size(path) for _, path in segments)
+        return stats
+
+    def close(self):
+        """Close the active segment, leaving pending reports for the next run"""
+        with self._lock:
+            self._seal_active_locked()
+
+    def _compact(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep only the newest entry per key and drop expired ones, preserving order"""
+        cutoff = time.time() - self.max_age
+        latest: Dict[Hashable, int] = {}
+        for index, entry in enumerate(entries):
+            latest[tuple(entry['k'])] = index
+
+        kept = []
+        for index, entry in enumerate(entries):
+            if latest[tuple(entry['k'])] != index:
+                self.stats['compacted'] += 1
+            elif entry.get('t', 0) < cutoff:
+                self.stats['expired'] += 1
+            else:
+                kept.append(entry)
+        return kept
+
+    def _read_segments(self, segments) -> List[Dict[str, Any]]:
+        entries = []
+        for _, path in segments:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            entries.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            # Torn write from a crash - skip the partial line
+                            self.stats['dropped'] += 1
+            except OSError as e:
+                logging.warning(f"⚠️ [SPOOL] Could not read {path}: {e}")
+        return entries
+
+    def _rewrite_segments_locked(self, segments, remaining: List[Dict[str, Any]]):
+        """Replace replayed segments with one segment holding what is left, keeping its place in order"""
+        first_path = segments[0][1]
+        tmp_path = first_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in remaining:
+                f.write(safe_json_dumps(entry) + '\n')
+        os.replace(tmp_path, first_path)
+
+        for _, path in segments[1:]:
+            self._remove(path)
+
+    def _rotate_locked(self):
+        self._seal_active_locked()
+        self._active_seq = self._next_seq
+        self._next_seq += 1
+        self._active_file = open(self._segment_path(self._active_seq), 'ab')
+        self._active_size = 0
+
+    def _seal_active_locked(self):
+        if self._active_file is not None:
+            self._active_file.close()
+            self._active_file = None
+            if self._active_size == 0:
+                self._remove(self._segment_path(self._active_seq))
+            self._active_size = 0
+
+    def _enforce_cap_locked(self):
+        """Drop whole segments, oldest first, while the spool is over its size cap"""
+        segments = self._list_segments()
+        total = sum(self._size(path) for _, path in segments)
+
+        for seq, path in segments:
+            if total <= self.max_bytes or seq == self._active_seq:
+                break
+            size = self._size(path)
+            dropped = self._count_lines(path)
+            self._remove(path)
+            total -= size
+            self.stats['dropped'] += dropped
+            logging.warning(f"⚠️ [SPOOL] Size cap reached, dropped oldest segment with {dropped} reports")
+
+    def _list_segments(self, include_active: bool = True):
+        segments = []
+        try:
+            for name in os.listdir(self.spool_dir):
+                if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                    try:
+                        seq = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                    except ValueError:
+                        continue
+                    if not include_active and self._active_file is not None and seq == self._active_seq:
+                        continue
+                    segments.append((seq, os.path.join(self.spool_dir, name)))
+        except OSError:
+            pass
+        return sorted(segments)
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.spool_dir, f"{SEGMENT_PREFIX}{seq:08d}{SEGMENT_SUFFIX}")
+
+    @staticmethod
+    def _count_lines(path: str) -> int:
+        try:
+            with open(path, 'rb') as f:
+                return sum(1 for _ in f)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -8,14 +8,18 @@ import subprocess
 import threading
 import time
 import logging
-import psutil
 import os
-import requests
 import hashlib
 from typing import Dict, Optional, List
 from enum import Enum
 from dataclasses import dataclass
 
+from config import get_config
+from media_prepare import PREPARED_SUFFIX
+from process_manager import get_process_manager, PERMANENT_ERRORS
+from instrumentation import get_instrumentation
+from agent_watchdog import get_watchdog
+
 class StreamStatus(Enum):
     STOPPED = "stopped"
     STARTING = "starting"
@@ -46,8 +50,27 @@ class SimpleStreamManager:
         # Create cache directory
         os.makedirs(self.cache_dir, exist_ok=True)
 
+        # Running monitors pick up restart/health tuning from UPDATE_SETTINGS on their next tick
+        get_config().subscribe(self._on_config_change)
+
         logging.info("🎬 Simple Stream Manager initialized (FFmpeg Direct with Caching)")
 
+    def _on_config_change(self, changes: Dict, version: int):
+        """Apply FFmpeg supervision settings to every running stream"""
+        mapping = {
+            'ffmpeg_max_retries': 'max_retries',
+            'ffmpeg_restart_delay': 'restart_delay',
+            'ffmpeg_health_check_interval': 'health_check_interval',
+        }
+        updates = {attr: changes[key][1] for key, attr in mapping.items() if key in changes}
+        if not updates:
+            return
+
+        for stream in list(self.streams.values()):
+            for attr, value in updates.items():
+                setattr(stream['config'], attr, value)
+        logging.info(f"🔧 Applied config v{version} to {len(self.streams)} running streams: {updates}")
+
     def _get_cache_key(self, url: str) -> str:
         """Generate cache key for URL"""
         return hashlib.md5(url.encode()).hexdigest()
@@ -69,7 +92,6 @@ class SimpleStreamManager:
             self.streams[stream_id] = {
                 'config': config,
                 'status': StreamStatus.STARTING,
-                'process': None,
                 'retry_count': 0,
                 'start_time': time.time(),
                 'last_restart': None
@@ -79,14 +101,16 @@ class SimpleStreamManager:
             logging.info(f"   Input URLs: {config.input_urls}")
             logging.info(f"   Output: {config.output_url}")
             
-            # Start monitoring thread
-            monitor_thread = threading.Thread(
-                target=self._monitor_stream,
-                args=(stream_id,),
-                daemon=True
+            # Start monitoring thread - if it wedges the watchdog starts a replacement that adopts the process,
+            # and if replacements wedge too only this stream is stopped, never the agent and its other streams
+            self.streams[stream_id]['watch'] = get_watchdog().register(
+                f"stream_monitor:{stream_id}",
+                deadline=lambda: config.health_check_interval + config.restart_delay + 5,
+                restart=lambda: self._start_monitor_thread(stream_id),
+                critical=False,
+                on_exhausted=lambda: self._abandon_stream(stream_id)
             )
-            monitor_thread.start()
-            self.monitoring_threads[stream_id] = monitor_thread
+            self._start_monitor_thread(stream_id)
             
             return True
             
@@ -94,6 +118,37 @@ class SimpleStreamManager:
             logging.error(f"❌ Error starting stream {stream_id}: {e}")
             return False
     
+    def _start_monitor_thread(self, stream_id: int):
+        watch = self.streams[stream_id]['watch']
+        monitor_thread = threading.Thread(
+            target=self._monitor_stream,
+            args=(stream_id, watch.generation),
+            name=f"StreamMonitor-{stream_id}",
+            daemon=True
+        )
+        monitor_thread.start()
+        self.monitoring_threads[stream_id] = monitor_thread
+
+    def _abandon_stream(self, stream_id: int):
+        """Stop a stream whose monitor stayed stuck through every watchdog restart and report it as failed"""
+        stream = self.streams.get(stream_id)
+        if not stream:
+            return
+
+        message = 'Stream monitor stuck after watchdog restarts, stream stopped by agent'
+        logging.error(f"❌ Stream {stream_id}: {message}")
+        stream['status'] = StreamStatus.ERROR
+        self._record_stream_event(stream_id, 'error', message)
+        self.stop_stream(stream_id)
+
+        try:
+            from status_reporter import get_status_reporter
+            status_reporter = get_status_reporter()
+            if status_reporter:
+                status_reporter.publish_stream_status(stream_id, 'ERROR', message)
+        except Exception as e:
+            logging.error(f"❌ Error reporting abandoned stream {stream_id}: {e}")
+
     def stop_stream(self, stream_id: int) -> bool:
         """Stop a stream and its monitoring"""
         try:
@@ -105,22 +160,19 @@ class SimpleStreamManager:
             
             # Update status
             self.streams[stream_id]['status'] = StreamStatus.STOPPED
+            watch = self.streams[stream_id].get('watch')
+            if watch:
+                get_watchdog().unregister(watch.name, watch)
             
-            # Kill process
-            process = self.streams[stream_id].get('process')
-            if process and process.poll() is None:
+            # Kill the FFmpeg process group (SIGTERM, then SIGKILL after 2s)
+            process_manager = get_process_manager()
+            if process_manager.is_alive(stream_id):
                 try:
-                    # Graceful termination
-                    process.terminate()
-                    time.sleep(2)
-                    
-                    # Force kill if still running
-                    if process.poll() is None:
-                        process.kill()
-                        
+                    process_manager.terminate(stream_id, timeout=2)
                     logging.info(f"✅ Stream {stream_id} process terminated")
                 except Exception as e:
                     logging.error(f"❌ Error killing process: {e}")
+            process_manager.unregister(stream_id, keep_history=False)
             
             # Stop monitoring thread
             if stream_id in self.monitoring_threads:
@@ -143,31 +195,35 @@ class SimpleStreamManager:
             return None
         
         stream = self.streams[stream_id]
-        process = stream.get('process')
-        
+        process_manager = get_process_manager()
+        alive = process_manager.is_alive(stream_id)
+
         status = {
             'stream_id': stream_id,
             'status': stream['status'].value,
             'retry_count': stream['retry_count'],
             'uptime': time.time() - stream['start_time'],
             'last_restart': stream['last_restart'],
-            'process_alive': process and process.poll() is None if process else False
+            'process_alive': alive
         }
-        
-        # Add process stats if running
-        if process and process.poll() is None:
-            try:
-                proc = psutil.Process(process.pid)
-                status.update({
-                    'cpu_percent': proc.cpu_percent(),
-                    'memory_mb': proc.memory_info().rss / 1024 / 1024,
-                    'pid': process.pid
-                })
-            except:
-                pass
-        
+
+        # Add process stats from the registry's latest /proc pass
+        if alive:
+            usage = process_manager.get_usage(stream_id)
+            status.update({
+                'cpu_percent': usage.get('cpu_percent'),
+                'memory_mb': usage.get('rss_mb'),
+                'fds': usage.get('fds'),
+                'pid': process_manager.get_pid(stream_id)
+            })
+
         return status
     
+    def get_running_stream_ids(self) -> List[int]:
+        """Get IDs of running streams without probing their processes"""
+        return [stream_id for stream_id, stream in list(self.streams.items())
+                if stream['status'] == StreamStatus.RUNNING]
+
     def get_all_streams_status(self) -> List[Dict]:
         """Get status of all streams with enhanced health info"""
         status_list = []
@@ -194,47 +250,41 @@ class SimpleStreamManager:
                 return 'not_found'
 
             stream = self.streams[stream_id]
-            process = stream.get('process')
+            process_manager = get_process_manager()
 
-            if not process:
+            if process_manager.get_popen(stream_id) is None:
                 return 'no_process'
 
-            if process.poll() is not None:
+            if not process_manager.is_alive(stream_id):
                 return 'process_dead'
 
-            # Check if process is active
-            try:
-                proc = psutil.Process(process.pid)
-                cpu_percent = proc.cpu_percent()
-
-                # Update last health check
-                stream['last_health_check'] = time.time()
+            # Update last health check
+            stream['last_health_check'] = time.time()
 
-                # Health determination
-                if cpu_percent > 0.1:  # Active streaming
-                    return 'healthy'
-                else:
-                    return 'idle'  # Process exists but not active
+            # CPU is None until the sampler has seen the process twice
+            cpu_percent = process_manager.get_usage(stream_id).get('cpu_percent')
 
-            except psutil.NoSuchProcess:
-                return 'process_dead'
-            except Exception as e:
-                logging.debug(f"Health check error for stream {stream_id}: {e}")
-                return 'unknown'
+            # Health determination
+            if cpu_percent is not None and cpu_percent > 0.1:  # Active streaming
+                return 'healthy'
+            else:
+                return 'idle'  # Process exists but not active
 
         except Exception as e:
             logging.error(f"❌ Error checking health for stream {stream_id}: {e}")
             return 'error'
     
-    def _monitor_stream(self, stream_id: int):
+    def _monitor_stream(self, stream_id: int, generation: int):
         """Monitor stream health and restart if needed"""
         stream = self.streams[stream_id]
         config = stream['config']
+        watch = stream['watch']
         
-        while stream['status'] != StreamStatus.STOPPED and self.running:
+        while stream['status'] != StreamStatus.STOPPED and self.running and watch.is_current(generation):
+            watch.beat()
             try:
-                # Start/restart FFmpeg process
-                if not self._start_ffmpeg_process(stream_id):
+                # Start/restart FFmpeg process - a monitor restarted by the watchdog adopts the live one
+                if not get_process_manager().is_alive(stream_id) and not self._start_ffmpeg_process(stream_id):
                     if stream['retry_count'] >= config.max_retries:
                         logging.error(f"❌ Stream {stream_id} exceeded max retries ({config.max_retries})")
                         stream['status'] = StreamStatus.ERROR
@@ -244,45 +294,58 @@ class SimpleStreamManager:
                     time.sleep(config.restart_delay)
                     continue
                 
+                process_manager = get_process_manager()
+
                 # Monitor process health with status reporting
                 while (stream['status'] != StreamStatus.STOPPED and
                        self.running and
+                       watch.is_current(generation) and
                        self._is_process_healthy(stream_id)):
+                    watch.beat()
 
                     # Report health status periodically
-                    self._report_stream_health(stream_id)
+                    with get_instrumentation().timer('stream.health_check'):
+                        self._report_stream_health(stream_id)
+
+                    # The reaper wakes us as soon as FFmpeg exits
+                    if process_manager.wait_for_exit(stream_id, config.health_check_interval):
+                        break
 
-                    time.sleep(config.health_check_interval)
-                
                 # Process died or unhealthy
-                if stream['status'] != StreamStatus.STOPPED:
+                if stream['status'] != StreamStatus.STOPPED and watch.is_current(generation):
                     health = self._check_stream_health(stream_id)
 
-                    # Get exit code and stderr for debugging
-                    process = stream.get('process')
-                    exit_code = process.poll() if process else None
-                    stderr_output = ""
-
-                    if process and process.stderr:
-                        try:
-                            stderr_output = process.stderr.read().decode('utf-8', errors='ignore').strip()
-                        except:
-                            pass
+                    # Exit status as classified by the reaper (signal, OOM, FFmpeg error, I/O error)
+                    exit_record = process_manager.wait_for_exit(stream_id, 5)
+                    exit_code = exit_record.exit_code if exit_record else None
+                    error_type = exit_record.error_type if exit_record else None
+                    info = process_manager.get_info(stream_id)
+                    stderr_tail = list(info.stderr_tail)[-5:] if info else []
 
-                    logging.warning(f"⚠️ Stream {stream_id} process died ({health}), exit_code: {exit_code}")
-                    if stderr_output:
-                        logging.error(f"🔍 [FFMPEG-{stream_id}] Final stderr: {stderr_output}")
+                    logging.warning(f"⚠️ Stream {stream_id} process died ({health}), exit_code: {exit_code}, "
+                                    f"error_type: {error_type}")
+                    if stderr_tail:
+                        logging.error(f"🔍 [FFMPEG-{stream_id}] Final stderr: {' | '.join(stderr_tail)}")
 
                     # Report disconnect to Laravel
-                    self._report_stream_disconnect(stream_id, health)
+                    self._report_stream_disconnect(stream_id, health, error_type)
 
-                    stream['status'] = StreamStatus.RESTARTING
                     stream['retry_count'] += 1
                     stream['last_restart'] = time.time()
+                    self._record_stream_event(stream_id, 'restart' if error_type not in PERMANENT_ERRORS else 'error',
+                                              f"{health}, exit_code: {exit_code}, error_type: {error_type}")
 
                     # Clean up dead process
                     self._cleanup_process(stream_id)
-                    
+
+                    if error_type in PERMANENT_ERRORS:
+                        # Retrying locally cannot fix these - let Laravel decide
+                        stream['status'] = StreamStatus.ERROR
+                        self._request_restart_decision(stream_id, exit_record, stderr_tail)
+                        break
+
+                    stream['status'] = StreamStatus.RESTARTING
+
                     # Wait before restart
                     time.sleep(config.restart_delay)
                 
@@ -290,6 +353,8 @@ class SimpleStreamManager:
                 logging.error(f"❌ Monitor error for stream {stream_id}: {e}")
                 time.sleep(config.restart_delay)
         
+        if watch.is_current(generation):
+            get_watchdog().unregister(watch.name, watch)
         logging.info(f"🏁 Monitor thread for stream {stream_id} exited")
     
     def _create_playlist_file(self, stream_id: int, input_urls: List[str]) -> str:
@@ -366,6 +431,7 @@ class SimpleStreamManager:
                 # Logging - reduced verbosity for long-term stability
                 '-loglevel', 'warning',  # Only warnings and errors
                 '-nostats',              # Disable stats to reduce log spam
+                '-progress', 'pipe:1',   # Machine-readable progress (fps, bitrate, speed) on stdout
 
                 config.output_url
             ])
@@ -374,15 +440,18 @@ class SimpleStreamManager:
             logging.debug(f"Command: {' '.join(cmd)}")
             
             # Start process
-            process = subprocess.Popen(
+            stream['spawned_at'] = time.time()
+            stream.pop('startup_seconds', None)
+            process = get_process_manager().spawn(
+                stream_id,
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 stdin=subprocess.PIPE
             )
 
-            stream['process'] = process
             stream['status'] = StreamStatus.RUNNING
+            process_info = get_process_manager().get_info(stream_id)
 
             logging.info(f"✅ FFmpeg started for stream {stream_id} (PID: {process.pid})")
 
@@ -395,47 +464,84 @@ class SimpleStreamManager:
                             error_msg = line.decode('utf-8', errors='ignore').strip()
                             if error_msg:
                                 logging.warning(f"🔍 [FFMPEG-{stream_id}] {error_msg}")
+                                process_info.stderr_tail.append(error_msg)
                 except Exception as e:
                     logging.error(f"❌ Error monitoring FFmpeg stderr for stream {stream_id}: {e}")
+                finally:
+                    process_info.stderr_eof.set()
 
             stderr_thread = threading.Thread(target=monitor_ffmpeg_stderr, daemon=True)
             stderr_thread.start()
 
+            # Read -progress blocks from stdout (also keeps the pipe from filling up)
+            def monitor_ffmpeg_progress():
+                block = {}
+                try:
+                    for line in iter(process.stdout.readline, b''):
+                        key, _, value = line.decode('utf-8', errors='ignore').strip().partition('=')
+                        if key == 'progress':
+                            stream['progress'] = self._parse_ffmpeg_progress(block)
+                            block = {}
+                            if 'startup_seconds' not in stream and (stream['progress'].get('frame') or 0) > 0:
+                                self._record_startup(stream_id, stream)
+                        elif key:
+                            block[key] = value
+                except Exception as e:
+                    logging.debug(f"FFmpeg progress reader for stream {stream_id} stopped: {e}")
+
+            progress_thread = threading.Thread(target=monitor_ffmpeg_progress, daemon=True)
+            progress_thread.start()
+
             return True
             
         except Exception as e:
             logging.error(f"❌ Failed to start FFmpeg for stream {stream_id}: {e}")
             return False
     
+    @staticmethod
+    def _parse_ffmpeg_progress(block: Dict[str, str]) -> Dict:
+        """Turn one FFmpeg -progress block into numbers (missing/N/A values become None)"""
+        def number(value: Optional[str], suffix: str = '') -> Optional[float]:
+            if not value:
+                return None
+            try:
+                return float(value.strip().rstrip(suffix).strip())
+            except ValueError:
+                return None
+
+        out_time_us = number(block.get('out_time_us') or block.get('out_time_ms'))
+        return {
+            'frame': number(block.get('frame')),
+            'fps': number(block.get('fps')),
+            'bitrate_kbps': number(block.get('bitrate'), 'kbits/s'),
+            'total_size': number(block.get('total_size')),
+            'out_time_seconds': out_time_us / 1_000_000 if out_time_us is not None else None,
+            'drop_frames': number(block.get('drop_frames')),
+            'dup_frames': number(block.get('dup_frames')),
+            'speed': number(block.get('speed'), 'x'),
+            'updated_at': time.time(),
+        }
+
     def _is_process_healthy(self, stream_id: int) -> bool:
         """Check if FFmpeg process is healthy"""
         try:
-            stream = self.streams[stream_id]
-            process = stream.get('process')
-            
-            if not process:
-                return False
-            
+            process_manager = get_process_manager()
+
             # Check if process is still running
-            if process.poll() is not None:
+            if not process_manager.is_alive(stream_id):
                 return False
-            
-            # Check process stats
-            try:
-                proc = psutil.Process(process.pid)
-                
-                # Check if process is zombie
-                if proc.status() == psutil.STATUS_ZOMBIE:
-                    return False
-                
-                # Check memory usage (basic sanity check)
-                memory_mb = proc.memory_info().rss / 1024 / 1024
-                if memory_mb > 1000:  # More than 1GB is suspicious
-                    logging.warning(f"⚠️ Stream {stream_id} using {memory_mb:.1f}MB memory")
-                
-            except psutil.NoSuchProcess:
+
+            usage = process_manager.get_usage(stream_id)
+
+            # Check if process is zombie
+            if usage.get('proc_state') == 'Z':
                 return False
-            
+
+            # Check memory usage (basic sanity check)
+            memory_mb = usage.get('rss_mb') or 0
+            if memory_mb > 1000:  # More than 1GB is suspicious
+                logging.warning(f"⚠️ Stream {stream_id} using {memory_mb:.1f}MB memory")
+
             return True
             
         except Exception as e:
@@ -445,21 +551,13 @@ class SimpleStreamManager:
     def _cleanup_process(self, stream_id: int):
         """Clean up dead/zombie process"""
         try:
-            stream = self.streams[stream_id]
-            process = stream.get('process')
-            
-            if process:
-                try:
-                    if process.poll() is None:
-                        process.terminate()
-                        time.sleep(1)
-                        if process.poll() is None:
-                            process.kill()
-                except:
-                    pass
-                
-                stream['process'] = None
-                
+            process_manager = get_process_manager()
+            try:
+                process_manager.terminate(stream_id, timeout=1)
+            except Exception:
+                pass
+            process_manager.unregister(stream_id)
+
         except Exception as e:
             logging.error(f"❌ Cleanup error for stream {stream_id}: {e}")
     
@@ -529,7 +627,46 @@ class SimpleStreamManager:
         except Exception as e:
             logging.debug(f"Error reporting health for stream {stream_id}: {e}")
 
-    def _report_stream_disconnect(self, stream_id: int, health_status: str):
+    def _record_startup(self, stream_id: int, stream: Dict):
+        """Time from spawning FFmpeg to the first output frame, tagged by input kind"""
+        startup = time.time() - stream['spawned_at']
+        stream['startup_seconds'] = round(startup, 3)
+        stream['prepared_inputs'] = all(url.endswith(PREPARED_SUFFIX) for url in stream['config'].input_urls)
+        logging.info(f"⏱️ Stream {stream_id}: first frame after {startup:.2f}s "
+                     f"({'prepared' if stream['prepared_inputs'] else 'raw'} inputs)")
+        self._record_stream_event(stream_id, 'startup',
+                                  f"{startup:.3f}s {'prepared' if stream['prepared_inputs'] else 'raw'}")
+
+    def _record_stream_event(self, stream_id: int, event: str, detail: Optional[str] = None):
+        """Add an event to the stream's metrics history if the store is running"""
+        try:
+            from metrics_store import get_metrics_store
+            store = get_metrics_store()
+            if store:
+                store.record_event(stream_id, event, detail)
+        except Exception as e:
+            logging.debug(f"Could not record {event} event for stream {stream_id}: {e}")
+
+    def _request_restart_decision(self, stream_id: int, exit_record, stderr_tail: List[str]):
+        """Hand a permanently failing stream to Laravel's restart policy"""
+        try:
+            from status_reporter import get_status_reporter
+            status_reporter = get_status_reporter()
+            if not status_reporter:
+                return
+
+            stream = self.streams.get(stream_id) or {}
+            status_reporter.publish_restart_request(
+                stream_id,
+                reason=f"FFmpeg exited: {exit_record.error_type} ({exit_record.detail})",
+                crash_count=stream.get('retry_count', 1),
+                last_error=stderr_tail[-1] if stderr_tail else exit_record.detail,
+                error_type=exit_record.error_type
+            )
+        except Exception as e:
+            logging.error(f"❌ Error requesting restart decision for stream {stream_id}: {e}")
+
+    def _report_stream_disconnect(self, stream_id: int, health_status: str, error_type: Optional[str] = None):
         """Report stream disconnect to Laravel"""
         try:
             from status_reporter import get_status_reporter
@@ -545,6 +682,8 @@ class SimpleStreamManager:
                 message = 'Stream process not found'
             else:
                 message = f'Stream disconnected: {health_status}'
+            if error_type:
+                message += f' [{error_type}]'
 
             # Get stream info
             stream = self.streams.get(stream_id)
@@ -566,13 +705,15 @@ class SimpleStreamManager:
 
 # Global instance
 _stream_manager = None
+_stream_manager_lock = threading.Lock()  # Boot creates it on a worker thread while others may already ask
 
 def get_simple_stream_manager() -> SimpleStreamManager:
     """Get global stream manager instance"""
     global _stream_manager
-    if _stream_manager is None:
-        _stream_manager = SimpleStreamManager()
-    return _stream_manager
+    with _stream_manager_lock:
+        if _stream_manager is None:
+            _stream_manager = SimpleStreamManager()
+        return _stream_manager
 
 def init_simple_stream_manager() -> SimpleStreamManager:
     """Initialize stream manager"""
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent Startup Timeline
+Measures each boot phase and the time until the agent is listening for
+commands, for logs and the first heartbeat
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process was exec'd, covering interpreter start and imports before us"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22 (starttime, in clock ticks since boot) - split after the parenthesised command name
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class BootTimeline:
+    """Boot phases with offsets from the timeline start; phases may overlap when run in parallel"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.process_age_at_start = _process_age()
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.ready_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block as one boot phase"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            with self._lock:
+                self.phases[name] = {
+                    'start_ms': round((start - self.started) * 1000, 1),
+                    'duration_ms': round((end - start) * 1000, 1),
+                }
+            from instrumentation import get_instrumentation
+            get_instrumentation().observe(f"boot.{name}", end - start)
+
+    def run(self, name: str, func: Callable, *args, **kwargs):
+        """Call func as one boot phase - convenient for submitting phases to a pool"""
+        with self.phase(name):
+            return func(*args, **kwargs)
+
+    def mark_ready(self):
+        """The agent is subscribed and every component is up"""
+        self.ready_at = time.monotonic()
+        ready = self.to_dict()
+        slowest = sorted(self.phases.items(), key=lambda item: item[1]['duration_ms'], reverse=True)[:3]
+        logging.info(f"🚀 Agent ready in {ready['ready_ms']:.0f}ms "
+                     f"({ready['since_process_start_ms'] or 0:.0f}ms since exec) - slowest phases: "
+                     + ', '.join(f"{name} {p['duration_ms']:.0f}ms" for name, p in slowest))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Phase breakdown as reported in the first heartbeat"""
+        ready_ms = round((self.ready_at - self.started) * 1000, 1) if self.ready_at else None
+        since_exec = None
+        if ready_ms is not None and self.process_age_at_start is not None:
+            since_exec = round(ready_ms + self.process_age_at_start * 1000, 1)
+        with self._lock:
+            phases = dict(self.phases)
+        return {
+            'ready': self.ready_at is not None,
+            'ready_ms': ready_ms,
+            'since_process_start_ms': since_exec,
+            'phases': phases,
+        }
+
+
+# Global boot timeline instance
+_boot_timeline: Optional[BootTimeline] = None
+
+
+def init_boot_timeline() -> BootTimeline:
+    """Start the global boot timeline"""
+    global _boot_timeline
+    _boot_timeline = BootTimeline()
+    return _boot_timeline
+
+
+def get_boot_timeline() -> Optional[BootTimeline]:
+    """Get global boot timeline instance"""
+    return _boot_timeline
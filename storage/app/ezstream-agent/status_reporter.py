@@ -8,14 +8,51 @@ import json
 import time
 import logging
 import threading
-from typing import Dict, Any, Optional, Set
-from concurrent.futures import ThreadPoolExecutor
-
-import redis
-import psutil
+from typing import Dict, Any, Optional, Set, Callable
 
 from config import get_config
-from utils import safe_json_dumps, throttle_calls, PerformanceTimer
+from utils import safe_json_dumps, Debouncer
+from instrumentation import get_instrumentation
+from report_publisher import ReportPublisher
+from report_spool import ReportSpool
+from redis_client import get_redis_manager
+from system_sampler import SystemStatsSampler
+from host_profile import get_host_profile
+from startup import get_boot_timeline
+from agent_watchdog import get_watchdog, LoopHandle
+
+
+class AdaptiveSchedule:
+    """Report interval that snaps to the minimum on change and backs off exponentially while steady"""
+
+    def __init__(self, min_interval: Callable[[], float], max_interval: Callable[[], float], factor: float = 2.0):
+        # Bounds are read on every tick so UPDATE_SETTINGS hints apply without a restart
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.current = None
+
+    def next_interval(self) -> float:
+        low, high = self._bounds()
+        if self.current is None:
+            self.current = low
+        self.current = max(low, min(self.current, high))
+        return self.current
+
+    def record(self, changed: bool):
+        low, high = self._bounds()
+        if changed or self.current is None:
+            self.current = low
+        else:
+            self.current = min(self.current * self.factor, high)
+
+    def reset(self):
+        self.current = None
+
+    def _bounds(self) -> tuple:
+        low = max(0.5, float(self.min_interval()))
+        high = max(low, float(self.max_interval()))
+        return low, high
 
 
 class StatusReporter:
@@ -23,103 +60,163 @@ class StatusReporter:
     
     def __init__(self):
         self.config = get_config()
+        self.redis_manager = get_redis_manager()
         self.redis_conn = None
         self.running = False
         
-        # Progress throttling - only send progress every N seconds
-        self.last_progress_time = {}
+        # Progress coalescing - at most one update per stream per interval, latest value wins
+        self.progress_debouncer = Debouncer(
+            self._send_stream_status,
+            interval=lambda: self.config.progress_throttle_interval * self.config.report_rate_scale,
+            name="ProgressDebouncer"
+        )
+
+        # Adaptive reporting - fast while streams change, backing off while steady,
+        # never slower than report_max_staleness. Minimums scale with the server's rate hint.
+        self.heartbeat_schedule = AdaptiveSchedule(
+            min_interval=lambda: self.config.heartbeat_interval * self.config.report_rate_scale,
+            max_interval=lambda: min(self.config.heartbeat_max_interval, self.config.report_max_staleness)
+        )
+        self.stats_schedule = AdaptiveSchedule(
+            min_interval=lambda: self.config.stats_report_interval * self.config.report_rate_scale,
+            max_interval=lambda: min(self.config.stats_max_interval, self.config.report_max_staleness)
+        )
+        self._last_stream_status: Dict[int, str] = {}
+        self._last_sent_stats: Dict[str, Any] = {}
+        self._stats_wakeup = threading.Event()
         
-        # Thread pool for non-blocking reports
-        self.executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="StatusReporter")
+        # On-disk spool keeps reports while Redis is unreachable
+        self.spool = ReportSpool(
+            spool_dir=self.config.report_spool_dir,
+            key_func=ReportPublisher.coalesce_key,
+            max_bytes=self.config.report_spool_max_bytes,
+            replay_rate=self.config.report_spool_replay_rate,
+            max_age=self.config.report_spool_max_age
+        )
+
+        # Coalescing publisher for agent-reports (replaces per-report executor tasks)
+        self.publisher = ReportPublisher(
+            get_redis=lambda: self.redis_conn,
+            vps_id=self.config.vps_id,
+            flush_interval=self.config.report_flush_interval,
+            max_buffer=self.config.report_max_buffer,
+            batch_enabled=self.config.report_batch_enabled,
+            batch_max=self.config.report_batch_max,
+            spool=self.spool
+        )
         
-        # Stats cache
-        self._stats_cache = {}
-        self._stats_cache_time = 0
+        # Delta heartbeat state - diffs are relative to the last heartbeat Redis accepted
+        self.heartbeat_seq = 0
+        self._heartbeat_acked_seq = 0
+        self._heartbeat_streams: Set[int] = set()
+        self._beats_since_snapshot = 0
+        self._snapshot_reason: Optional[str] = 'startup'
+        self._heartbeat_wakeup = threading.Event()
+        self._heartbeat_failures = 0
+        self._last_heartbeat_success = time.time()
+
+        # Watchdog handles, registered when the loops start
+        self._stats_watch: Optional[LoopHandle] = None
+        self._heartbeat_watch: Optional[LoopHandle] = None
+
+        # Interval changes from UPDATE_SETTINGS apply on the next tick
+        self.config.subscribe(self._on_config_change)
+        
+        # Background host sampler - stats and heartbeats read from it without blocking
+        self.sampler = SystemStatsSampler(
+            interval=self.config.stats_sample_interval,
+            history_size=self.config.stats_history_size,
+            alpha=self.config.stats_ewma_alpha
+        )
         
         self._connect_redis()
     
     def _connect_redis(self):
-        """Connect to Redis"""
-        try:
-            self.redis_conn = redis.Redis(
-                host=self.config.redis_host,
-                port=self.config.redis_port,
-                password=self.config.redis_password,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True
-            )
-            
-            # Test connection
-            self.redis_conn.ping()
-            logging.info(f"✅ Connected to Redis at {self.config.redis_host}:{self.config.redis_port}")
-            
-        except Exception as e:
-            logging.error(f"❌ Failed to connect to Redis: {e}")
-            raise
+        """Use the shared Redis pool (connectivity is verified by the Redis manager)"""
+        self.redis_conn = self.redis_manager.get_client()
     
     def start(self):
         """Start background reporting threads"""
         self.running = True
+
+        # Start report publisher and host sampler
+        self.publisher.start()
+        self.sampler.start()
+        
+        # Both loops check in with the watchdog; one wedged on a hung publish is replaced by a fresh thread
+        watchdog = get_watchdog()
+        self._stats_watch = watchdog.register(
+            'stats_reporter', deadline=self.stats_schedule.max_interval, restart=self._start_stats_thread
+        )
+        self._heartbeat_watch = watchdog.register(
+            'heartbeat', deadline=self.heartbeat_schedule.max_interval, restart=self._start_heartbeat_thread
+        )
+        self._start_stats_thread()
+        self._start_heartbeat_thread()
         
-        # Start stats reporter thread
+        logging.info("📊 Status reporter started")
+
+    def _start_stats_thread(self):
         stats_thread = threading.Thread(
             target=self._stats_reporter_loop,
+            args=(self._stats_watch.generation,),
             name="StatsReporter",
             daemon=True
         )
         stats_thread.start()
-        
-        # Start heartbeat thread
+
+    def _start_heartbeat_thread(self):
         heartbeat_thread = threading.Thread(
             target=self._heartbeat_loop,
+            args=(self._heartbeat_watch.generation,),
             name="HeartbeatReporter",
             daemon=True
         )
         heartbeat_thread.start()
-        
-        logging.info("📊 Status reporter started")
     
     def stop(self):
         """Stop all reporting"""
         self.running = False
 
-        # Shutdown executor safely (compatible with older Python)
+        watchdog = get_watchdog()
+        for handle in (self._stats_watch, self._heartbeat_watch):
+            if handle:
+                watchdog.unregister(handle.name, handle)
+
         try:
-            self.executor.shutdown(wait=True)
-            logging.info("✅ Status reporter executor shutdown")
+            self.sampler.stop()
         except Exception as e:
-            logging.error(f"❌ Error shutting down status reporter executor: {e}")
+            logging.error(f"❌ Error stopping system sampler: {e}")
+
+        self.progress_debouncer.stop()
 
-        # Close Redis connection safely
+        # Flush pending reports before closing the connection
         try:
-            if self.redis_conn:
-                self.redis_conn.close()
-                logging.info("✅ Status reporter Redis connection closed")
+            self.publisher.stop()
+            logging.info("✅ Status reporter publisher flushed")
         except Exception as e:
-            logging.error(f"❌ Error closing status reporter Redis connection: {e}")
+            logging.error(f"❌ Error stopping status reporter publisher: {e}")
 
         logging.info("📊 Status reporter stopped")
     
     def publish_stream_status(self, stream_id: int, status: str, message: str, extra_data: Optional[Dict] = None):
-        """Publish stream status update to Laravel"""
-        # Submit to thread pool for non-blocking execution
-        self.executor.submit(self._publish_stream_status_sync, stream_id, status, message, extra_data)
-    
-    def _publish_stream_status_sync(self, stream_id: int, status: str, message: str, extra_data: Optional[Dict] = None):
-        """Synchronous stream status publishing"""
+        """Publish stream status update to Laravel (buffered, non-blocking)"""
         try:
-            # Throttle progress updates
             if status == 'PROGRESS':
-                current_time = time.time()
-                last_time = self.last_progress_time.get(stream_id, 0)
-                
-                if current_time - last_time < self.config.progress_throttle_interval:
-                    return  # Skip this progress update
-                
-                self.last_progress_time[stream_id] = current_time
-            
+                self.progress_debouncer.submit(stream_id, stream_id, status, message, extra_data)
+                return
+
+            # A state change supersedes any progress still waiting to be sent
+            self.progress_debouncer.cancel(stream_id)
+            self._note_stream_status(stream_id, status)
+            self._send_stream_status(stream_id, status, message, extra_data)
+
+        except Exception as e:
+            logging.error(f"❌ Error publishing stream status: {e}")
+
+    def _send_stream_status(self, stream_id: int, status: str, message: str, extra_data: Optional[Dict] = None):
+        """Build and queue a STATUS_UPDATE report"""
+        try:
             payload = {
                 'type': 'STATUS_UPDATE',
                 'stream_id': stream_id,
@@ -193,154 +290,282 @@ class StatusReporter:
         except Exception as e:
             logging.error(f"❌ Error publishing restart request: {e}")
 
+    def publish_metrics_response(self, stream_id: Optional[int], request_id: str, result_key: str,
+                                 points: int, resolution: Optional[int]):
+        """Tell Laravel where a GET_METRICS result was stored (stream_id None for host metrics)"""
+        try:
+            payload = {
+                'type': 'METRICS_RESPONSE',
+                'vps_id': self.config.vps_id,
+                'stream_id': stream_id,
+                'request_id': request_id,
+                'result_key': result_key,
+                'points': points,
+                'resolution': resolution,
+                'timestamp': int(time.time())
+            }
+            self._publish_report(payload)
+
+        except Exception as e:
+            logging.error(f"❌ Error publishing metrics response: {e}")
+
     def _publish_report(self, payload: Dict[str, Any]):
-        """Publish report to Redis"""
+        """Queue report for the next coalesced Redis flush"""
         try:
-            json_payload = safe_json_dumps(payload)
-            channel = 'agent-reports'
-            
-            subscribers = self.redis_conn.publish(channel, json_payload)
-            report_type = payload.get('type', 'UNKNOWN')
-            
-            logging.debug(f"📤 [REDIS] Published '{report_type}' to '{channel}' -> {subscribers} subscribers")
-            
+            payload.setdefault('config_version', self.config.config_version)
+            self.publisher.submit(payload)
+            logging.debug(f"📤 [REDIS] Queued '{payload.get('type', 'UNKNOWN')}' for agent-reports")
+
         except Exception as e:
-            logging.error(f"❌ [REDIS] Failed to publish report: {e}")
+            logging.error(f"❌ [REDIS] Failed to queue report: {e}")
     
-    def _stats_reporter_loop(self):
+    def _on_config_change(self, changes: Dict[str, Any], version: int):
+        """Restart adaptive schedules at the new cadence and refresh publisher tuning"""
+        self.publisher.flush_interval = self.config.report_flush_interval
+        self.publisher.max_buffer = self.config.report_max_buffer
+        self.publisher.batch_enabled = self.config.report_batch_enabled
+        self.publisher.batch_max = self.config.report_batch_max
+        self.sampler.interval = self.config.stats_sample_interval
+
+        if any(key.startswith(('heartbeat_', 'stats_', 'report_')) for key in changes):
+            self.heartbeat_schedule.reset()
+            self.stats_schedule.reset()
+            self._heartbeat_wakeup.set()
+            self._stats_wakeup.set()
+
+    def _note_stream_status(self, stream_id: int, status: str):
+        """A stream changing state makes heartbeats and stats report quickly again"""
+        if self._last_stream_status.get(stream_id) == status:
+            return
+
+        if status == 'STOPPED':
+            self._last_stream_status.pop(stream_id, None)
+        else:
+            self._last_stream_status[stream_id] = status
+
+        self.heartbeat_schedule.reset()
+        self.stats_schedule.reset()
+        self._heartbeat_wakeup.set()
+        self._stats_wakeup.set()
+
+    def _stats_changed(self, stats: Dict[str, Any]) -> bool:
+        """Whether stats moved enough since the last report to keep the fast cadence"""
+        last = self._last_sent_stats
+        if not last or stats.get('active_streams') != last.get('active_streams'):
+            return True
+
+        thresholds = (('cpu_usage', 10.0), ('ram_usage', 5.0), ('disk_usage', 2.0))
+        for field, delta in thresholds:
+            if abs((stats.get(field) or 0) - (last.get(field) or 0)) >= delta:
+                return True
+
+        for field in ('network_tx_mbps', 'network_rx_mbps'):
+            old, new = last.get(field) or 0, stats.get(field) or 0
+            if abs(new - old) > max(1.0, 0.2 * old):
+                return True
+
+        return False
+
+    def _stats_reporter_loop(self, generation: int):
         """Background thread for system stats reporting"""
-        logging.info(f"📊 Stats reporter thread started. Reporting every {self.config.stats_report_interval}s")
+        logging.info(f"📊 Stats reporter thread started. Reporting every {self.stats_schedule.next_interval()}s "
+                     f"(adaptive, max {self.config.report_max_staleness}s)")
         
-        while self.running:
+        while self.running and self._stats_watch.is_current(generation):
+            self._stats_watch.beat()
             try:
-                with PerformanceTimer("Stats Collection"):
+                instrumentation = get_instrumentation()
+                with instrumentation.timer('stats.collect'):
                     stats = self._collect_system_stats()
+                stats['next_report_in'] = self.stats_schedule.next_interval()
+                stats['instrumentation'] = instrumentation.get_stats()
                 
                 # Send stats via Redis
                 payload = safe_json_dumps(stats)
-                result = self.redis_conn.publish('vps-stats', payload)
+                with instrumentation.timer('redis.publish_stats'):
+                    result = self.redis_conn.publish('vps-stats', payload)
                 
                 logging.debug(f"📊 Stats sent via Redis: {payload} -> subscribers: {result}")
+
+                self.stats_schedule.record(self._stats_changed(stats))
+                self._last_sent_stats = stats
                 
             except Exception as e:
                 logging.error(f"❌ Error in stats_reporter_loop: {e}")
+                self.redis_manager.record_failure(e)
+                self.stats_schedule.reset()
             
-            time.sleep(self.config.stats_report_interval)
+            self._stats_wakeup.wait(self.stats_schedule.next_interval())
+            self._stats_wakeup.clear()
     
-    def _heartbeat_loop(self):
+    def request_heartbeat(self, full: bool = False, reason: str = 'requested'):
+        """Send the next heartbeat now, optionally as a full snapshot"""
+        if full:
+            self._snapshot_reason = reason
+        self._heartbeat_wakeup.set()
+
+    def _heartbeat_loop(self, generation: int):
         """Background thread for heartbeat reporting"""
-        logging.info(f"💓 Heartbeat thread started. Reporting every {self.config.heartbeat_interval}s")
+        logging.info(f"💓 Heartbeat thread started. Reporting every {self.heartbeat_schedule.next_interval()}s "
+                     f"(adaptive, max {self.config.report_max_staleness}s, "
+                     f"full snapshot every {self.config.heartbeat_full_snapshot_every} beats)")
+
+        while self.running and self._heartbeat_watch.is_current(generation):
+            self._heartbeat_watch.beat()
+            self._send_heartbeat()
+            self._heartbeat_wakeup.wait(self.heartbeat_schedule.next_interval())
+            self._heartbeat_wakeup.clear()
+
+    def _re_announce_after(self) -> float:
+        """Seconds without a published heartbeat before Laravel may have restarted and lost our streams.
+        Twice the slowest cadence, so a steady agent backed off to the maximum never trips it."""
+        return max(60.0, 2 * min(self.config.heartbeat_max_interval, self.config.report_max_staleness))
+
+    def _send_heartbeat(self):
+        """Build, publish and commit one heartbeat, adjusting the cadence"""
+        try:
+            active_stream_ids = self._get_active_stream_ids()
 
-        consecutive_failures = 0
-        last_successful_publish = time.time()
+            # Check if we need to re-announce streams (after potential Laravel restart)
+            current_time = time.time()
+            if (self._heartbeat_failures and self._snapshot_reason != 're_announce'
+                    and current_time - self._last_heartbeat_success > self._re_announce_after()):
+                logging.warning(f"🔄 Potential Laravel restart detected. Re-announcing {len(active_stream_ids)} active streams...")
+                self._snapshot_reason = 're_announce'
 
-        while self.running:
-            try:
-                # Get active streams from simple stream manager
-                active_stream_ids = []
-
-                # Simple streams (FFmpeg direct)
-                try:
-                    from simple_stream_manager import get_simple_stream_manager
-                    stream_manager = get_simple_stream_manager()
-                    if stream_manager:
-                        active_streams = stream_manager.get_all_streams_status()
-                        active_stream_ids = [s['stream_id'] for s in active_streams if s['status'] == 'running']
-                except Exception as e:
-                    logging.debug(f"Could not get simple stream manager: {e}")
-                    active_stream_ids = []
-
-                heartbeat_payload = {
-                    'type': 'HEARTBEAT',
-                    'vps_id': self.config.vps_id,
-                    'active_streams': active_stream_ids,
-                    'timestamp': int(time.time()),
-                }
-
-                # Check if we need to re-announce streams (after potential Laravel restart)
-                current_time = time.time()
-                if current_time - last_successful_publish > 60:  # No successful publish for 1 minute
-                    logging.warning(f"🔄 Potential Laravel restart detected. Re-announcing {len(active_stream_ids)} active streams...")
-                    heartbeat_payload['re_announce'] = True
-
-                self._publish_report(heartbeat_payload)
-
-                # Reset failure counter on success
-                consecutive_failures = 0
-                last_successful_publish = current_time
+            heartbeat_payload = self._build_heartbeat(active_stream_ids)
 
-            except Exception as e:
-                consecutive_failures += 1
-                logging.error(f"❌ Error in heartbeat_loop (failure #{consecutive_failures}): {e}")
-
-                # If too many consecutive failures, try to reconnect Redis
-                if consecutive_failures >= 5:
-                    logging.warning("🔄 Too many heartbeat failures, attempting Redis reconnect...")
-                    try:
-                        self._connect_redis()
-                        consecutive_failures = 0
-                    except Exception as reconnect_error:
-                        logging.error(f"❌ Redis reconnect failed: {reconnect_error}")
-
-            time.sleep(self.config.heartbeat_interval)
+            if not self.publisher.publish_now(heartbeat_payload):
+                raise ConnectionError(f"heartbeat #{heartbeat_payload['seq']} was not published")
+
+            # Only streams coming or going reset the cadence - periodic and requested snapshots do not
+            changed = set(active_stream_ids) != self._heartbeat_streams
+            self._commit_heartbeat(heartbeat_payload, active_stream_ids)
+            self.heartbeat_schedule.record(changed)
+
+            # Reset failure counter on success
+            self._heartbeat_failures = 0
+            self._last_heartbeat_success = current_time
+
+        except Exception as e:
+            self._heartbeat_failures += 1
+            logging.error(f"❌ Error in heartbeat_loop (failure #{self._heartbeat_failures}): {e}")
+
+            # Laravel may have missed diffs - resync with a snapshot once we're back
+            if self._snapshot_reason is None:
+                self._snapshot_reason = 'publish_failed'
+            self.heartbeat_schedule.reset()
+
+            # Reconnect is owned by the shared Redis manager - just tell it right away
+            self.redis_manager.record_failure(e)
+
+    def _get_active_stream_ids(self) -> list:
+        """Get IDs of running streams from the simple stream manager"""
+        try:
+            from simple_stream_manager import get_simple_stream_manager
+            stream_manager = get_simple_stream_manager()
+            if stream_manager:
+                return stream_manager.get_running_stream_ids()
+        except Exception as e:
+            logging.debug(f"Could not get simple stream manager: {e}")
+        return []
+
+    def _build_heartbeat(self, active_stream_ids: list) -> Dict[str, Any]:
+        """Build a delta heartbeat, or a full snapshot every N beats / on request"""
+        self.heartbeat_seq += 1
+        current = set(active_stream_ids)
+
+        payload = {
+            'type': 'HEARTBEAT',
+            'vps_id': self.config.vps_id,
+            'seq': self.heartbeat_seq,
+            'base_seq': self._heartbeat_acked_seq,
+            'stream_count': len(current),
+            'config_version': self.config.config_version,
+            'next_heartbeat_in': self.heartbeat_schedule.next_interval(),
+            'host': self.sampler.get_summary(),
+            'timestamp': int(time.time()),
+        }
+
+        full_every = max(1, self.config.heartbeat_full_snapshot_every)
+        if self._snapshot_reason or self._beats_since_snapshot + 1 >= full_every:
+            payload['full'] = True
+            payload['active_streams'] = sorted(current)
+            payload['snapshot_reason'] = self._snapshot_reason or 'periodic'
+            if self._snapshot_reason == 're_announce':
+                payload['re_announce'] = True
+        else:
+            payload['full'] = False
+            payload['added'] = sorted(current - self._heartbeat_streams)
+            payload['removed'] = sorted(self._heartbeat_streams - current)
+
+        if self._heartbeat_acked_seq == 0 or payload.get('re_announce'):
+            # Until Laravel has one heartbeat from this process, tell it what the host was tuned for
+            profile = get_host_profile()
+            if profile:
+                payload['host_profile'] = profile.to_dict()
+            boot = get_boot_timeline()
+            if boot:
+                payload['boot'] = boot.to_dict()
+
+        return payload
+
+    def _commit_heartbeat(self, payload: Dict[str, Any], active_stream_ids: list):
+        """Advance the diff base once Redis has accepted a heartbeat"""
+        self._heartbeat_acked_seq = payload['seq']
+        self._heartbeat_streams = set(active_stream_ids)
+
+        if payload['full']:
+            self._beats_since_snapshot = 0
+            self._snapshot_reason = None
+        else:
+            self._beats_since_snapshot += 1
     
     def _collect_system_stats(self) -> Dict[str, Any]:
-        """Collect system statistics"""
-        # Cache stats for 5 seconds to avoid excessive system calls
-        current_time = time.time()
-        if current_time - self._stats_cache_time < 5 and self._stats_cache:
-            return self._stats_cache
-        
+        """Build stats report from the latest background sample"""
         try:
-            # CPU usage
-            cpu_usage = psutil.cpu_percent(interval=1)
-            
-            # Memory usage
-            memory = psutil.virtual_memory()
-            ram_usage = memory.percent
-            
-            # Disk usage
-            disk = psutil.disk_usage('/')
-            disk_usage = (disk.used / disk.total) * 100
-            disk_total_gb = disk.total / (1024**3)
-            disk_used_gb = disk.used / (1024**3)
-            disk_free_gb = disk.free / (1024**3)
-            
-            # Network stats
-            network = psutil.net_io_counters()
-            network_sent_mb = network.bytes_sent / (1024**2)
-            network_recv_mb = network.bytes_recv / (1024**2)
-            
-            # Active streams count
-            active_streams = 0
-            try:
-                from simple_stream_manager import get_simple_stream_manager
-                stream_manager = get_simple_stream_manager()
-                if stream_manager:
-                    active_streams_status = stream_manager.get_all_streams_status()
-                    active_streams = len([s for s in active_streams_status if s['status'] == 'running'])
-            except Exception as e:
-                logging.debug(f"Could not get simple stream manager for stats: {e}")
-                active_streams = 0
-            
-            stats = {
+            sample = self.sampler.get_latest()
+            if not sample:
+                sample = self.sampler.sample()
+
+            stats = dict(sample)
+            # Rates need two samples - report zero until the sampler has a baseline
+            stats.setdefault('cpu_usage', 0.0)
+            stats.update({
                 'vps_id': self.config.vps_id,
-                'cpu_usage': round(cpu_usage, 1),
-                'ram_usage': round(ram_usage, 1),
-                'disk_usage': round(disk_usage, 1),
-                'disk_total_gb': round(disk_total_gb, 1),
-                'disk_used_gb': round(disk_used_gb, 1),
-                'disk_free_gb': round(disk_free_gb, 1),
-                'active_streams': active_streams,
-                'network_sent_mb': round(network_sent_mb, 1),
-                'network_recv_mb': round(network_recv_mb, 1),
+                'config_version': self.config.config_version,
+                'active_streams': len(self._get_active_stream_ids()),
+                'report_publisher': self.publisher.get_stats(),
+                'progress_updates': self.progress_debouncer.get_stats(),
+                'redis': self.redis_manager.get_stats(),
                 'timestamp': int(time.time())
-            }
-            
-            # Cache the stats
-            self._stats_cache = stats
-            self._stats_cache_time = current_time
-            
+            })
+
+            try:
+                from file_manager import get_file_manager
+                file_manager = get_file_manager()
+                stats['downloads'] = file_manager.downloader.get_stats()
+                if file_manager.bandwidth_scheduler:
+                    stats['downloads']['scheduler'] = file_manager.bandwidth_scheduler.get_stats()
+                stats['disk_cache'] = file_manager.disk_index.get_stats()
+                stats['disk_cache']['eviction'] = file_manager.get_eviction_stats()
+                stats['preflight'] = file_manager.preflight.get_stats()
+                stats['media_store'] = file_manager.media_store.get_stats()
+                stats['hashing'] = file_manager.hasher.get_stats()
+                stats['prepare'] = file_manager.preparer.get_stats()
+            except RuntimeError:
+                pass  # File manager starts after the status reporter
+
+            try:
+                from process_manager import get_process_manager
+                stats['ffmpeg_processes'] = get_process_manager().get_stats()
+            except RuntimeError:
+                pass
+
+            from command_runner import get_command_runner
+            stats['command_runner'] = get_command_runner().get_stats()
+            stats['watchdog'] = get_watchdog().get_stats()
+
             return stats
             
         except Exception as e:
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+EZStream Agent System Sampler
+Background host sampling with counter deltas, EWMA smoothing and a fixed-size history
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, List
+
+import psutil
+
+
+# Fields smoothed with EWMA - everything else is reported as sampled
+SMOOTHED_FIELDS = (
+    'cpu_usage', 'cpu_iowait', 'ram_usage', 'swap_usage',
+    'network_tx_mbps', 'network_rx_mbps',
+    'disk_read_mbps', 'disk_write_mbps', 'disk_read_iops', 'disk_write_iops',
+)
+
+
+def _cpu_total(times) -> float:
+    """Total CPU time - guest time is already included in user on Linux"""
+    return sum(times) - getattr(times, 'guest', 0.0) - getattr(times, 'guest_nice', 0.0)
+
+
+def _cpu_busy_percent(prev, cur) -> Dict[str, float]:
+    """CPU busy and iowait percent between two cpu_times samples"""
+    delta_total = _cpu_total(cur) - _cpu_total(prev)
+    if delta_total <= 0:
+        return {'busy': 0.0, 'iowait': 0.0}
+
+    delta_idle = cur.idle - prev.idle
+    delta_iowait = getattr(cur, 'iowait', 0.0) - getattr(prev, 'iowait', 0.0)
+    busy = (delta_total - delta_idle - delta_iowait) / delta_total * 100
+
+    return {
+        'busy': max(0.0, min(100.0, busy)),
+        'iowait': max(0.0, min(100.0, delta_iowait / delta_total * 100)),
+    }
+
+
+def _read_memory_pressure() -> Optional[float]:
+    """Linux PSI 'some avg10' for memory, None where PSI is unavailable"""
+    try:
+        with open('/proc/pressure/memory') as f:
+            for line in f:
+                if line.startswith('some'):
+                    for part in line.split():
+                        if part.startswith('avg10='):
+                            return float(part[6:])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class SystemStatsSampler:
+    """Samples host counters in the background so readers never block"""
+
+    def __init__(self, interval: float = 2.0, history_size: int = 150, alpha: float = 0.3, disk_path: str = '/'):
+        self.interval = interval
+        self.alpha = alpha
+        self.disk_path = disk_path
+
+        self.running = False
+        self.sampler_thread = None
+
+        # Fixed-size ring of smoothed samples, newest last
+        self.history: deque = deque(maxlen=history_size)
+
+        # Latest smoothed sample - replaced wholesale so readers need no lock
+        self._latest: Dict[str, Any] = {}
+
+        # Previous raw counters for rate calculation
+        self._prev_time: Optional[float] = None
+        self._prev_cpu = None
+        self._prev_cpu_per_core = None
+        self._prev_net = None
+        self._prev_disk = None
+
+    def start(self):
+        """Take a baseline sample and start the background thread"""
+        if self.running:
+            return
+
+        self.running = True
+        self.sample()
+
+        self.sampler_thread = threading.Thread(
+            target=self._sampler_loop,
+            name="SystemSampler",
+            daemon=True
+        )
+        self.sampler_thread.start()
+        logging.info(f"📈 System sampler started (every {self.interval}s, {self.history.maxlen} samples kept)")
+
+    def stop(self):
+        """Stop background sampling"""
+        self.running = False
+        if self.sampler_thread:
+            self.sampler_thread.join(timeout=self.interval + 1)
+        logging.info("📈 System sampler stopped")
+
+    def get_latest(self) -> Dict[str, Any]:
+        """Latest smoothed sample (empty until the first sample is taken)"""
+        return self._latest
+
+    def get_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Smoothed samples, oldest first"""
+        samples = list(self.history)
+        return samples[-limit:] if limit else samples
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Compact host summary for heartbeats"""
+        latest = self._latest
+        return {
+            'cpu': latest.get('cpu_usage'),
+            'ram': latest.get('ram_usage'),
+            'load_1m': latest.get('load_avg', [None])[0],
+            'tx_mbps': latest.get('network_tx_mbps'),
+            'rx_mbps': latest.get('network_rx_mbps'),
+        }
+
+    def sample(self) -> Dict[str, Any]:
+        """Read counters once, derive rates against the previous read and smooth"""
+        now = time.monotonic()
+        cpu = psutil.cpu_times()
+        cpu_per_core = psutil.cpu_times(percpu=True)
+        net = psutil.net_io_counters()
+        disk_io = psutil.disk_io_counters()
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        disk = psutil.disk_usage(self.disk_path)
+
+        raw = {
+            'ram_usage': memory.percent,
+            'ram_available_mb': round(memory.available / (1024**2), 1),
+            'swap_usage': swap.percent,
+            'memory_pressure': _read_memory_pressure(),
+            'load_avg': [round(v, 2) for v in os.getloadavg()],
+            'disk_usage': round(disk.used / disk.total * 100, 1) if disk.total else 0.0,
+            'disk_total_gb': round(disk.total / (1024**3), 1),
+            'disk_used_gb': round(disk.used / (1024**3), 1),
+            'disk_free_gb': round(disk.free / (1024**3), 1),
+            # Cumulative counters kept for existing consumers
+            'network_sent_mb': round(net.bytes_sent / (1024**2), 1),
+            'network_recv_mb': round(net.bytes_recv / (1024**2), 1),
+        }
+
+        if self._prev_time is not None:
+            elapsed = max(now - self._prev_time, 1e-6)
+
+            overall = _cpu_busy_percent(self._prev_cpu, cpu)
+            raw['cpu_usage'] = overall['busy']
+            raw['cpu_iowait'] = overall['iowait']
+            raw['cpu_per_core'] = [
+                round(_cpu_busy_percent(prev, cur)['busy'], 1)
+                for prev, cur in zip(self._prev_cpu_per_core, cpu_per_core)
+            ]
+
+            raw['network_tx_mbps'] = (net.bytes_sent - self._prev_net.bytes_sent) * 8 / elapsed / 1e6
+            raw['network_rx_mbps'] = (net.bytes_recv - self._prev_net.bytes_recv) * 8 / elapsed / 1e6
+
+            if disk_io and self._prev_disk:
+                raw['disk_read_mbps'] = (disk_io.read_bytes - self._prev_disk.read_bytes) / elapsed / (1024**2)
+                raw['disk_write_mbps'] = (disk_io.write_bytes - self._prev_disk.write_bytes) / elapsed / (1024**2)
+                raw['disk_read_iops'] = (disk_io.read_count - self._prev_disk.read_count) / elapsed
+                raw['disk_write_iops'] = (disk_io.write_count - self._prev_disk.write_count) / elapsed
+
+        self._prev_time = now
+        self._prev_cpu = cpu
+        self._prev_cpu_per_core = cpu_per_core
+        self._prev_net = net
+        self._prev_disk = disk_io
+
+        smoothed = self._smooth(raw)
+        smoothed['timestamp'] = int(time.time())
+
+        self.history.append(smoothed)
+        self._latest = smoothed
+        return smoothed
+
+    def _smooth(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply EWMA to rate and utilisation fields against the previous sample"""
+        previous = self._latest
+        smoothed = dict(raw)
+
+        for field in SMOOTHED_FIELDS:
+            value = raw.get(field)
+            if value is None:
+                continue
+            last = previous.get(field)
+            if last is not None:
+                value = self.alpha * value + (1 - self.alpha) * last
+            smoothed[field] = round(value, 2)
+
+        return smoothed
+
+    def _sampler_loop(self):
+        """Background sampling loop"""
+        while self.running:
+            time.sleep(self.interval)
+            if not self.running:
+                break
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"❌ Error sampling system stats: {e}")
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Agent modules import each other by bare name, as when run from the agent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def config(tmp_path):
+    """Fresh global config with every on-disk path under tmp_path"""
+    import config as config_module
+    cfg = config_module.init_config(1)
+    cfg.base_download_dir = str(tmp_path / 'downloads')
+    cfg.report_spool_dir = str(tmp_path / 'spool')
+    cfg.hash_cache_path = str(tmp_path / 'hash_cache.json')
+    return cfg
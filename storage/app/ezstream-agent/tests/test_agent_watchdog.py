@@ -0,0 +1,101 @@
+import time
+
+import agent_watchdog
+from agent_watchdog import Watchdog
+
+
+def stall(handle, seconds=1.0):
+    handle.last_beat = time.monotonic() - seconds
+
+
+def test_stalled_loop_is_restarted_on_new_generation():
+    watchdog = Watchdog(grace=0.0)
+    restarted = []
+    handle = watchdog.register('loop', deadline=0.1, restart=lambda: restarted.append(handle.generation))
+
+    stall(handle)
+    watchdog.check()
+
+    assert restarted == [1]
+    assert not handle.is_current(0)
+    assert handle.stalls == 1 and handle.restarts == 1
+
+
+def test_restarts_are_capped_until_the_loop_checks_in(monkeypatch):
+    watchdog = Watchdog(grace=0.0, max_restarts=2)
+    monkeypatch.setattr(watchdog, 'systemd_interval', 1.0)
+    sent = []
+    monkeypatch.setattr(agent_watchdog, 'sd_notify', lambda state: sent.append(state) or True)
+    handle = watchdog.register('command_loop', deadline=0.1, restart=lambda: None)
+
+    for _ in range(4):
+        stall(handle)
+        watchdog._last_notify = 0.0
+        watchdog.check()
+
+    assert handle.restarts == 2
+    assert handle.stalled
+    assert watchdog.stats['restarts_exhausted'] == 1
+    assert watchdog.stats['systemd_pings_withheld'] == 2
+    assert sent == ['WATCHDOG=1', 'WATCHDOG=1']
+
+    # A check-in from the loop itself makes it restartable again
+    handle.beat()
+    watchdog.check()
+    assert handle.consecutive_restarts == 0 and not handle.stalled
+
+
+def test_disabled_checks_still_feed_systemd(monkeypatch):
+    watchdog = Watchdog(grace=0.0, enabled=False)
+    monkeypatch.setattr(watchdog, 'systemd_interval', 1.0)
+    sent = []
+    monkeypatch.setattr(agent_watchdog, 'sd_notify', lambda state: sent.append(state) or True)
+    handle = watchdog.register('loop', deadline=0.1)
+
+    stall(handle)
+    watchdog.check()
+
+    assert sent == ['WATCHDOG=1']
+    assert not handle.stalled
+
+
+def pinging(watchdog, monkeypatch):
+    monkeypatch.setattr(watchdog, 'systemd_interval', 1.0)
+    sent = []
+    monkeypatch.setattr(agent_watchdog, 'sd_notify', lambda state: sent.append(state) or True)
+    return sent
+
+
+def test_exhausted_stream_monitor_is_given_up_locally(monkeypatch):
+    watchdog = Watchdog(grace=0.0, max_restarts=1)
+    sent = pinging(watchdog, monkeypatch)
+    abandoned = []
+    handle = watchdog.register('stream_monitor:7', deadline=0.1, restart=lambda: None,
+                               critical=False, on_exhausted=lambda: abandoned.append(7))
+
+    for _ in range(3):
+        stall(handle)
+        watchdog._last_notify = 0.0
+        watchdog.check()
+
+    assert abandoned == [7]
+    assert 'stream_monitor:7' not in watchdog.loops
+    assert not handle.is_current(1)
+    assert sent == ['WATCHDOG=1'] * 3
+
+
+def test_only_critical_loops_withhold_systemd_pings(monkeypatch):
+    watchdog = Watchdog(grace=0.0)
+    sent = pinging(watchdog, monkeypatch)
+    sampler = watchdog.register('process_sampler', deadline=0.1, critical=False)
+
+    stall(sampler)
+    watchdog.check()
+    assert sampler.stalled and sent == ['WATCHDOG=1']
+
+    flush = watchdog.register('report_flush', deadline=0.1)
+    stall(flush)
+    watchdog._last_notify = 0.0
+    watchdog.check()
+    assert sent == ['WATCHDOG=1']
+    assert watchdog.stats['systemd_pings_withheld'] == 1
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+from bandwidth_scheduler import BandwidthScheduler, MIN_BUDGET_MBPS
+from utils import TokenBucket
+
+
+def make_scheduler(config, monkeypatch, live):
+    config.network_capacity_mbps = 100.0
+    downloader = SimpleNamespace(limiter=TokenBucket(0), stats={'bytes_downloaded': 0})
+    scheduler = BandwidthScheduler(downloader)
+    monkeypatch.setattr(scheduler, '_measure_live', lambda: live)
+    return scheduler
+
+
+def test_backoff_without_headroom_keeps_downloads_throttled(config, monkeypatch):
+    config.bandwidth_min_download_mbps = 0  # Set directly, as an old env override could
+    live = {'stream_egress_mbps': 200.0, 'host_tx_mbps': 200.0, 'host_rx_mbps': 0.0,
+            'degraded': ['stream 1 speed 0.80x']}
+    scheduler = make_scheduler(config, monkeypatch, live)
+
+    for _ in range(3):
+        decision = scheduler.tick()
+
+    assert decision['budget_mbps'] == MIN_BUDGET_MBPS
+    assert scheduler.downloader.limiter.rate > 0
+
+
+def test_stop_restores_unlimited_without_static_cap(config, monkeypatch):
+    live = {'stream_egress_mbps': 0.0, 'host_tx_mbps': 0.0, 'host_rx_mbps': 0.0, 'degraded': []}
+    scheduler = make_scheduler(config, monkeypatch, live)
+    scheduler.tick()
+    assert scheduler.downloader.limiter.rate > 0
+
+    scheduler.stop()
+    assert scheduler.downloader.limiter.rate == 0
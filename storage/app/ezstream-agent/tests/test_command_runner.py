@@ -0,0 +1,78 @@
+import asyncio
+import sys
+
+import pytest
+
+from command_runner import CommandRunner, _BoundedCapture
+
+
+@pytest.fixture
+def runner():
+    runner = CommandRunner(max_concurrent=2, output_limit=1000)
+    yield runner
+    runner.close()
+
+
+def alive(pid):
+    """Running, as opposed to gone or a zombie nobody has reaped yet"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except OSError:
+        return False
+
+
+def test_timeout_kills_the_whole_process_group(runner):
+    pids = []
+    result = runner.run(['sh', '-c', 'sleep 100 & echo $!; echo $$; sleep 100'], timeout=0.5,
+                        on_stdout=lambda line: pids.append(int(line)))
+
+    assert result.timed_out and not result.success
+    assert len(pids) == 2
+    assert not any(alive(pid) for pid in pids)
+
+
+def test_output_capture_keeps_only_the_last_bytes(runner):
+    text = ''.join(chr(65 + i % 26) for i in range(5000))
+    result = runner.run([sys.executable, '-c', f'import sys; sys.stdout.write({text!r})'])
+
+    assert result.success
+    assert result.truncated
+    assert result.stdout == text[-1000:]
+
+
+def test_short_output_is_not_truncated(runner):
+    result = runner.run([sys.executable, '-c', 'print("hello")'])
+
+    assert result.stdout == 'hello\n' and not result.truncated
+
+
+def test_line_callbacks_join_lines_split_across_chunks(runner):
+    async def pump(chunks):
+        reader = asyncio.StreamReader()
+        capture = _BoundedCapture(runner.output_limit)
+        lines = []
+        task = asyncio.ensure_future(runner._pump(reader, capture, lines.append))
+        for chunk in chunks:
+            reader.feed_data(chunk)
+            await asyncio.sleep(0)  # One read per chunk
+        reader.feed_eof()
+        await task
+        return lines, capture.text()
+
+    lines, captured = asyncio.run(pump([b'fra', b'me=1\r\nfr', b'ame=2\n\nlast']))
+
+    assert lines == ['frame=1', 'frame=2', '', 'last']
+    assert captured == 'frame=1\r\nframe=2\n\nlast'
+
+
+def test_line_callbacks_from_a_flushing_child(runner):
+    script = ('import sys, time\n'
+              'for part in ("out=", "1\\nout", "=2\\n", "tail"):\n'
+              '    sys.stdout.write(part); sys.stdout.flush(); time.sleep(0.05)\n')
+    lines = []
+
+    result = runner.run([sys.executable, '-c', script], on_stdout=lines.append)
+
+    assert result.success
+    assert lines == ['out=1', 'out=2', 'tail']
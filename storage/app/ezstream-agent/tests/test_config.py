@@ -0,0 +1,43 @@
+def test_update_applies_valid_settings_and_bumps_version(config):
+    seen = []
+    config.subscribe(lambda changes, version: seen.append((changes, version)))
+    version = config.config_version
+
+    updated = config.update_from_laravel_settings({'cache_low_watermark_percent': 12.0,
+                                                   'cache_high_watermark_percent': 30.0})
+
+    assert len(updated) == 2
+    assert config.cache_low_watermark_percent == 12.0 and config.cache_high_watermark_percent == 30.0
+    assert config.config_version == version + 1
+    assert seen[0][1] == version + 1
+
+
+def test_update_with_crossed_watermarks_is_rejected_whole(config):
+    seen = []
+    config.subscribe(lambda changes, version: seen.append(version))
+    version = config.config_version
+
+    updated = config.update_from_laravel_settings({'cache_low_watermark_percent': 40.0,
+                                                   'stats_report_interval': 45})
+
+    assert updated == []
+    assert config.cache_low_watermark_percent == 10.0
+    assert config.stats_report_interval != 45
+    assert config.config_version == version
+    assert seen == []
+
+
+def test_zero_ffmpeg_delays_are_ignored(config):
+    restart, reconnect = config.ffmpeg_restart_delay, config.ffmpeg_reconnect_delay
+
+    assert config.update_from_laravel_settings({'ffmpeg_restart_delay': 0, 'ffmpeg_reconnect_delay': 0}) == []
+    assert (config.ffmpeg_restart_delay, config.ffmpeg_reconnect_delay) == (restart, reconnect)
+
+
+def test_zero_sizes_are_ignored(config):
+    keys = ['report_batch_max', 'report_max_buffer', 'max_concurrent_downloads', 'command_workers',
+            'bandwidth_min_download_mbps']
+    before = {key: getattr(config, key) for key in keys}
+
+    assert config.update_from_laravel_settings({key: 0 for key in keys}) == []
+    assert {key: getattr(config, key) for key in keys} == before
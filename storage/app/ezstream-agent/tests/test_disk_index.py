@@ -0,0 +1,98 @@
+import os
+import time
+
+import pytest
+
+from disk_index import DiskUsageIndex, IN_Q_OVERFLOW
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+
+
+def snapshot(index, base_dir):
+    return {name: index.get_dir_size(os.path.join(base_dir, name)) for name in os.listdir(base_dir)}, index.total_bytes
+
+
+def fresh(base_dir):
+    index = DiskUsageIndex(base_dir)
+    index.build()
+    return snapshot(index, base_dir)
+
+
+def wait_until_matches(index, base_dir, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if snapshot(index, base_dir) == fresh(base_dir):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def watched_index(tmp_path):
+    base_dir = str(tmp_path / 'downloads')
+    write(os.path.join(base_dir, 'a', 'seed.mp4'), 100)
+    index = DiskUsageIndex(base_dir)
+    index.start()
+    if not index.get_stats()['watching']:
+        index.stop()
+        pytest.skip("inotify unavailable")
+    yield index
+    index.stop()
+
+
+def test_inotify_tracks_writes_renames_and_deletes(watched_index):
+    base_dir = watched_index.base_dir
+
+    write(os.path.join(base_dir, 'a', 'clip.mp4'), 300)
+    write(os.path.join(base_dir, 'b', 'nested', 'part.mp4'), 500)
+    assert wait_until_matches(watched_index, base_dir)
+
+    os.rename(os.path.join(base_dir, 'a', 'clip.mp4'), os.path.join(base_dir, 'b', 'clip.mp4'))
+    assert wait_until_matches(watched_index, base_dir)
+    assert watched_index.get_dir_size(os.path.join(base_dir, 'b')) == 800
+
+    os.remove(os.path.join(base_dir, 'b', 'nested', 'part.mp4'))
+    os.rmdir(os.path.join(base_dir, 'b', 'nested'))
+    assert wait_until_matches(watched_index, base_dir)
+    assert watched_index.total_bytes == 400
+
+
+def test_forget_and_record_file_match_rebuild(tmp_path):
+    base_dir = str(tmp_path)
+    write(os.path.join(base_dir, 'a', 'one.mp4'), 10)
+    write(os.path.join(base_dir, 'a', 'sub', 'two.mp4'), 20)
+    write(os.path.join(base_dir, 'b', 'three.mp4'), 30)
+    index = DiskUsageIndex(base_dir)
+    index.build()
+
+    write(os.path.join(base_dir, 'a', 'one.mp4'), 15)
+    index.record_file(os.path.join(base_dir, 'a', 'one.mp4'))
+    os.remove(os.path.join(base_dir, 'a', 'sub', 'two.mp4'))
+    index.forget(os.path.join(base_dir, 'a', 'sub'))
+    os.remove(os.path.join(base_dir, 'b', 'three.mp4'))
+    os.rmdir(os.path.join(base_dir, 'b'))
+    index.forget(os.path.join(base_dir, 'b'))
+
+    assert snapshot(index, base_dir) == fresh(base_dir)
+    assert index.total_bytes == 15
+
+
+def test_queue_overflow_rebuilds_from_disk(tmp_path):
+    base_dir = str(tmp_path)
+    write(os.path.join(base_dir, 'a', 'one.mp4'), 10)
+    index = DiskUsageIndex(base_dir)
+    index.build()
+
+    # Changes made while events were being dropped
+    write(os.path.join(base_dir, 'a', 'two.mp4'), 40)
+    write(os.path.join(base_dir, 'c', 'three.mp4'), 50)
+    index._handle_event(-1, IN_Q_OVERFLOW, '')
+
+    assert snapshot(index, base_dir) == fresh(base_dir)
+    assert index.total_bytes == 100
+    assert index.stats['overflows'] == 1
+    assert index.stats['builds'] == 2
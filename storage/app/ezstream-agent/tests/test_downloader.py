@@ -0,0 +1,161 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from downloader import ChunkedDownloader, DownloadError, PART_SUFFIX, STATE_SUFFIX, READ_SIZE
+
+
+CHUNK = READ_SIZE  # The smallest chunk the downloader accepts
+BODY = os.urandom(CHUNK * 6 + 1234)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves server.body, honouring Range and If-Range like a static file server"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        range_header = self.headers.get('Range')
+        server.requests.append(range_header)
+
+        if_range = self.headers.get('If-Range')
+        if not server.ranges or not range_header or (if_range and if_range != server.etag):
+            return self._send(200, server.body)
+
+        start, end = (int(v) for v in range_header.split('=', 1)[1].split('-'))
+        end = min(end, len(server.body) - 1)
+        if start in server.fail_starts:
+            return self._send(500, b'')
+        self._send(206, server.body[start:end + 1], {'Content-Range': f'bytes {start}-{end}/{len(server.body)}'})
+
+    def _send(self, status, payload, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('ETag', self.server.etag)
+        if self.server.ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The probe closes after reading its one byte
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    httpd.daemon_threads = True
+    httpd.body = BODY
+    httpd.etag = '"v1"'
+    httpd.ranges = True
+    httpd.fail_starts = set()
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/video.mp4"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def downloader():
+    downloader = ChunkedDownloader(chunk_workers=4, chunk_size=CHUNK, timeout=10, state_interval=0)
+    yield downloader
+    downloader.close()
+
+
+@pytest.fixture
+def serial_downloader():
+    """One chunk worker, so an interruption leaves exactly the earlier chunks complete"""
+    downloader = ChunkedDownloader(chunk_workers=1, chunk_size=CHUNK, timeout=10, state_interval=0)
+    yield downloader
+    downloader.close()
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_parallel_ranged_download(server, downloader, tmp_path):
+    path = str(tmp_path / 'video.mp4')
+
+    progress = downloader.download(server.url, path)
+
+    assert progress.ranged
+    assert progress.done_bytes == progress.total_bytes == len(BODY)
+    assert read(path) == BODY
+    chunk_ranges = [r for r in server.requests if r != 'bytes=0-0']
+    assert len(chunk_ranges) == 7
+    assert not os.path.exists(path + PART_SUFFIX) and not os.path.exists(path + STATE_SUFFIX)
+
+
+def test_resume_after_interruption_fetches_only_missing_chunks(server, serial_downloader, tmp_path):
+    downloader = serial_downloader
+    path = str(tmp_path / 'video.mp4')
+    server.fail_starts = {CHUNK * 3}
+
+    with pytest.raises(DownloadError):
+        downloader.download(server.url, path)
+    assert os.path.exists(path + PART_SUFFIX) and os.path.exists(path + STATE_SUFFIX)
+
+    server.fail_starts = set()
+    server.requests.clear()
+    progress = downloader.download(server.url, path)
+
+    assert downloader.stats['resumed'] == 1
+    assert progress.resumed_bytes == CHUNK * 3
+    assert read(path) == BODY
+    assert server.requests[1:] == [f'bytes={start}-{min(start + CHUNK, len(BODY)) - 1}'
+                                   for start in range(CHUNK * 3, len(BODY), CHUNK)]
+
+
+def test_falls_back_to_single_get_without_range_support(server, downloader, tmp_path):
+    path = str(tmp_path / 'video.mp4')
+    server.ranges = False
+
+    progress = downloader.download(server.url, path)
+
+    assert not progress.ranged
+    assert read(path) == BODY
+    assert server.requests == ['bytes=0-0', None]
+
+
+def test_changed_etag_discards_stale_partial(server, serial_downloader, tmp_path):
+    downloader = serial_downloader
+    path = str(tmp_path / 'video.mp4')
+    server.fail_starts = {CHUNK * 3}
+    with pytest.raises(DownloadError):
+        downloader.download(server.url, path)
+
+    server.fail_starts = set()
+    server.body = bytes(reversed(BODY))
+    server.etag = '"v2"'
+    downloader.download(server.url, path)
+
+    assert downloader.stats['resumed'] == 0
+    assert read(path) == server.body
+
+
+def test_file_changing_mid_download_is_rejected(server, downloader, tmp_path, monkeypatch):
+    path = str(tmp_path / 'video.mp4')
+    probe = downloader._probe
+
+    def probe_then_change(url):
+        remote = probe(url)
+        server.etag = '"v2"'  # Replaced on the origin right after the probe
+        return remote
+
+    monkeypatch.setattr(downloader, '_probe', probe_then_change)
+
+    with pytest.raises(DownloadError, match='file changed'):
+        downloader.download(server.url, path)
+    assert not os.path.exists(path)
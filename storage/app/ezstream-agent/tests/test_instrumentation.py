@@ -0,0 +1,52 @@
+import threading
+import time
+
+from instrumentation import SamplingProfiler
+from utils import Histogram
+
+
+def test_histogram_counts_every_concurrent_observation():
+    histogram = Histogram()
+
+    def worker():
+        for i in range(5000):
+            histogram.observe(i / 5000)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert histogram.total == 40000
+    assert sum(histogram.counts) == 40000
+    assert histogram.snapshot()['cumulative'][-1] == 40000
+
+
+def test_profiler_result_is_safe_while_sampling():
+    stop = threading.Event()
+
+    def busy():
+        while not stop.is_set():
+            sum(range(100))
+
+    workers = [threading.Thread(target=busy, name=f"busy-{i}") for i in range(4)]
+    for worker in workers:
+        worker.start()
+
+    profiler = SamplingProfiler(interval=0.001, duration=5.0)
+    profiler.start()
+    try:
+        seen = 0
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            result = profiler.result()
+            assert result['samples'] >= seen
+            seen = result['samples']
+    finally:
+        profiler.stop()
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    assert profiler.result()['samples'] > 0
@@ -0,0 +1,40 @@
+import os
+import time
+
+from media_store import MediaStore
+
+
+def make_object(store, name, age=3600):
+    path = os.path.join(store.root, name)
+    with open(path, 'wb') as f:
+        f.write(b'x')
+    old = time.time() - age
+    os.utime(path, (old, old))
+    return path
+
+
+def test_object_pinned_while_inputs_prepare_survives_collection(tmp_path):
+    store = MediaStore(str(tmp_path))
+    pinned = make_object(store, 'file_1.mp4')
+    loose = make_object(store, 'file_2.mp4')
+
+    store.add_stream_ref(7, pinned)
+    removed = store.collect_garbage(time.time())
+
+    assert removed == [loose]
+    assert os.path.isfile(pinned)
+    assert store.refcount(pinned) == 1
+
+
+def test_final_refs_replace_preparation_pins(tmp_path):
+    store = MediaStore(str(tmp_path))
+    source = make_object(store, 'file_1.mp4')
+    prepared = make_object(store, 'file_1.prepared.mp4')
+
+    store.add_stream_ref(7, source)
+    store.add_stream_ref(7, prepared)
+    store.add_stream_ref(7, str(tmp_path / 'elsewhere.mp4'))  # Not a store object
+    store.set_stream_refs(7, [prepared])
+
+    assert store.referenced_paths() == {prepared}
+    assert store.release_stream(7) == [prepared]
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from process_manager import ProcessManager
+
+
+@pytest.fixture
+def manager(config):
+    manager = ProcessManager()
+    manager.start()
+    yield manager
+    manager.stop_all()
+
+
+@pytest.mark.skipif(not hasattr(os, 'pidfd_open'), reason="pidfd_open not available")
+def test_pidfd_is_opened_at_spawn_and_released_after_exit(manager):
+    manager.spawn(1, [sys.executable, '-c', 'import time; time.sleep(30)'], stderr=subprocess.DEVNULL)
+    info = manager.get_info(1)
+    assert info.pidfd is not None
+
+    manager.terminate(1)
+    exit_record = manager.wait_for_exit(1, timeout=5)
+
+    assert exit_record is not None and exit_record.error_type == 'STOPPED'
+    assert info.exited.wait(5)
+
+
+def test_child_exit_is_collected_by_the_reaper(manager):
+    manager.spawn(2, [sys.executable, '-c', 'raise SystemExit(3)'], stderr=subprocess.DEVNULL)
+
+    exit_record = manager.wait_for_exit(2, timeout=5)
+
+    assert exit_record is not None and exit_record.exit_code == 3
+    assert manager.get_info(2).pidfd is None
@@ -0,0 +1,25 @@
+import time
+
+from redis_client import ManagedPubSub
+
+
+def backing_off(next_retry_in):
+    pubsub = ManagedPubSub.__new__(ManagedPubSub)
+    pubsub.pubsub = None
+    pubsub.closed = False
+    pubsub._next_retry = time.monotonic() + next_retry_in
+    return pubsub
+
+
+def test_get_message_waits_out_at_most_the_timeout_while_backing_off():
+    pubsub = backing_off(60)
+
+    started = time.monotonic()
+    assert pubsub.get_message(timeout=0.05) is None
+    assert time.monotonic() - started < 1
+
+
+def test_get_message_never_sleeps_a_negative_time():
+    pubsub = backing_off(60)
+
+    assert pubsub.get_message(timeout=-1) is None
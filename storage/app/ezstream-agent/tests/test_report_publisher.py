@@ -0,0 +1,86 @@
+from report_publisher import ReportPublisher
+
+
+def make_publisher():
+    return ReportPublisher(get_redis=lambda: None, vps_id=1)
+
+
+def test_host_metrics_responses_are_not_coalesced():
+    publisher = make_publisher()
+    for request_id in ('a', 'b'):
+        publisher.submit({'type': 'METRICS_RESPONSE', 'stream_id': None, 'request_id': request_id})
+
+    assert len(publisher._buffer) == 2
+    assert publisher.stats['coalesced'] == 0
+
+
+def test_status_updates_for_one_stream_still_coalesce():
+    publisher = make_publisher()
+    publisher.submit({'type': 'STATUS_UPDATE', 'stream_id': 5, 'status': 'STARTING'})
+    publisher.submit({'type': 'STATUS_UPDATE', 'stream_id': 5, 'status': 'STREAMING'})
+
+    assert [p['status'] for p in publisher._buffer.values()] == ['STREAMING']
+    assert publisher.stats['coalesced'] == 1
+
+
+def test_batching_keeps_submission_order():
+    publisher = ReportPublisher(get_redis=lambda: None, vps_id=1, batch_enabled=True, batch_max=2)
+    reports = [
+        {'type': 'STATUS_UPDATE', 'stream_id': 1},
+        {'type': 'STATUS_UPDATE', 'stream_id': 2},
+        {'type': 'RESTART_REQUEST', 'stream_id': 2},
+        {'type': 'STATUS_UPDATE', 'stream_id': 3},
+        {'type': 'HEARTBEAT'},
+        {'type': 'STATUS_UPDATE', 'stream_id': 4},
+        {'type': 'STATUS_UPDATE', 'stream_id': 5},
+        {'type': 'STATUS_UPDATE', 'stream_id': 6},
+    ]
+
+    messages = publisher._build_messages(reports)
+
+    assert [m['type'] for m in messages] == ['STATUS_BATCH', 'RESTART_REQUEST', 'STATUS_UPDATE',
+                                             'HEARTBEAT', 'STATUS_BATCH', 'STATUS_BATCH']
+    assert [u['stream_id'] for u in messages[0]['updates']] == [1, 2]
+    assert messages[2]['stream_id'] == 3
+    assert [u['stream_id'] for u in messages[4]['updates']] == [4, 5]
+    assert [u['stream_id'] for u in messages[5]['updates']] == [6]
+
+
+def test_publish_now_reports_the_outcome_of_its_own_send(monkeypatch):
+    publisher = make_publisher()
+    sent = []
+    monkeypatch.setattr(publisher, '_send', lambda messages: sent.append(messages))
+    publisher.submit({'type': 'STATUS_UPDATE', 'stream_id': 1})
+
+    assert publisher.publish_now({'type': 'HEARTBEAT', 'seq': 1}) is True
+    assert [m['type'] for m in sent[0]] == ['STATUS_UPDATE', 'HEARTBEAT']
+
+    def refuse(messages):
+        raise ConnectionError('redis down')
+
+    monkeypatch.setattr(publisher, '_send', refuse)
+    assert publisher.publish_now({'type': 'HEARTBEAT', 'seq': 2}) is False
+    assert not publisher._buffer  # Never left behind for the flush thread to send later
+
+
+def test_reports_are_spooled_when_building_messages_fails(monkeypatch):
+    spooled = []
+
+    class Spool:
+        def has_backlog(self):
+            return False
+
+        def append(self, reports):
+            spooled.extend(reports)
+
+    publisher = ReportPublisher(get_redis=lambda: None, vps_id=1, batch_enabled=True, spool=Spool())
+
+    def broken(reports):
+        raise ValueError('range() arg 3 must not be zero')
+
+    monkeypatch.setattr(publisher, '_build_messages', broken)
+    publisher.submit({'type': 'STATUS_UPDATE', 'stream_id': 1})
+    publisher.submit({'type': 'RESTART_REQUEST', 'stream_id': 1})
+
+    assert publisher.flush() == 0
+    assert [r['type'] for r in spooled] == ['STATUS_UPDATE', 'RESTART_REQUEST']
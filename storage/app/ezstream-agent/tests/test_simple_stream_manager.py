@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+import pytest
+
+import agent_watchdog
+import process_manager as process_manager_module
+from agent_watchdog import Watchdog
+from simple_stream_manager import SimpleStreamManager, StreamConfig, StreamStatus
+
+
+@pytest.fixture
+def manager(config, monkeypatch):
+    monkeypatch.setattr(agent_watchdog, '_watchdog', Watchdog(grace=0.0, max_restarts=0))
+    processes = process_manager_module.init_process_manager()
+    processes.start()
+    yield SimpleStreamManager()
+    processes.stop_all()
+
+
+def test_stuck_monitor_stops_only_its_stream(manager):
+    processes = process_manager_module.get_process_manager()
+    watchdog = agent_watchdog.get_watchdog()
+    for stream_id in (1, 2):
+        config = StreamConfig(stream_id=stream_id, input_urls=['/dev/null'], output_url='rtmp://example/live')
+        manager.streams[stream_id] = {'config': config, 'status': StreamStatus.RUNNING, 'retry_count': 0}
+        manager.streams[stream_id]['watch'] = watchdog.register(
+            f"stream_monitor:{stream_id}", deadline=0.1, restart=lambda: None, critical=False,
+            on_exhausted=lambda stream_id=stream_id: manager._abandon_stream(stream_id))
+        processes.spawn(stream_id, [sys.executable, '-c', 'import time; time.sleep(30)'], stderr=subprocess.DEVNULL)
+
+    manager.streams[1]['watch'].last_beat -= 10
+    watchdog.check()
+
+    assert 1 not in manager.streams and 'stream_monitor:1' not in watchdog.loops
+    assert not processes.is_alive(1)
+    assert manager.streams[2]['status'] == StreamStatus.RUNNING and processes.is_alive(2)
@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+
+@pytest.fixture
+def reporter(config):
+    from redis_client import init_redis_manager
+    from status_reporter import StatusReporter
+    init_redis_manager(connect=False)
+    return StatusReporter()
+
+
+def beat(reporter, streams):
+    payload = reporter._build_heartbeat(streams)
+    reporter._commit_heartbeat(payload, streams)
+    return payload
+
+
+def test_first_heartbeat_is_full_snapshot(reporter):
+    payload = beat(reporter, [1, 2])
+    assert payload['full'] is True
+    assert payload['active_streams'] == [1, 2]
+    assert payload['snapshot_reason'] == 'startup'
+
+
+def test_requested_snapshot_after_ack_is_full_and_clears_reason(reporter):
+    beat(reporter, [1])
+    assert beat(reporter, [1])['full'] is False
+
+    reporter.request_heartbeat(full=True, reason='requested')
+    payload = beat(reporter, [1, 3])
+    assert payload['full'] is True
+    assert payload['active_streams'] == [1, 3]
+    assert payload['snapshot_reason'] == 'requested'
+    assert reporter._snapshot_reason is None
+
+    following = beat(reporter, [1, 3])
+    assert following['full'] is False
+    assert following['added'] == [] and following['removed'] == []
+
+
+def test_periodic_snapshot_after_ack(reporter, config):
+    config.heartbeat_full_snapshot_every = 3
+    payloads = [beat(reporter, [5]) for _ in range(7)]
+    assert [p['full'] for p in payloads] == [True, False, False, True, False, False, True]
+    assert payloads[3]['snapshot_reason'] == 'periodic'
+
+
+def test_diff_heartbeat_reports_added_and_removed(reporter):
+    beat(reporter, [1, 2])
+    payload = beat(reporter, [2, 4])
+    assert payload['full'] is False
+    assert payload['added'] == [4]
+    assert payload['removed'] == [1]
+
+
+def send(reporter, monkeypatch, streams, published=True, last_success_ago=0.0):
+    sent = []
+    monkeypatch.setattr(reporter, '_get_active_stream_ids', lambda: list(streams))
+    monkeypatch.setattr(reporter.publisher, 'publish_now', lambda payload: sent.append(payload) or published)
+    reporter._last_heartbeat_success = time.time() - last_success_ago
+    reporter._send_heartbeat()
+    return sent[-1]
+
+
+def min_interval(reporter):
+    return reporter.heartbeat_schedule._bounds()[0]
+
+
+def test_steady_agent_backs_off_to_max_without_re_announcing(reporter, config, monkeypatch):
+    config.heartbeat_full_snapshot_every = 2
+    high = min(config.heartbeat_max_interval, config.report_max_staleness)
+
+    payloads = [send(reporter, monkeypatch, [1], last_success_ago=high + 5) for _ in range(12)]
+
+    assert not any(p.get('re_announce') for p in payloads)
+    assert any(p['full'] and p['snapshot_reason'] == 'periodic' for p in payloads)
+    assert reporter.heartbeat_schedule.next_interval() == high
+
+
+def test_stream_change_resets_cadence(reporter, monkeypatch):
+    for _ in range(6):
+        send(reporter, monkeypatch, [1])
+    assert reporter.heartbeat_schedule.next_interval() > min_interval(reporter)
+
+    send(reporter, monkeypatch, [1, 2])
+    assert reporter.heartbeat_schedule.next_interval() == min_interval(reporter)
+
+
+def test_re_announce_after_long_publish_outage(reporter, monkeypatch):
+    send(reporter, monkeypatch, [1])
+    outage = reporter._re_announce_after() + 1
+
+    send(reporter, monkeypatch, [1], published=False, last_success_ago=outage)
+    payload = send(reporter, monkeypatch, [1], last_success_ago=outage)
+
+    assert payload['full'] and payload['re_announce']
+    assert payload['snapshot_reason'] == 're_announce'
+    assert reporter._heartbeat_failures == 0
+
+
+def test_host_metrics_responses_are_queued_separately(reporter):
+    reporter.publish_metrics_response(None, 'a', 'agent_metrics:1:a', points=3, resolution=10)
+    reporter.publish_metrics_response(None, 'b', 'agent_metrics:1:b', points=5, resolution=10)
+
+    queued = list(reporter.publisher._buffer.values())
+    assert [p['request_id'] for p in queued] == ['a', 'b']
+    assert all(p['type'] == 'METRICS_RESPONSE' and p['stream_id'] is None for p in queued)
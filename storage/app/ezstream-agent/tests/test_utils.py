@@ -0,0 +1,23 @@
+from utils import throttle_calls
+
+
+def test_throttle_calls_limits_repeat_calls_per_argument_set():
+    calls = []
+    throttled = throttle_calls(calls.append, min_interval=60)
+
+    throttled('a')
+    throttled('a')
+    throttled('b')
+
+    assert calls == ['a', 'b']
+
+
+def test_throttle_calls_without_interval_never_throttles():
+    for min_interval in (0, -1):
+        calls = []
+        throttled = throttle_calls(calls.append, min_interval=min_interval)
+
+        for _ in range(3):
+            throttled('a')
+
+        assert calls == ['a', 'a', 'a']
@@ -10,8 +10,10 @@ import time
 import json
 import hashlib
 import logging
-import subprocess
-from typing import Dict, Any, Optional, List
+import functools
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Callable, Hashable, Union
 from urllib.parse import urlparse
 
 
@@ -159,29 +161,10 @@ def kill_process_tree(pid: int, timeout: int = 5) -> bool:
 
 
 def run_command(command: List[str], timeout: int = 30, cwd: Optional[str] = None) -> Dict[str, Any]:
-    """Run shell command and return result"""
+    """Run command through the shared runner (concurrency-limited, bounded output, process-group timeout)"""
     try:
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            cwd=cwd
-        )
-        
-        return {
-            'success': result.returncode == 0,
-            'returncode': result.returncode,
-            'stdout': result.stdout,
-            'stderr': result.stderr
-        }
-    except subprocess.TimeoutExpired:
-        return {
-            'success': False,
-            'returncode': -1,
-            'stdout': '',
-            'stderr': f'Command timed out after {timeout} seconds'
-        }
+        from command_runner import get_command_runner
+        return get_command_runner().run(command, timeout=timeout, cwd=cwd).to_dict()
     except Exception as e:
         return {
             'success': False,
@@ -205,27 +188,370 @@ def retry_operation(func, max_retries: int = 3, delay: float = 1.0, backoff: flo
             time.sleep(wait_time)
 
 
-def throttle_calls(func, min_interval: float = 1.0):
-    """Decorator to throttle function calls"""
-    last_call_time = {}
-    
+def throttle_calls(func, min_interval: float = 1.0, max_keys: int = 1024):
+    """Decorator to throttle function calls per argument set (calls inside the interval return None).
+    A min_interval of zero or less disables throttling."""
+    # RateLimiter treats a non-positive rate as unlimited
+    limiter = RateLimiter(rate=1.0 / min_interval if min_interval > 0 else 0.0, burst=1, max_keys=max_keys)
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        key = f"{func.__name__}_{hash(str(args))}"
-        current_time = time.time()
-        
-        if key in last_call_time:
-            time_since_last = current_time - last_call_time[key]
-            if time_since_last < min_interval:
-                return None
-        
-        last_call_time[key] = current_time
+        if not limiter.allow(str(args)):
+            return None
         return func(*args, **kwargs)
-    
+
+    wrapper.limiter = limiter
     return wrapper
 
 
+_MISSING = object()
+
+
+def _resolve(value: Union[float, Callable[[], float]]) -> float:
+    return float(value()) if callable(value) else float(value)
+
+
+class TTLCache:
+    """Thread-safe mapping bounded by size and age - least recently used entries go first"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return default
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, optionally with its own lifetime"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def expire(self) -> int:
+        """Drop expired entries now instead of on their next lookup"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (expires, _) in self._data.items() if expires <= now]
+            for key in expired:
+                del self._data[key]
+            self.stats['expirations'] += len(expired)
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'size': len(self._data), 'maxsize': self.maxsize}
+
+
+def ttl_cache(maxsize: int = 128, ttl: float = 60.0):
+    """Memoize a function with hashable arguments in a TTLCache (exposed as .cache)"""
+    def decorator(func):
+        cache = TTLCache(maxsize, ttl)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+class TokenBucket:
+    """Single token bucket - rate <= 0 means unlimited, burst defaults to one second of rate"""
+
+    def __init__(self, rate: float = 0, burst: Optional[float] = None):
+        self.rate = rate
+        self._burst = burst
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {'consumed': 0, 'waits': 0, 'wait_seconds': 0.0}
+
+    @property
+    def burst(self) -> float:
+        return self.rate if self._burst is None else self._burst
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_consume(self, amount: float = 1) -> bool:
+        """Take tokens if available, without waiting"""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= amount:
+                self.tokens -= amount
+                self.stats['consumed'] += amount
+                return True
+            return False
+
+    def consume(self, amount: float):
+        """Block until `amount` tokens are available (amounts above the burst drain a full bucket)"""
+        waited = 0.0
+        while self.rate > 0:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= amount or self.tokens >= self.burst:
+                    self.tokens -= amount
+                    break
+                wait = min((amount - self.tokens) / self.rate, 1.0)
+            time.sleep(wait)
+            waited += wait
+
+        self.stats['consumed'] += amount
+        if waited:
+            self.stats['waits'] += 1
+            self.stats['wait_seconds'] += waited
+
+
+class RateLimiter:
+    """Per-key token buckets (e.g. one per stream) kept in a bounded LRU"""
+
+    def __init__(self, rate: Union[float, Callable[[], float]], burst: float = 1.0, max_keys: int = 1024):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[Hashable, List[float]]' = OrderedDict()  # key -> [tokens, updated]
+        self._lock = threading.Lock()
+        self.stats = {'allowed': 0, 'limited': 0, 'evictions': 0}
+
+    def allow(self, key: Hashable = None, cost: float = 1.0) -> bool:
+        """Whether a call for key may go ahead now (consumes tokens when it may)"""
+        rate = _resolve(self.rate)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self.stats['evictions'] += 1
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * rate) if rate > 0 else self.burst
+                bucket[1] = now
+            self._buckets.move_to_end(key)
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                self.stats['allowed'] += 1
+                return True
+            self.stats['limited'] += 1
+            return False
+
+    def forget(self, key: Hashable):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'keys': len(self._buckets)}
+
+
+class Debouncer:
+    """Per-key "latest value wins" coalescing: the first call runs immediately, calls inside the
+    interval collapse into one trailing call with the most recent arguments"""
+
+    def __init__(self, func: Callable, interval: Union[float, Callable[[], float]], max_keys: int = 1024,
+                 name: str = "Debouncer"):
+        self.func = func
+        self.interval = interval
+        self.max_keys = max_keys
+        self.name = name
+
+        self._last_run: 'OrderedDict[Hashable, float]' = OrderedDict()
+        self._pending: Dict[Hashable, tuple] = {}  # key -> (due, args, kwargs)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = True
+        self.stats = {'immediate': 0, 'coalesced': 0, 'trailing': 0, 'cancelled': 0}
+
+    def submit(self, key: Hashable, *args, **kwargs):
+        """Run func(*args, **kwargs) now, or as the trailing call for key once the interval has passed"""
+        now = time.monotonic()
+        interval = _resolve(self.interval)
+        with self._cond:
+            if key in self._pending:
+                due = self._pending[key][0]
+                self._pending[key] = (due, args, kwargs)
+                self.stats['coalesced'] += 1
+                return
+
+            last = self._last_run.get(key)
+            if last is not None and now - last < interval:
+                self._pending[key] = (last + interval, args, kwargs)
+                self._ensure_thread()
+                self._cond.notify()
+                return
+
+            self._mark_run(key, now, interval)
+            self.stats['immediate'] += 1
+
+        self._call(args, kwargs)
+
+    def cancel(self, key: Hashable) -> bool:
+        """Drop a pending trailing call (e.g. superseded by a state change)"""
+        with self._cond:
+            if self._pending.pop(key, None) is None:
+                return False
+            self.stats['cancelled'] += 1
+            return True
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._pending.clear()
+            self._cond.notify()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self.stats, 'pending': len(self._pending), 'keys': len(self._last_run)}
+
+    def _mark_run(self, key: Hashable, now: float, interval: float):
+        self._last_run[key] = now
+        self._last_run.move_to_end(key)
+        # Entries older than the interval no longer delay anything
+        while self._last_run:
+            oldest_key, oldest = next(iter(self._last_run.items()))
+            if len(self._last_run) <= self.max_keys and now - oldest < interval:
+                break
+            del self._last_run[oldest_key]
+
+    def _call(self, args: tuple, kwargs: dict):
+        try:
+            self.func(*args, **kwargs)
+        except Exception as e:
+            logging.error(f"❌ {self.name} callback failed: {e}")
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                due = [key for key, (at, _, _) in self._pending.items() if at <= now]
+                if not due:
+                    timeout = min((at for at, _, _ in self._pending.values()), default=now + 60) - now
+                    self._cond.wait(timeout)
+                    continue
+                calls = []
+                interval = _resolve(self.interval)
+                for key in due:
+                    _, args, kwargs = self._pending.pop(key)
+                    self._mark_run(key, now, interval)
+                    calls.append((args, kwargs))
+                self.stats['trailing'] += len(calls)
+
+            for args, kwargs in calls:
+                self._call(args, kwargs)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, cheap enough to observe on hot paths"""
+
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: Optional[tuple] = None):
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()  # Observed from many threads; += on shared slots is not atomic
+
+    def observe(self, value: float):
+        """Record one value (seconds for latencies)"""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.total += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating inside its bucket (None before any observation)"""
+        with self._lock:
+            counts, total, maximum = list(self.counts), self.total, self.max
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else maximum
+                return min(lower + (upper - lower) * (rank - seen) / count, maximum)
+            seen += count
+        return maximum
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cumulative bucket counts in Prometheus order"""
+        with self._lock:
+            counts, total, total_sum = list(self.counts), self.total, self.sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return {
+            'buckets': list(self.buckets),
+            'cumulative': cumulative,
+            'count': total,
+            'sum': total_sum,
+        }
+
+
 class PerformanceTimer:
-    """Context manager for measuring execution time"""
+    """Context manager for measuring execution time (one-off; hot paths use instrumentation timers)"""
     
     def __init__(self, name: str = "Operation"):
         self.name = name
@@ -233,13 +559,13 @@ class PerformanceTimer:
         self.end_time = None
     
     def __enter__(self):
-        self.start_time = time.time()
+        self.start_time = time.perf_counter()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.end_time = time.time()
+        self.end_time = time.perf_counter()
         duration = self.end_time - self.start_time
-        logging.info(f"⏱️ {self.name} completed in {format_duration(duration)}")
+        logging.debug(f"⏱️ {self.name} completed in {format_duration(duration)}")
     
     @property
     def duration(self) -> Optional[float]: